@@ -0,0 +1,124 @@
+##### FREETYPE #####
+# Defines the freetype target for the plugin and cmake/deps.
+#
+# GIPWEBGL_FREETYPE_PROFILE selects the configuration:
+#   full  FreeType's own CMake build with every module it detects
+#   web   only the modules listed in GIPWEBGL_FREETYPE_MODULES, registered
+#         through a generated ftmodule.h and configured by a generated ftoption.h
+#
+# project_builder.py resolves module dependencies before passing the list.
+
+set(GIPWEBGL_FREETYPE_PROFILE "web" CACHE STRING "FreeType build profile (web or full)")
+set(GIPWEBGL_FREETYPE_MODULES "truetype;cff;sfnt;psaux;psnames;pshinter;smooth" CACHE STRING "FreeType modules of the web profile")
+
+set(GIPWEBGL_FREETYPE_DIR ${PLUGIN_DIR}/deps/freetype)
+
+if(GIPWEBGL_FREETYPE_PROFILE STREQUAL "full")
+	add_subdirectory(${GIPWEBGL_FREETYPE_DIR} ${CMAKE_BINARY_DIR}/freetype EXCLUDE_FROM_ALL)
+	return()
+endif()
+
+# Module name, source file and the classes it registers, in FreeType's default order
+set(GIPWEBGL_FT_MODULE_TABLE
+	"autofit|src/autofit/autofit.c|FT_Module_Class, autofit_module_class"
+	"truetype|src/truetype/truetype.c|FT_Driver_ClassRec, tt_driver_class"
+	"type1|src/type1/type1.c|FT_Driver_ClassRec, t1_driver_class"
+	"cff|src/cff/cff.c|FT_Driver_ClassRec, cff_driver_class"
+	"t1cid|src/cid/type1cid.c|FT_Driver_ClassRec, t1cid_driver_class"
+	"pfr|src/pfr/pfr.c|FT_Driver_ClassRec, pfr_driver_class"
+	"t42|src/type42/type42.c|FT_Driver_ClassRec, t42_driver_class"
+	"winfonts|src/winfonts/winfnt.c|FT_Driver_ClassRec, winfnt_driver_class"
+	"pcf|src/pcf/pcf.c|FT_Driver_ClassRec, pcf_driver_class"
+	"bdf|src/bdf/bdf.c|FT_Driver_ClassRec, bdf_driver_class"
+	"psaux|src/psaux/psaux.c|FT_Module_Class, psaux_module_class"
+	"psnames|src/psnames/psnames.c|FT_Module_Class, psnames_module_class"
+	"pshinter|src/pshinter/pshinter.c|FT_Module_Class, pshinter_module_class"
+	"sfnt|src/sfnt/sfnt.c|FT_Module_Class, sfnt_module_class"
+	"smooth|src/smooth/smooth.c|FT_Renderer_Class, ft_smooth_renderer_class"
+	"raster|src/raster/raster.c|FT_Renderer_Class, ft_raster1_renderer_class"
+	"sdf|src/sdf/sdf.c|FT_Renderer_Class, ft_sdf_renderer_class|FT_Renderer_Class, ft_bitmap_sdf_renderer_class"
+	"svg|src/svg/svg.c|FT_Renderer_Class, ft_svg_renderer_class"
+)
+
+# Components without a module class
+set(GIPWEBGL_FT_COMPONENT_gzip src/gzip/ftgzip.c)
+set(GIPWEBGL_FT_COMPONENT_lzw src/lzw/ftlzw.c)
+set(GIPWEBGL_FT_COMPONENT_cache src/cache/ftcache.c)
+
+# Core and the small public API files, unused ones are dropped by the linker
+set(GIPWEBGL_FT_SRCS)
+foreach(base_src
+		ftsystem.c ftinit.c ftdebug.c ftbase.c ftbbox.c ftbdf.c ftbitmap.c ftcid.c
+		ftfstype.c ftgasp.c ftglyph.c ftgxval.c ftmm.c ftotval.c ftpatent.c ftpfr.c
+		ftstroke.c ftsynth.c fttype1.c ftwinfnt.c)
+	if(EXISTS ${GIPWEBGL_FREETYPE_DIR}/src/base/${base_src})
+		list(APPEND GIPWEBGL_FT_SRCS ${GIPWEBGL_FREETYPE_DIR}/src/base/${base_src})
+	endif()
+endforeach()
+
+set(GIPWEBGL_FT_MODULE_LINES "")
+foreach(module_entry ${GIPWEBGL_FT_MODULE_TABLE})
+	string(REPLACE "|" ";" module_fields "${module_entry}")
+	list(GET module_fields 0 module_name)
+	list(GET module_fields 1 module_src)
+	list(REMOVE_AT module_fields 0 1)
+	list(FIND GIPWEBGL_FREETYPE_MODULES ${module_name} module_index)
+	if(NOT module_index EQUAL -1 AND EXISTS ${GIPWEBGL_FREETYPE_DIR}/${module_src})
+		list(APPEND GIPWEBGL_FT_SRCS ${GIPWEBGL_FREETYPE_DIR}/${module_src})
+		foreach(module_class ${module_fields})
+			string(APPEND GIPWEBGL_FT_MODULE_LINES "FT_USE_MODULE( ${module_class} )\n")
+		endforeach()
+	endif()
+endforeach()
+
+foreach(component gzip lzw cache)
+	list(FIND GIPWEBGL_FREETYPE_MODULES ${component} component_index)
+	if(NOT component_index EQUAL -1)
+		list(APPEND GIPWEBGL_FT_SRCS ${GIPWEBGL_FREETYPE_DIR}/${GIPWEBGL_FT_COMPONENT_${component}})
+	endif()
+endforeach()
+
+# Generated headers, only rewritten when their content changes
+set(GIPWEBGL_FT_CONFIG_DIR ${CMAKE_BINARY_DIR}/freetype-web/include)
+
+file(WRITE ${CMAKE_BINARY_DIR}/freetype-web/ftmodule.h.in
+"/* Generated by gipWebGL, do not edit */\n${GIPWEBGL_FT_MODULE_LINES}")
+configure_file(${CMAKE_BINARY_DIR}/freetype-web/ftmodule.h.in
+		${GIPWEBGL_FT_CONFIG_DIR}/gipwebgl/ftmodule.h COPYONLY)
+
+# Start from FreeType's defaults and turn off what the web build does not ship
+file(READ ${GIPWEBGL_FREETYPE_DIR}/include/freetype/config/ftoption.h GIPWEBGL_FT_OPTIONS)
+set(GIPWEBGL_FT_DISABLED_OPTIONS
+	FT_CONFIG_OPTION_USE_BZIP2
+	FT_CONFIG_OPTION_USE_PNG
+	FT_CONFIG_OPTION_USE_HARFBUZZ
+	FT_CONFIG_OPTION_USE_BROTLI
+	TT_CONFIG_OPTION_BDF
+)
+list(FIND GIPWEBGL_FREETYPE_MODULES gzip gzip_index)
+if(gzip_index EQUAL -1)
+	list(APPEND GIPWEBGL_FT_DISABLED_OPTIONS FT_CONFIG_OPTION_USE_ZLIB)
+endif()
+list(FIND GIPWEBGL_FREETYPE_MODULES lzw lzw_index)
+if(lzw_index EQUAL -1)
+	list(APPEND GIPWEBGL_FT_DISABLED_OPTIONS FT_CONFIG_OPTION_USE_LZW)
+endif()
+foreach(option ${GIPWEBGL_FT_DISABLED_OPTIONS})
+	string(REGEX REPLACE "\n#define +(${option})" "\n/* #undef \\1 */"
+			GIPWEBGL_FT_OPTIONS "${GIPWEBGL_FT_OPTIONS}")
+endforeach()
+
+file(WRITE ${CMAKE_BINARY_DIR}/freetype-web/ftoption.h.in "${GIPWEBGL_FT_OPTIONS}")
+configure_file(${CMAKE_BINARY_DIR}/freetype-web/ftoption.h.in
+		${GIPWEBGL_FT_CONFIG_DIR}/gipwebgl/ftoption.h COPYONLY)
+
+add_library(freetype STATIC EXCLUDE_FROM_ALL ${GIPWEBGL_FT_SRCS})
+target_include_directories(freetype
+		PRIVATE ${GIPWEBGL_FT_CONFIG_DIR}
+		PUBLIC ${GIPWEBGL_FREETYPE_DIR}/include
+)
+target_compile_definitions(freetype PRIVATE
+		FT2_BUILD_LIBRARY
+		"FT_CONFIG_MODULES_H=<gipwebgl/ftmodule.h>"
+		"FT_CONFIG_OPTIONS_H=<gipwebgl/ftoption.h>"
+)
@@ -0,0 +1,9 @@
+##### SQLITE #####
+# Defines the sqlite3 target for the plugin and cmake/deps from the bundled
+# amalgamation. GIPWEBGL_SQLITE_DEFINITIONS holds the compile options of the
+# SQLite profile selected by project_builder.py, empty for the full profile.
+
+set(GIPWEBGL_SQLITE_DEFINITIONS "" CACHE STRING "SQLite compile-time options")
+
+add_library(sqlite3 STATIC EXCLUDE_FROM_ALL ${PLUGIN_DIR}/libs/sqlite3.c)
+target_compile_definitions(sqlite3 PRIVATE ${GIPWEBGL_SQLITE_DEFINITIONS})
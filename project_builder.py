@@ -6,206 +6,3415 @@ import shutil
 import zipfile
 from pathlib import Path
 import platform
+import hashlib
+import argparse
+import fnmatch
+import contextlib
+import concurrent.futures
+import time
+import shlex
+import threading
+import bisect
+import select
+import socket
+import queue
+import functools
+import struct
+import re
+import zlib
 
 import json
 
-def copy_assets(project_path, build_dir):
-    """Copy assets to build directory for Emscripten to pack."""
+# Directory of this script, the gipWebGL plugin root
+PLUGIN_DIR = Path(__file__).resolve().parent
+
+# Written next to CMakeCache.txt after a successful configure
+CONFIGURE_STAMP_NAME = "gipwebgl_configure.json"
+
+# Marks a complete entry in the shared dependency cache
+DEPS_MANIFEST_NAME = "gipwebgl_deps.cmake"
+
+# Passed by CMake's compiler launcher to run a compile through this script
+COMPILER_LAUNCHER_FLAG = "--compiler-launcher"
+
+# Per-build hit/miss records written by the compiler launchers
+CCACHE_LOG_NAME = "gipwebgl_ccache.log"
+DEFAULT_CCACHE_SIZE = "5G"
+COMPILER_SOURCE_EXTENSIONS = {".c", ".cc", ".cpp", ".cxx", ".c++", ".m", ".mm"}
+PREPROCESSOR_ONLY_PREFIXES = ("-I", "-D", "-U", "-MF", "-MT", "-MQ", "-isystem")
+
+# Written into the build directory by every run
+BUILD_TRACE_NAME = "build_trace.json"
+PROFILE_NAME = "builder.prof"
+
+# Passed by CMake's linker launcher, only records timings
+LINKER_LAUNCHER_FLAG = "--linker-launcher"
+# CMAKE_<LANG>_LINKER_LAUNCHER, which reports undefined symbols of dropped
+# dependencies, needs this CMake version
+MIN_LINKER_LAUNCHER_CMAKE = (3, 21)
+
+# Step timings of Makefile builds, written in .ninja_log format by the launchers
+TIMING_LOG_NAME = "gipwebgl_steps.log"
+DEFAULT_SLOWEST_STEPS = 10
+
+# Watch mode settings
+WATCH_DEBOUNCE = 0.3
+WATCH_POLL_INTERVAL = 0.5
+WATCH_IGNORED_DIRS = {"build", "Build", "Debug", "Release", "__pycache__", "node_modules"}
+WATCH_SOURCE_EXTENSIONS = {".c", ".cc", ".cpp", ".cxx", ".h", ".hh", ".hpp", ".hxx", ".inl",
+                           ".glsl", ".vert", ".frag", ".vs", ".fs"}
+
+# Unix socket of the optional build daemon, inside ./build
+DAEMON_SOCKET_NAME = ".gipwebgl-daemon.sock"
+
+# Cached tool paths and probe results, inside the cache root
+TOOL_CACHE_NAME = "tool_cache.json"
+
+# Optional per-project builder settings, in the project root
+PROJECT_CONFIG_NAME = "gipwebgl.json"
+# Sections of the settings, each a JSON object, and those holding asset rules
+PROJECT_CONFIG_SECTIONS = ["assimp", "freetype", "sqlite", "dependencies",
+                           "textures", "models", "fonts", "audio", "bundles"]
+PROJECT_CONFIG_RULE_SECTIONS = ["textures", "models", "fonts", "audio", "bundles"]
+# Settings that list names, as (section, key, what they name, whether "all"
+# is accepted). A lone name would otherwise be taken letter by letter
+PROJECT_CONFIG_NAME_LISTS = [
+    ("assimp", "importers", "format names", True),
+    ("assimp", "exporters", "format names", True),
+    ("sqlite", "definitions", "strings", False),
+    ("freetype", "modules", "module names", False),
+    ("dependencies", "keep", "dependency names", False),
+]
+
+# Model file extensions and the assimp importer that reads them
+ASSIMP_IMPORTER_EXTENSIONS = {
+    ".3d": "3D", ".3ds": "3DS", ".3mf": "3MF", ".ac": "AC", ".ac3d": "AC", ".acc": "AC",
+    ".amf": "AMF", ".ase": "ASE", ".ask": "ASE", ".assbin": "ASSBIN", ".b3d": "B3D",
+    ".blend": "BLEND", ".bvh": "BVH", ".cob": "COB", ".csm": "CSM", ".dae": "COLLADA",
+    ".zae": "COLLADA", ".dxf": "DXF", ".enff": "NFF", ".fbx": "FBX", ".glb": "GLTF",
+    ".gltf": "GLTF", ".hmp": "HMP", ".ifc": "IFC", ".ifczip": "IFC", ".irr": "IRR",
+    ".irrmesh": "IRRMESH", ".lwo": "LWO", ".lws": "LWS", ".lxo": "LWO", ".m3d": "M3D",
+    ".md2": "MD2", ".md3": "MD3", ".md5anim": "MD5", ".md5camera": "MD5", ".md5mesh": "MD5",
+    ".mdc": "MDC", ".mdl": "MDL", ".mesh": "OGRE", ".ms3d": "MS3D", ".ndo": "NDO",
+    ".nff": "NFF", ".obj": "OBJ", ".off": "OFF", ".ogex": "OPENGEX", ".pk3": "Q3BSP",
+    ".ply": "PLY", ".pmx": "MMD", ".q3o": "Q3D", ".q3s": "Q3D", ".raw": "RAW", ".sib": "SIB",
+    ".smd": "SMD", ".stl": "STL", ".ter": "TERRAGEN", ".vta": "SMD", ".x": "X",
+    ".x3d": "X3D", ".x3db": "X3D", ".xgl": "XGL", ".zgl": "XGL",
+}
+
+# FreeType modules of the web profile (see cmake/freetype.cmake), projects can add more
+FREETYPE_WEB_MODULES = ("truetype", "cff", "sfnt", "smooth")
+FREETYPE_MODULE_DEPENDENCIES = {
+    "truetype": ("sfnt",),
+    "cff": ("sfnt", "psaux", "pshinter", "psnames"),
+    "type1": ("psaux", "pshinter", "psnames"),
+    "t1cid": ("psaux", "pshinter", "psnames"),
+    "t42": ("truetype", "psaux", "psnames"),
+    "autofit": (), "pfr": (), "winfonts": (), "pcf": (), "bdf": (), "sfnt": (),
+    "psaux": ("psnames",), "psnames": (), "pshinter": (), "smooth": (), "raster": (),
+    "sdf": (), "svg": (), "gzip": (), "lzw": (), "cache": (),
+}
+
+# SQLite compile options per profile. "full", the default, keeps SQLite's
+# defaults, "minimal" is opt-in because it changes behavior. Only
+# options that are safe with the prebuilt amalgamation are used.
+SQLITE_PROFILES = {
+    "minimal": (
+        "SQLITE_THREADSAFE=0",
+        "SQLITE_DEFAULT_MEMSTATUS=0",
+        "SQLITE_LIKE_DOESNT_MATCH_BLOBS",
+        "SQLITE_MAX_EXPR_DEPTH=0",
+        "SQLITE_OMIT_DEPRECATED",
+        "SQLITE_OMIT_DECLTYPE",
+        "SQLITE_OMIT_LOAD_EXTENSION",
+        "SQLITE_OMIT_PROGRESS_CALLBACK",
+        "SQLITE_OMIT_SHARED_CACHE",
+    ),
+    "full": (),
+}
+DEFAULT_SQLITE_PROFILE = "full"
+
+# Per-profile .wasm sizes and sqlite3.c compile times of a project
+SQLITE_STATS_NAME = "gipwebgl_sqlite_profiles.json"
+
+# Build statistics stored with a dependency cache entry
+DEPS_STATS_NAME = "gipwebgl_deps_stats.json"
+
+# Headers that show a project uses a bundled dependency, directly or through
+# the engine classes that wrap it. Entries ending in / match include prefixes.
+DEPENDENCY_INCLUDE_PATTERNS = {
+    "assimp": ("assimp/", "gModel.h", "gSkinnedMesh.h"),
+    "freetype": ("ft2build.h", "freetype/", "gFont.h"),
+    "sqlite3": ("sqlite3.h", "gDatabase.h"),
+}
+INCLUDE_PATTERN = re.compile(r'^\s*#\s*include\s*[<"]([^>"]+)[>"]', re.MULTILINE)
+
+# Undefined symbols that belong to each dependency, as wasm-ld reports them
+DEPENDENCY_SYMBOL_PATTERNS = {
+    "assimp": (r"Assimp::", r"ai[A-Z]"),
+    "freetype": (r"FT_", r"FTC_", r"ft_"),
+    "sqlite3": (r"sqlite3",),
+}
+UNDEFINED_SYMBOL_PATTERN = re.compile(r"undefined symbol: (.+)")
+
+# Dependencies a link proved necessary, kept in the build directory
+DEPENDENCY_STATE_NAME = "gipwebgl_dependencies.json"
+UNDEFINED_LOG_NAME = "gipwebgl_undefined.log"
+
+# Staged asset state of the last sync, in the build directory
+ASSET_INDEX_NAME = "gipwebgl_assets.json"
+
+# Linux ioctl that clones a file's extents (reflink)
+FICLONE = 0x40049409
+ASSET_STAGING_MODES = ("auto", "reflink", "hardlink", "copy")
+
+# Staging is bound by syscall latency, so use more threads than cores
+DEFAULT_ASSET_JOBS = min(32, (os.cpu_count() or 1) * 4)
+MAX_REPORTED_ASSET_ERRORS = 10
+
+# Texture pipeline, bump the version when its output changes
+TEXTURE_EXTENSIONS = {".png", ".jpg", ".jpeg"}
+TEXTURE_PIPELINE_VERSION = 2
+# Pillow format names of the texture pipeline's output extensions
+TEXTURE_FORMATS = {".png": "PNG", ".jpg": "JPEG", ".jpeg": "JPEG", ".webp": "WEBP"}
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+PNG_RENDERING_CHUNKS = {b"tRNS", b"gAMA", b"cHRM", b"sRGB", b"iCCP", b"sBIT"}
+
+# GPU-compressed KTX2 textures staged next to the originals as <name>.<variant>.ktx2:
+# vkFormat, bytes per 4x4 block, DFD color model and (bit offset, channel) samples
+KTX2_IDENTIFIER = b"\xabKTX 20\xbb\r\n\x1a\n"
+KTX2_VARIANTS = {
+    "bc1": (131, 8, 128, [(0, 0)]),             # VK_FORMAT_BC1_RGB_UNORM_BLOCK
+    "bc3": (137, 16, 130, [(0, 15), (64, 0)]),  # VK_FORMAT_BC3_UNORM_BLOCK
+    "etc1": (147, 8, 161, [(0, 2)]),            # VK_FORMAT_ETC2_R8G8B8_UNORM_BLOCK
+}
+KTX2_FAMILIES = ("s3tc", "etc1")
+ETC1_MODIFIERS = ((2, 8), (5, 17), (9, 29), (13, 42), (18, 60), (24, 80), (33, 106), (47, 183))
+
+# Native asset tools built from tools/host with the host compiler, and the
+# dependency checkouts each one compiles in
+HOST_TOOLS_DIR = PLUGIN_DIR / "tools" / "host"
+HOST_TOOL_SOURCES = {
+    "gipmeshconv": ("gipmeshconv.cpp", "../../src/gWebMeshFormat.h"),
+    "gipsdfgen": ("gipsdfgen.cpp", "../../src/gWebSdfFontFormat.h", "../../cmake/freetype.cmake"),
+}
+HOST_TOOL_DEPENDENCIES = {
+    "gipmeshconv": ("assimp",),
+    "gipsdfgen": ("freetype",),
+}
+HOST_TOOL_MANIFEST_NAME = "gipwebgl_host_tool-Release.txt"
+
+# Model pipeline, models are converted to <name>.gmesh for gWebMesh
+MESH_EXTENSION = ".gmesh"
+MODEL_PIPELINE_VERSION = 1
+
+# Font subsetting, fonts keep the glyphs of the characters a project uses
+FONT_EXTENSIONS = {".ttf", ".otf"}
+FONT_TEXT_EXTENSIONS = {".txt", ".json", ".csv", ".xml", ".ini", ".html", ".md"}
+FONT_PIPELINE_VERSION = 1
+STRING_LITERAL_PATTERN = re.compile(r'"((?:[^"\\\n]|\\.)*)"')
+UNICODE_ESCAPE_PATTERN = re.compile(r"\\u([0-9a-fA-F]{4})|\\U([0-9a-fA-F]{8})")
+
+# Signed distance field atlases staged next to fonts as <name>.<size>.gsdf for gWebSdfFont
+SDF_FONT_EXTENSION = ".gsdf"
+DEFAULT_SDF_SIZE = 48
+DEFAULT_SDF_SPREAD = 8
+# Spreads FreeType's sdf renderer accepts
+SDF_SPREAD_RANGE = (2, 32)
+
+# Audio transcoding with ffmpeg: extension appended to the staged name, encoder, container
+# and default bitrate per format, all decodable by the browsers' decodeAudioData
+AUDIO_EXTENSIONS = {".wav", ".aif", ".aiff", ".flac"}
+AUDIO_FORMATS = {
+    "mp3": (".mp3", "libmp3lame", "mp3", "128k"),
+    "aac": (".m4a", "aac", "ipod", "128k"),
+    "ogg": (".ogg", "libvorbis", "ogg", "128k"),
+}
+DEFAULT_AUDIO_FORMAT = "mp3"
+AUDIO_PIPELINE_VERSION = 1
+
+# Asset bundles: assets no bundle rule selects are preloaded with the app
+# as the boot bundle, named bundles are packed apart by file_packager
+BOOT_BUNDLE = "boot"
+BUNDLE_NAME_PATTERN = re.compile(r"^[A-Za-z0-9_-]+$")
+BUNDLES_DIR_NAME = "bundles"
+BUNDLE_STATE_NAME = "gipwebgl_bundles.json"
+BUNDLE_MANIFEST_NAME = "gipwebgl_bundles.js"
+BUNDLE_LOADER_PATH = PLUGIN_DIR / "src" / "gWebBundleLoader.js"
+# Keeps asset packages in IndexedDB for --cache-assets builds
+ASSET_CACHE_SCRIPT_PATH = PLUGIN_DIR / "src" / "gWebAssetCache.js"
+# Runtime methods the package scripts of file_packager call on Module
+BUNDLE_RUNTIME_METHODS = ("addRunDependency", "removeRunDependency", "FS_createPath",
+                          "FS_createDataFile", "FS_createPreloadedFile")
+
+# Batch builds give every project at least this many build tool jobs
+MIN_JOBS_PER_PROJECT = 4
+
+class BuildTrace:
+    """Per-phase wall, CPU and child-process timings in Chrome trace-event format."""
+
+    def __init__(self):
+        self.events = []
+        self.origin_epoch = time.time()
+        self.origin_perf = time.perf_counter()
+
+    def timestamp_us(self, perf_time):
+        """Convert a perf_counter value to epoch microseconds, comparable across processes."""
+        return (self.origin_epoch + (perf_time - self.origin_perf)) * 1e6
+
+    @contextlib.contextmanager
+    def phase(self, name, category="builder"):
+        """Record the time spent inside the block as one complete event."""
+        start_wall = time.perf_counter()
+        start_cpu = time.process_time()
+        start_times = os.times()
+        try:
+            yield
+        finally:
+            end_wall = time.perf_counter()
+            end_times = os.times()
+            child_cpu = ((end_times.children_user - start_times.children_user) +
+                         (end_times.children_system - start_times.children_system))
+            self.events.append({
+                "name": name,
+                "cat": category,
+                "ph": "X",
+                "ts": self.timestamp_us(start_wall),
+                "dur": (end_wall - start_wall) * 1e6,
+                "pid": os.getpid(),
+                "tid": threading.get_ident(),
+                "args": {
+                    "wall_ms": round((end_wall - start_wall) * 1000, 3),
+                    "cpu_ms": round((time.process_time() - start_cpu) * 1000, 3),
+                    "child_cpu_ms": round(child_cpu * 1000, 3),
+                },
+            })
+
+    def write(self, trace_path, label, extra_events=()):
+        """Write the trace as JSON that chrome://tracing and Perfetto can open."""
+        metadata = [{
+            "name": "process_name",
+            "ph": "M",
+            "pid": os.getpid(),
+            "args": {"name": label},
+        }]
+        with open(trace_path, "w") as f:
+            json.dump({
+                "traceEvents": metadata + self.events + list(extra_events),
+                "displayTimeUnit": "ms",
+            }, f)
+
+    def print_summary(self):
+        """Print the recorded phases, in the order they finished."""
+        if not self.events:
+            return
+        print("\nPhase timings (wall / cpu / child cpu):")
+        name_width = max(len(event["name"]) for event in self.events)
+        for event in self.events:
+            phase_args = event["args"]
+            print(f"  {event['name']:<{name_width}}  {phase_args['wall_ms'] / 1000:8.2f}s"
+                  f"  {phase_args['cpu_ms'] / 1000:8.2f}s  {phase_args['child_cpu_ms'] / 1000:8.2f}s")
+
+# Trace of the current build, set by start_build_trace()
+_build_trace = None
+
+def start_build_trace():
+    """Start recording phase timings for this process."""
+    global _build_trace
+    _build_trace = BuildTrace()
+    return _build_trace
+
+def trace_phase(name, category="builder"):
+    """Time a phase of the build if a trace is being recorded."""
+    if _build_trace is None:
+        return contextlib.nullcontext()
+    return _build_trace.phase(name, category)
+
+def read_trace_events(trace_path):
+    """Load the events of a previously written trace, skipping metadata."""
+    try:
+        with open(trace_path, "r") as f:
+            return json.load(f).get("traceEvents", [])
+    except (OSError, ValueError):
+        return []
+
+# Tool probe results, loaded from and saved to the tool cache file
+_tool_cache = None
+_tool_cache_lock = threading.Lock()
+
+def get_tool_cache_path():
+    """Return the JSON file holding cached tool probes."""
+    return get_cache_dir("tools") / TOOL_CACHE_NAME
+
+def load_tool_cache():
+    """Load the tool cache once per process."""
+    global _tool_cache
+    with _tool_cache_lock:
+        if _tool_cache is None:
+            try:
+                with open(get_tool_cache_path(), "r") as f:
+                    _tool_cache = json.load(f)
+            except (OSError, ValueError):
+                _tool_cache = {}
+            _tool_cache.setdefault("probes", {})
+            _tool_cache.setdefault("tools", {})
+        return _tool_cache
+
+def save_tool_cache():
+    """Write the tool cache atomically, concurrent builders simply race to replace it."""
+    cache_path = get_tool_cache_path()
+    with _tool_cache_lock:
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            temp_path = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+            with open(temp_path, "w") as f:
+                json.dump(_tool_cache, f, indent=2)
+            os.replace(temp_path, cache_path)
+        except OSError as e:
+            print(f"WARNING: Could not write tool cache: {e}")
+
+def get_file_signature(file_path):
+    """Return the (mtime, size) signature of a file, or None if it is missing."""
+    try:
+        stat = os.stat(file_path)
+        return [stat.st_mtime_ns, stat.st_size]
+    except OSError:
+        return None
+
+def probe_tool(command, args=("--version",), check=False, timeout=None, extra_files=()):
+    """Run a tool probe such as 'cmake --version', reusing the cached result.
+
+    Results are keyed on the resolved executable and invalidated when its
+    mtime or size, or those of extra_files, change. Raises FileNotFoundError
+    when the tool does not exist and CalledProcessError when check is set and
+    it fails, like subprocess.run.
+    """
+    executable = shutil.which(str(command))
+    if not executable:
+        raise FileNotFoundError(f"{command} not found")
+    executable = str(Path(executable).absolute())
+
+    key = "|".join([executable] + list(args))
+    signature = [get_file_signature(executable)] + [get_file_signature(f) for f in extra_files]
+    cache = load_tool_cache()
+    entry = cache["probes"].get(key)
+
+    if entry is None or entry["signature"] != signature:
+        result = subprocess.run([executable] + list(args), capture_output=True, text=True, timeout=timeout)
+        entry = {"signature": signature, "returncode": result.returncode,
+                 "stdout": result.stdout, "stderr": result.stderr}
+        with _tool_cache_lock:
+            cache["probes"][key] = entry
+        save_tool_cache()
+
+    if check and entry["returncode"] != 0:
+        raise subprocess.CalledProcessError(entry["returncode"], [executable] + list(args),
+                                            entry["stdout"], entry["stderr"])
+    return subprocess.CompletedProcess([executable] + list(args), entry["returncode"],
+                                       entry["stdout"], entry["stderr"])
+
+def remember_tool(name, tool_path, **details):
+    """Store a resolved tool so later runs can skip discovery."""
+    cache = load_tool_cache()
+    with _tool_cache_lock:
+        cache["tools"][name] = dict(details, path=str(tool_path),
+                                    signature=get_file_signature(shutil.which(str(tool_path)) or tool_path))
+    save_tool_cache()
+
+def recall_tool(name):
+    """Return a previously resolved tool if its executable is unchanged, else None."""
+    entry = load_tool_cache()["tools"].get(name)
+    if not entry:
+        return None
+    executable = shutil.which(entry["path"]) or entry["path"]
+    if entry.get("signature") is None or get_file_signature(executable) != entry["signature"]:
+        return None
+
+    # Tools found outside PATH need their directory on PATH again
+    bin_dir = str(Path(executable).parent)
+    if bin_dir not in os.environ.get('PATH', '').split(os.pathsep):
+        os.environ["PATH"] = f"{bin_dir}{os.pathsep}{os.environ.get('PATH', '')}"
+    return entry
+
+def get_local_emcc_path():
+    """Return the emcc of the local emsdk, or None when there is none."""
+    upstream_emscripten = Path("./emsdk").absolute() / "upstream" / "emscripten"
+    candidates = [upstream_emscripten / "emcc"]
+    if os.name == 'nt':
+        # On Windows, try both emcc.bat and emcc
+        candidates.insert(0, upstream_emscripten / "emcc.bat")
+    for candidate in candidates:
+        if candidate.exists():
+            return candidate
+    return None
+
+def get_emcc_version_files(emcc_path):
+    """Return files whose changes invalidate cached emcc probes."""
+    return [Path(emcc_path).parent / "emscripten-version.txt"]
+
+def prefetch_tool_probes():
+    """Run the tool probes the builder will need concurrently, filling the cache."""
+    emcc = get_local_emcc_path() or shutil.which("emcc")
+    probes = [("cmake", ("--version",), ()), ("ninja", ("--version",), ())]
+    if emcc:
+        version_files = get_emcc_version_files(emcc)
+        probes.append((emcc, ("--version",), version_files))
+        probes.append((emcc, ("--print-sysroot",), version_files))
+
+    def run_probe(probe):
+        command, args, extra_files = probe
+        try:
+            probe_tool(command, args, timeout=30, extra_files=extra_files)
+        except Exception:
+            # The sequential lookups report missing tools themselves
+            pass
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=len(probes)) as executor:
+        list(executor.map(run_probe, probes))
+
+@functools.lru_cache(maxsize=None)
+def find_zbin_platform_dirs():
+    """Return the glist zbin/glistzbin-* directories, globbed once per process."""
+    current_dir = Path.cwd()
+    glist_dir = current_dir.parent.parent  # gipWebGL -> glistplugins -> glist
+    zbin_dir = glist_dir / "zbin"
+    if not zbin_dir.exists():
+        return ()
+    return tuple(d for d in zbin_dir.glob("glistzbin-*") if d.is_dir())
+
+def read_asset_index(index_path):
+    """Return the staged asset index, mapping relative paths to their recorded state."""
+    try:
+        with open(index_path, "r") as f:
+            return json.load(f).get("files", {})
+    except (OSError, ValueError):
+        return {}
+
+def write_asset_index(index_path, files):
+    """Write the staged asset index atomically."""
+    temp_path = index_path.with_name(index_path.name + ".tmp")
+    with open(temp_path, "w") as f:
+        json.dump({"files": files}, f)
+    os.replace(temp_path, index_path)
+
+def scan_asset_files(assets_dir):
+    """Map every file under assets_dir to its (size, mtime_ns), keyed by relative posix path."""
+    files = {}
+    for dirpath, _, filenames in os.walk(assets_dir):
+        for filename in filenames:
+            file_path = Path(dirpath) / filename
+            stat = file_path.stat()
+            files[file_path.relative_to(assets_dir).as_posix()] = (stat.st_size, stat.st_mtime_ns)
+    return files
+
+def is_staged_copy_current(entry, size, mtime_ns, source, target, use_hash):
+    """Return True if the staged target and its extra files still match the source file."""
+    try:
+        if target.stat().st_size != entry.get("staged_size", size):
+            return False
+    except OSError:
+        return False
+    if not all((target.parent / Path(extra).name).exists() for extra in entry.get("extra", [])):
+        return False
+    if entry.get("size") == size and entry.get("mtime_ns") == mtime_ns:
+        return True
+    # Touched but possibly identical, e.g. after a checkout
+    return use_hash and entry.get("sha256") is not None and entry["sha256"] == hash_file(source)
+
+# Staging methods that failed between two devices, so they are not retried per file
+_unsupported_staging = set()
+
+def reflink_file(source, target):
+    """Clone source to the new file target sharing its data blocks, False if unsupported."""
+    if sys.platform.startswith("linux"):
+        import fcntl
+        with open(source, "rb") as src, open(target, "wb") as dst:
+            try:
+                fcntl.ioctl(dst.fileno(), FICLONE, src.fileno())
+            except OSError:
+                pass
+            else:
+                return True
+        target.unlink()
+        return False
+    if sys.platform == "darwin":
+        import ctypes
+        libc = ctypes.CDLL(None, use_errno=True)
+        return libc.clonefile(os.fsencode(source), os.fsencode(target), 0) == 0
+    return False
+
+def stage_file(source, target, mode="auto"):
+    """Stage source at target by reflink, hardlink or copy, returning the method used.
+
+    "auto" reflinks and falls back to copying, both copy-on-write safe.
+    Hardlinks share the source's inode, so an in-place write to the staged
+    file changes the asset too, they are only made when mode is "hardlink".
+    The file is created under a temporary name and moved into place, so an
+    existing target is replaced rather than written through.
+    """
+    temp_path = target.with_name(f".{target.name}.{os.getpid()}.staging")
+    devices = (source.stat().st_dev, target.parent.stat().st_dev)
+    try:
+        method = "copy"
+        if mode in ("auto", "reflink") and ("reflink", devices) not in _unsupported_staging:
+            if reflink_file(source, temp_path):
+                shutil.copystat(source, temp_path)
+                method = "reflink"
+            else:
+                _unsupported_staging.add(("reflink", devices))
+        if method == "copy" and mode == "hardlink" and ("hardlink", devices) not in _unsupported_staging:
+            try:
+                os.link(source, temp_path)
+                method = "hardlink"
+            except OSError:
+                _unsupported_staging.add(("hardlink", devices))
+        if method == "copy":
+            shutil.copy2(source, temp_path)
+        os.replace(temp_path, target)
+        return method
+    finally:
+        if temp_path.exists():
+            temp_path.unlink()
+
+def match_asset_rules(relative, rules):
+    """Merge the rules matching an asset path, later rules override earlier ones.
+
+    A rule's "path" is a glob on the path inside assets/, or a directory
+    prefix when it ends in /. Returns None for files no rule applies to.
+    """
+    settings = None
+    for rule in rules:
+        pattern = rule.get("path", "*")
+        if relative.startswith(pattern) if pattern.endswith("/") else fnmatch.fnmatch(relative, pattern):
+            settings = settings or {}
+            settings.update({key: value for key, value in rule.items() if key != "path"})
+    return settings
+
+def get_texture_settings(relative, rules):
+    """Return the texture pipeline settings of an asset, {} when it is staged as is."""
+    if Path(relative).suffix.lower() not in TEXTURE_EXTENSIONS:
+        return {}
+    settings = match_asset_rules(relative, rules)
+    if settings is None:
+        return {}
+    # Matched images are optimized unless their rule turns it off
+    settings = dict({"optimize": True}, **settings)
+    if not (settings["optimize"] or settings.get("max_size") or settings.get("webp") or settings.get("ktx2")):
+        return {}
+    return settings
+
+def get_texture_target(relative, settings):
+    """Return the staged path of a texture, WebP conversion changes its extension."""
+    if settings.get("webp") and is_pillow_available():
+        return Path(relative).with_suffix(".webp").as_posix()
+    return relative
+
+def iter_png_chunks(data):
+    """Yield (type, body) of every chunk of a PNG file."""
+    offset = len(PNG_SIGNATURE)
+    while offset + 8 <= len(data):
+        length, chunk_type = struct.unpack(">I4s", data[offset:offset + 8])
+        yield chunk_type, data[offset + 8:offset + 8 + length]
+        offset += length + 12
+
+def write_png_chunk(chunk_type, body):
+    """Return one encoded PNG chunk."""
+    return struct.pack(">I", len(body)) + chunk_type + body + struct.pack(">I", zlib.crc32(chunk_type + body))
+
+def optimize_png(data):
+    """Losslessly shrink a PNG by recompressing its image data and dropping metadata.
+
+    The filtered scanlines are kept and deflated again with the best of a
+    few zlib strategies, textual and timestamp chunks are removed. Returns
+    the original bytes when that does not help.
+    """
+    if not data.startswith(PNG_SIGNATURE):
+        return data
+    chunks = list(iter_png_chunks(data))
+    types = {chunk_type for chunk_type, _ in chunks}
+    # Animated PNGs keep frame data outside IDAT, leave them alone
+    if b"acTL" in types or b"IDAT" not in types:
+        return data
+
+    try:
+        raw = zlib.decompress(b"".join(body for chunk_type, body in chunks if chunk_type == b"IDAT"))
+    except zlib.error:
+        return data
+    candidates = []
+    for strategy in (zlib.Z_DEFAULT_STRATEGY, zlib.Z_FILTERED, zlib.Z_RLE):
+        compressor = zlib.compressobj(9, zlib.DEFLATED, 15, 9, strategy)
+        candidates.append(compressor.compress(raw) + compressor.flush())
+    image_data = min(candidates, key=len)
+
+    output = [PNG_SIGNATURE]
+    wrote_image_data = False
+    for chunk_type, body in chunks:
+        if chunk_type == b"IDAT":
+            if not wrote_image_data:
+                output.append(write_png_chunk(b"IDAT", image_data))
+                wrote_image_data = True
+        elif chunk_type[0:1].isupper() or chunk_type in PNG_RENDERING_CHUNKS:
+            output.append(write_png_chunk(chunk_type, body))
+    optimized = b"".join(output)
+    return optimized if len(optimized) < len(data) else data
+
+def transform_texture(data, settings, output_suffix):
+    """Downscale and re-encode an image with Pillow, None when Pillow is not installed.
+
+    Images that need neither downscaling nor a new format are returned
+    unchanged, so they never go through another lossy encode.
+    """
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        return None
+    import io
+
+    image = Image.open(io.BytesIO(data))
+    max_size = settings.get("max_size")
+    resize = bool(max_size and max(image.size) > max_size)
+    if not resize and TEXTURE_FORMATS.get(output_suffix) == image.format:
+        return data
+    # Re-encoding drops EXIF, so apply its orientation to the pixels first
+    image = ImageOps.exif_transpose(image)
+    if resize:
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+
+    output = io.BytesIO()
+    if output_suffix == ".webp":
+        quality = settings.get("webp_quality")
+        if quality is None:
+            image.save(output, "WEBP", lossless=True, method=6)
+        else:
+            image.save(output, "WEBP", quality=quality, method=6)
+    elif output_suffix == ".png":
+        image.save(output, "PNG", optimize=True)
+    else:
+        if image.mode not in ("RGB", "L"):
+            image = image.convert("RGB")
+        image.save(output, "JPEG", quality=settings.get("jpeg_quality", 90), optimize=True)
+    return output.getvalue()
+
+@functools.lru_cache(maxsize=None)
+def is_pillow_available():
+    """Return True if Pillow can be imported for downscaling and WebP."""
+    try:
+        import PIL  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+@functools.lru_cache(maxsize=None)
+def warn_missing_pillow():
+    """Tell once per run that texture rules need Pillow."""
+    print("WARNING: Pillow is not installed, texture downscaling and WebP "
+          "conversion are skipped (pip install Pillow)")
+
+def process_texture(source, relative, settings):
+    """Return the cached output of the texture pipeline for an image, creating it on a miss.
+
+    Outputs are keyed by the source content, the settings and whether Pillow
+    is available, so unchanged images are never processed twice. Returns
+    (output_path, from_cache).
+    """
+    target_suffix = Path(get_texture_target(relative, settings)).suffix.lower()
+    needs_pillow = bool(settings.get("max_size") or settings.get("webp"))
+    pillow = needs_pillow and is_pillow_available()
+    key_inputs = {
+        "source": hash_file(source),
+        "settings": settings,
+        "pillow": pillow,
+        "version": TEXTURE_PIPELINE_VERSION,
+    }
+    key = hashlib.sha256(json.dumps(key_inputs, sort_keys=True).encode("utf-8")).hexdigest()
+    output_path = get_cache_dir("textures") / key[:2] / f"{key}{target_suffix}"
+    if output_path.exists():
+        return output_path, True
+
+    if needs_pillow and not pillow:
+        warn_missing_pillow()
+
+    with open(source, "rb") as f:
+        data = f.read()
+    if pillow:
+        data = transform_texture(data, settings, target_suffix)
+    if settings.get("optimize", True) and target_suffix == ".png":
+        data = optimize_png(data)
+
+    # Written under a temporary name so concurrent builders never see a partial file
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(temp_path, "wb") as f:
+        f.write(data)
+    os.replace(temp_path, output_path)
+    return output_path, False
+
+def decode_png_rgba(data):
+    """Decode an 8-bit, non-interlaced PNG to (width, height, RGBA bytes), None otherwise."""
+    if not data.startswith(PNG_SIGNATURE):
+        return None
+    chunks = list(iter_png_chunks(data))
+    header = dict(chunks).get(b"IHDR")
+    if not header:
+        return None
+    width, height, bit_depth, color_type, _, _, interlace = struct.unpack(">IIBBBBB", header)
+    channels = {0: 1, 2: 3, 3: 1, 4: 2, 6: 4}.get(color_type)
+    if bit_depth != 8 or interlace or channels is None:
+        return None
+
+    raw = zlib.decompress(b"".join(body for chunk_type, body in chunks if chunk_type == b"IDAT"))
+    stride = width * channels
+    previous = bytearray(stride)
+    pixels = bytearray()
+    for y in range(height):
+        offset = y * (stride + 1)
+        filter_type = raw[offset]
+        row = bytearray(raw[offset + 1:offset + 1 + stride])
+        if filter_type == 1:
+            for i in range(channels, stride):
+                row[i] = (row[i] + row[i - channels]) & 0xFF
+        elif filter_type == 2:
+            for i in range(stride):
+                row[i] = (row[i] + previous[i]) & 0xFF
+        elif filter_type == 3:
+            for i in range(stride):
+                left = row[i - channels] if i >= channels else 0
+                row[i] = (row[i] + ((left + previous[i]) >> 1)) & 0xFF
+        elif filter_type == 4:
+            for i in range(stride):
+                left = row[i - channels] if i >= channels else 0
+                up = previous[i]
+                up_left = previous[i - channels] if i >= channels else 0
+                estimate = left + up - up_left
+                distances = (abs(estimate - left), abs(estimate - up), abs(estimate - up_left))
+                if distances[0] <= distances[1] and distances[0] <= distances[2]:
+                    predictor = left
+                elif distances[1] <= distances[2]:
+                    predictor = up
+                else:
+                    predictor = up_left
+                row[i] = (row[i] + predictor) & 0xFF
+        pixels += row
+        previous = row
+
+    count = width * height
+    if color_type == 6:
+        return width, height, pixels
+    rgba = bytearray(b"\xff" * (count * 4))
+    if color_type == 2:
+        for channel in range(3):
+            rgba[channel::4] = pixels[channel::3]
+    elif color_type in (0, 4):
+        gray = pixels[0::channels]
+        for channel in range(3):
+            rgba[channel::4] = gray
+        if color_type == 4:
+            rgba[3::4] = pixels[1::2]
+    else:
+        chunk_map = dict(chunks)
+        palette = chunk_map.get(b"PLTE", b"")
+        alpha = chunk_map.get(b"tRNS", b"")
+        table = [palette[i * 3:i * 3 + 3] + bytes([alpha[i] if i < len(alpha) else 255])
+                 for i in range(len(palette) // 3)]
+        table += [b"\x00\x00\x00\xff"] * (256 - len(table))
+        rgba = bytearray(b"".join(table[index] for index in pixels))
+    return width, height, rgba
+
+def decode_image_rgba(image_path):
+    """Decode an image to (width, height, RGBA bytes) with Pillow or the PNG decoder."""
+    if is_pillow_available():
+        from PIL import Image
+        with Image.open(image_path) as image:
+            image = image.convert("RGBA")
+            return image.width, image.height, bytearray(image.tobytes())
+    with open(image_path, "rb") as f:
+        return decode_png_rgba(f.read())
+
+def downsample_rgba(width, height, rgba):
+    """Halve an RGBA image with a 2x2 box filter for the next mip level."""
+    new_width, new_height = max(1, width // 2), max(1, height // 2)
+    output = bytearray(new_width * new_height * 4)
+    for y in range(new_height):
+        row0 = min(2 * y, height - 1) * width * 4
+        row1 = min(2 * y + 1, height - 1) * width * 4
+        for x in range(new_width):
+            col0 = min(2 * x, width - 1) * 4
+            col1 = min(2 * x + 1, width - 1) * 4
+            out = (y * new_width + x) * 4
+            for c in range(4):
+                output[out + c] = (rgba[row0 + col0 + c] + rgba[row0 + col1 + c] +
+                                   rgba[row1 + col0 + c] + rgba[row1 + col1 + c] + 2) >> 2
+    return new_width, new_height, output
+
+def iter_blocks(width, height, rgba):
+    """Yield the 16 (r, g, b, a) texels of every 4x4 block in row order, clamping at edges."""
+    for block_y in range(0, height, 4):
+        for block_x in range(0, width, 4):
+            texels = []
+            for y in range(4):
+                row = min(block_y + y, height - 1) * width
+                for x in range(4):
+                    offset = (row + min(block_x + x, width - 1)) * 4
+                    texels.append(tuple(rgba[offset:offset + 4]))
+            yield texels
+
+def pack_rgb565(color):
+    """Quantize an (r, g, b) color to RGB565."""
+    r, g, b = color
+    return ((r * 31 + 127) // 255) << 11 | ((g * 63 + 127) // 255) << 5 | ((b * 31 + 127) // 255)
+
+def unpack_rgb565(value):
+    """Expand an RGB565 color to 8 bits per channel."""
+    r, g, b = (value >> 11) & 31, (value >> 5) & 63, value & 31
+    return (r << 3 | r >> 2, g << 2 | g >> 4, b << 3 | b >> 2)
+
+def encode_bc1_color_block(texels):
+    """Encode the colors of a block as an opaque, 4-color BC1 block."""
+    channels = [[texel[c] for texel in texels] for c in range(3)]
+    high = [max(values) for values in channels]
+    low = [min(values) for values in channels]
+    # Inset the box so the endpoints are not wasted on outliers
+    for c in range(3):
+        inset = (high[c] - low[c]) // 16
+        high[c] -= inset
+        low[c] += inset
+    # The bounding box diagonal runs the other way for channels anti-correlated with green
+    means = [sum(values) / 16 for values in channels]
+    for c in (0, 2):
+        covariance = sum((channels[c][i] - means[c]) * (channels[1][i] - means[1]) for i in range(16))
+        if covariance < 0:
+            high[c], low[c] = low[c], high[c]
+
+    color0, color1 = pack_rgb565(high), pack_rgb565(low)
+    if color0 < color1:
+        color0, color1 = color1, color0
+    if color0 == color1:
+        return struct.pack("<HHI", color0, color1, 0)
+
+    end0, end1 = unpack_rgb565(color0), unpack_rgb565(color1)
+    axis = [end0[c] - end1[c] for c in range(3)]
+    length = sum(a * a for a in axis) or 1
+    indices = 0
+    for i, texel in enumerate(texels):
+        t = sum((texel[c] - end1[c]) * axis[c] for c in range(3)) / length
+        # Palette order is color0, color1, 2/3 color0, 1/3 color0
+        index = 0 if t > 5 / 6 else 2 if t > 1 / 2 else 3 if t > 1 / 6 else 1
+        indices |= index << (2 * i)
+    return struct.pack("<HHI", color0, color1, indices)
+
+def encode_bc3_alpha_block(texels):
+    """Encode the alpha of a block as a BC3 (DXT5) alpha block with 8 interpolated levels."""
+    alphas = [texel[3] for texel in texels]
+    alpha0, alpha1 = max(alphas), min(alphas)
+    indices = 0
+    if alpha0 != alpha1:
+        for i, alpha in enumerate(alphas):
+            level = round((alpha - alpha1) * 7 / (alpha0 - alpha1))
+            index = 0 if level == 7 else 1 if level == 0 else 8 - level
+            indices |= index << (3 * i)
+    return struct.pack("<BB", alpha0, alpha1) + indices.to_bytes(6, "little")
+
+def encode_etc1_subblock(texels, base):
+    """Pick the ETC1 modifier table and per-texel selectors for a subblock.
+
+    Returns (error, table, selectors). Selectors choose the modifier nearest to
+    a texel's mean offset from the base color.
+    """
+    base_r, base_g, base_b = base
+    offsets = [(r + g + b - base_r - base_g - base_b) / 3 for r, g, b, _ in texels]
+    best = None
+    for table, (small, large) in enumerate(ETC1_MODIFIERS):
+        threshold = (small + large) / 2
+        error = 0
+        selectors = []
+        for (r, g, b, _), offset in zip(texels, offsets):
+            # Selectors 0 and 1 add the small and large modifier, 2 and 3 subtract them
+            if offset >= 0:
+                selector, modifier = (1, large) if offset > threshold else (0, small)
+            else:
+                selector, modifier = (3, -large) if -offset > threshold else (2, -small)
+            selectors.append(selector)
+            error += ((r - min(255, max(0, base_r + modifier))) ** 2 +
+                      (g - min(255, max(0, base_g + modifier))) ** 2 +
+                      (b - min(255, max(0, base_b + modifier))) ** 2)
+            if best is not None and error >= best[0]:
+                break
+        if best is None or error < best[0]:
+            best = (error, table, selectors)
+    return best
+
+def encode_etc1_block(texels):
+    """Encode an opaque block as ETC1, trying both subblock orientations."""
+    best = None
+    for flip in (0, 1):
+        # flip 0 splits the block into left and right halves, flip 1 into top and bottom
+        halves = ([], [])
+        for i, texel in enumerate(texels):
+            x, y = i % 4, i // 4
+            halves[(y if flip else x) >= 2].append((x, y, texel))
+        averages = [[sum(t[2][c] for t in half) / 8 for c in range(3)] for half in halves]
+
+        base5 = [[round(value * 31 / 255) for value in average] for average in averages]
+        deltas = [base5[1][c] - base5[0][c] for c in range(3)]
+        differential = all(-4 <= delta <= 3 for delta in deltas)
+        if differential:
+            bases = [[value << 3 | value >> 2 for value in color] for color in base5]
+        else:
+            base4 = [[round(value * 15 / 255) for value in average] for average in averages]
+            bases = [[value << 4 | value for value in color] for color in base4]
+
+        results = [encode_etc1_subblock([t[2] for t in half], base) for half, base in zip(halves, bases)]
+        error = results[0][0] + results[1][0]
+        if best is None or error < best[0]:
+            best = (error, flip, differential, base5 if differential else base4, deltas, halves, results)
+
+    _, flip, differential, colors, deltas, halves, results = best
+    if differential:
+        word = (colors[0][0] << 59 | (deltas[0] & 7) << 56 | colors[0][1] << 51 |
+                (deltas[1] & 7) << 48 | colors[0][2] << 43 | (deltas[2] & 7) << 40)
+    else:
+        word = (colors[0][0] << 60 | colors[1][0] << 56 | colors[0][1] << 52 |
+                colors[1][1] << 48 | colors[0][2] << 44 | colors[1][2] << 40)
+    word |= results[0][1] << 37 | results[1][1] << 34 | int(differential) << 33 | flip << 32
+    for half, (_, _, selectors) in zip(halves, results):
+        for (x, y, _), selector in zip(half, selectors):
+            bit = x * 4 + y
+            word |= (selector >> 1) << (16 + bit) | (selector & 1) << bit
+    return word.to_bytes(8, "big")
+
+def encode_texture_level(width, height, rgba, variant):
+    """Encode one mip level in a KTX2 variant's block format."""
+    if variant == "bc1":
+        return b"".join(encode_bc1_color_block(texels) for texels in iter_blocks(width, height, rgba))
+    if variant == "bc3":
+        return b"".join(encode_bc3_alpha_block(texels) + encode_bc1_color_block(texels)
+                        for texels in iter_blocks(width, height, rgba))
+    return b"".join(encode_etc1_block(texels) for texels in iter_blocks(width, height, rgba))
+
+def write_ktx2(output_path, variant, width, height, levels):
+    """Write block-compressed mip levels, largest first, as a KTX2 file."""
+    vk_format, block_bytes, color_model, samples = KTX2_VARIANTS[variant]
+
+    # Data format descriptor: one basic block describing the 4x4 block layout
+    block_size = 24 + 16 * len(samples)
+    dfd = struct.pack("<7I", 4 + block_size, 0, 2 | block_size << 16,
+                      color_model | 1 << 8 | 1 << 16, 3 | 3 << 8, block_bytes, 0)
+    for bit_offset, channel in samples:
+        dfd += struct.pack("<4I", bit_offset | 63 << 16 | channel << 24, 0, 0, 0xFFFFFFFF)
+
+    level_index_size = 24 * len(levels)
+    dfd_offset = 80 + level_index_size
+    data_offset = dfd_offset + len(dfd)
+
+    # Levels are stored smallest first, each aligned to the block size
+    body = bytearray()
+    offsets = [0] * len(levels)
+    for level in range(len(levels) - 1, -1, -1):
+        padding = -(data_offset + len(body)) % block_bytes
+        body += b"\x00" * padding
+        offsets[level] = data_offset + len(body)
+        body += levels[level]
+
+    header = KTX2_IDENTIFIER + struct.pack("<9I", vk_format, 1, width, height, 0, 0, 1, len(levels), 0)
+    header += struct.pack("<4I2Q", dfd_offset, len(dfd), 0, 0, 0, 0)
+    for offset, data in zip(offsets, levels):
+        header += struct.pack("<3Q", offset, len(data), len(data))
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(temp_path, "wb") as f:
+        f.write(header + dfd + bytes(body))
+    os.replace(temp_path, output_path)
+
+def encode_ktx2_variants(image_path, families):
+    """Return [(variant, path)] of the KTX2 textures of an image, encoding them on a cache miss.
+
+    "s3tc" gives bc1, or bc3 for images with alpha, "etc1" is only made for
+    opaque images. Power-of-two images get a full mip chain. Images whose
+    sides are not multiples of 4 or that cannot be decoded get none.
+    """
+    key_inputs = {"source": hash_file(image_path), "families": sorted(families),
+                  "pillow": is_pillow_available(), "version": TEXTURE_PIPELINE_VERSION}
+    key = hashlib.sha256(json.dumps(key_inputs, sort_keys=True).encode("utf-8")).hexdigest()
+    cache_dir = get_cache_dir("textures") / "ktx2" / key[:2]
+    meta_path = cache_dir / f"{key}.json"
+    try:
+        with open(meta_path, "r") as f:
+            variants = json.load(f)["variants"]
+        return [(variant, cache_dir / f"{key}.{variant}.ktx2") for variant in variants]
+    except (OSError, ValueError, KeyError):
+        pass
+
+    decoded = decode_image_rgba(image_path)
+    variants = []
+    if decoded is None:
+        print(f"Note: {image_path.name} cannot be decoded without Pillow, no KTX2 textures")
+    elif decoded[0] % 4 or decoded[1] % 4:
+        print(f"Note: {image_path.name} is {decoded[0]}x{decoded[1]}, KTX2 textures need sides "
+              f"that are multiples of 4")
+    else:
+        width, height, rgba = decoded
+        has_alpha = rgba[3::4] != b"\xff" * (width * height)
+        if "s3tc" in families:
+            variants.append("bc3" if has_alpha else "bc1")
+        if "etc1" in families and not has_alpha:
+            variants.append("etc1")
+
+        # WebGL 1 only mipmaps power-of-two textures
+        mip_chain = [decoded]
+        if width & (width - 1) == 0 and height & (height - 1) == 0:
+            while mip_chain[-1][0] > 1 or mip_chain[-1][1] > 1:
+                mip_chain.append(downsample_rgba(*mip_chain[-1]))
+        for variant in variants:
+            levels = [encode_texture_level(w, h, pixels, variant) for w, h, pixels in mip_chain]
+            write_ktx2(cache_dir / f"{key}.{variant}.ktx2", variant, width, height, levels)
+
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    with open(meta_path, "w") as f:
+        json.dump({"variants": variants}, f)
+    return [(variant, cache_dir / f"{key}.{variant}.ktx2") for variant in variants]
+
+def get_model_settings(relative, rules):
+    """Return the model pipeline settings of an asset, {} when it is staged as is."""
+    if Path(relative).suffix.lower() not in ASSIMP_IMPORTER_EXTENSIONS:
+        return {}
+    settings = match_asset_rules(relative, rules)
+    if settings is None or not settings.get("convert", True):
+        return {}
+    return {"quantize": settings.get("quantize", True), "keep_source": settings.get("keep_source", False)}
+
+def get_model_inputs(source):
+    """Return the files a model is read from, glTF keeps its buffers in separate files."""
+    inputs = [source]
+    if source.suffix.lower() == ".gltf":
+        import urllib.parse
+        try:
+            with open(source, "r", encoding="utf-8") as f:
+                buffers = json.load(f).get("buffers", [])
+        except (OSError, ValueError, AttributeError):
+            return inputs
+        for buffer in buffers:
+            uri = buffer.get("uri", "") if isinstance(buffer, dict) else ""
+            if uri and not uri.startswith("data:"):
+                inputs.append(source.parent / urllib.parse.unquote(uri))
+    return inputs
+
+def get_model_input_signature(source):
+    """Return the size and mtime of the files a model references besides itself."""
+    signature = []
+    for input_path in get_model_inputs(source)[1:]:
+        try:
+            stat = input_path.stat()
+            signature.append([input_path.name, stat.st_size, stat.st_mtime_ns])
+        except OSError:
+            signature.append([input_path.name, None, None])
+    return signature
+
+def process_model(source, settings, tool):
+    """Return the cached .gmesh conversion of a model, converting it on a miss.
+
+    Outputs are keyed by the contents of the model and the files it
+    references, the settings and the converter build, so unchanged models
+    are never converted twice. Returns (output_path, from_cache).
+    """
+    key_inputs = {
+        "sources": [hash_file(path) if path.exists() else None for path in get_model_inputs(source)],
+        "settings": settings,
+        "tool": tool.parent.parent.name,
+        "version": MODEL_PIPELINE_VERSION,
+    }
+    key = hashlib.sha256(json.dumps(key_inputs, sort_keys=True).encode("utf-8")).hexdigest()
+    output_path = get_cache_dir("models") / key[:2] / f"{key}{MESH_EXTENSION}"
+    if output_path.exists():
+        return output_path, True
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    args = [str(tool)] + ([] if settings["quantize"] else ["--no-quantize"]) + [str(source), str(temp_path)]
+    result = subprocess.run(args, capture_output=True, text=True)
+    if result.returncode != 0:
+        temp_path.unlink(missing_ok=True)
+        raise RuntimeError(f"{tool.name} failed: {result.stderr.strip() or f'exit code {result.returncode}'}")
+    os.replace(temp_path, output_path)
+    return output_path, False
+
+def get_font_settings(relative, rules):
+    """Return the subsetting and SDF atlas settings of a font asset, {} when it is staged as is."""
+    if Path(relative).suffix.lower() not in FONT_EXTENSIONS:
+        return {}
+    settings = match_asset_rules(relative, rules)
+    if settings is None:
+        return {}
+    font_settings = {"subset": bool(settings.get("subset", True)), "characters": settings.get("characters", ""),
+                     "scan": settings.get("scan", True), "ascii": settings.get("ascii", True)}
+    sdf = settings.get("sdf")
+    if sdf:
+        sdf = {} if sdf is True else sdf
+        font_settings["sdf"] = {"sizes": sorted(set(sdf.get("sizes", [DEFAULT_SDF_SIZE]))),
+                                "spread": sdf.get("spread", DEFAULT_SDF_SPREAD),
+                                "keep_font": sdf.get("keep_font", True)}
+    if not font_settings["subset"] and "sdf" not in font_settings:
+        return {}
+    return font_settings
+
+def uses_source_characters(project_config):
+    """Return True if a font rule subsets or renders the characters of the project's sources."""
+    rules = (project_config or {}).get("fonts", {}).get("rules", [])
+    return any((rule.get("subset", True) or rule.get("sdf")) and rule.get("scan", True) for rule in rules)
+
+def decode_string_literal(literal):
+    """Return the text of a C++ string literal's body, resolving escapes."""
+    literal = UNICODE_ESCAPE_PATTERN.sub(lambda m: chr(int(m.group(1) or m.group(2), 16)), literal)
+    return re.sub(r"\\(.)", r"\1", literal)
+
+def scan_text_characters(project_path):
+    """Collect the characters of the project's string literals and text assets."""
+    characters = set()
+    for directory in iter_watched_dirs(project_path):
+        in_assets = directory.relative_to(project_path).parts[:1] == ("assets",)
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            suffix = Path(entry.name).suffix.lower()
+            is_text = in_assets and suffix in FONT_TEXT_EXTENSIONS
+            if not entry.is_file() or not (is_text or (not in_assets and suffix in WATCH_SOURCE_EXTENSIONS)):
+                continue
+            try:
+                with open(entry.path, "r", encoding="utf-8", errors="ignore") as f:
+                    text = f.read()
+            except OSError:
+                continue
+            if is_text:
+                characters.update(text)
+            else:
+                for literal in STRING_LITERAL_PATTERN.findall(text):
+                    characters.update(decode_string_literal(literal))
+    return frozenset(c for c in characters if c.isprintable() or c == " ")
+
+def get_font_characters(settings, scanned_characters):
+    """Return the sorted characters a font keeps glyphs for."""
+    characters = set(settings.get("characters", ""))
+    if settings.get("ascii", True):
+        characters.update(chr(code) for code in range(0x20, 0x7f))
+    if settings.get("scan", True):
+        characters.update(scanned_characters)
+    return "".join(sorted(characters))
+
+@functools.lru_cache(maxsize=None)
+def get_font_subsetter():
+    """Return ("fonttools", None) or ("pyftsubset", path) for the available subsetter, or None."""
+    try:
+        from fontTools import subset  # noqa: F401
+        return ("fonttools", None)
+    except ImportError:
+        pass
+    pyftsubset = shutil.which("pyftsubset")
+    return ("pyftsubset", pyftsubset) if pyftsubset else None
+
+def subset_font(source, output_path, characters, subsetter):
+    """Write a copy of a font reduced to the glyphs of characters."""
+    kind, pyftsubset = subsetter
+    if kind == "fonttools":
+        from fontTools import subset
+        subset_options = subset.Options()
+        subset_options.notdef_outline = True
+        font = subset.load_font(str(source), subset_options)
+        font_subsetter = subset.Subsetter(subset_options)
+        font_subsetter.populate(text=characters)
+        font_subsetter.subset(font)
+        subset.save_font(font, str(output_path), subset_options)
+        return
+
+    text_path = output_path.with_name(output_path.name + ".txt")
+    try:
+        with open(text_path, "w", encoding="utf-8") as f:
+            f.write(characters)
+        result = subprocess.run([pyftsubset, str(source), f"--text-file={text_path}",
+                                 f"--output-file={output_path}", "--notdef-outline"],
+                                capture_output=True, text=True)
+    finally:
+        text_path.unlink(missing_ok=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"pyftsubset failed: {result.stderr.strip() or f'exit code {result.returncode}'}")
+
+def process_font(source, characters, subsetter):
+    """Return the cached subset of a font, subsetting it on a miss.
+
+    Outputs are keyed by the font's content, the characters and the
+    subsetter, so a font is only subset again when one of them changes.
+    Returns (output_path, from_cache).
+    """
+    key_inputs = {
+        "source": hash_file(source),
+        "characters": hashlib.sha256(characters.encode("utf-8")).hexdigest(),
+        "subsetter": subsetter[0],
+        "version": FONT_PIPELINE_VERSION,
+    }
+    key = hashlib.sha256(json.dumps(key_inputs, sort_keys=True).encode("utf-8")).hexdigest()
+    output_path = get_cache_dir("fonts") / key[:2] / f"{key}{source.suffix.lower()}"
+    if output_path.exists():
+        return output_path, True
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        subset_font(source, temp_path, characters, subsetter)
+        # Fonts that lose nothing are kept as they are
+        if temp_path.stat().st_size >= source.stat().st_size:
+            shutil.copy2(source, temp_path)
+        os.replace(temp_path, output_path)
+    finally:
+        temp_path.unlink(missing_ok=True)
+    return output_path, False
+
+def generate_sdf_atlas(source, characters, pixel_size, spread, tool):
+    """Return the cached SDF atlas of a font at one size, rendering it on a miss.
+
+    Atlases are keyed by the font's content, the characters, size, spread
+    and the generator build. Returns (output_path, from_cache).
+    """
+    key_inputs = {
+        "source": hash_file(source),
+        "characters": hashlib.sha256(characters.encode("utf-8")).hexdigest(),
+        "size": pixel_size,
+        "spread": spread,
+        "tool": tool.parent.parent.name,
+    }
+    key = hashlib.sha256(json.dumps(key_inputs, sort_keys=True).encode("utf-8")).hexdigest()
+    output_path = get_cache_dir("fonts") / "sdf" / key[:2] / f"{key}{SDF_FONT_EXTENSION}"
+    if output_path.exists():
+        return output_path, True
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    codepoints_path = temp_path.with_name(temp_path.name + ".txt")
+    try:
+        with open(codepoints_path, "w") as f:
+            f.write("\n".join(str(ord(c)) for c in characters))
+        result = subprocess.run([str(tool), "--size", str(pixel_size), "--spread", str(spread),
+                                 "--codepoints", str(codepoints_path), str(source), str(temp_path)],
+                                capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"{tool.name} failed: {result.stderr.strip() or f'exit code {result.returncode}'}")
+        os.replace(temp_path, output_path)
+    finally:
+        codepoints_path.unlink(missing_ok=True)
+        temp_path.unlink(missing_ok=True)
+    return output_path, False
+
+def get_audio_settings(relative, rules):
+    """Return the transcoding settings of an audio asset, {} when it is staged as is."""
+    if Path(relative).suffix.lower() not in AUDIO_EXTENSIONS:
+        return {}
+    settings = match_asset_rules(relative, rules)
+    if settings is None:
+        return {}
+    audio_format = settings.get("format", DEFAULT_AUDIO_FORMAT)
+    if audio_format == "pcm":
+        return {}
+    return {"format": audio_format, "bitrate": settings.get("bitrate", AUDIO_FORMATS[audio_format][3]),
+            "channels": settings.get("channels"), "sample_rate": settings.get("sample_rate"),
+            "pcm_under": settings.get("pcm_under")}
+
+def get_audio_duration(audio_path):
+    """Return the length of a WAV file in seconds, None for other or unreadable files."""
+    if audio_path.suffix.lower() != ".wav":
+        return None
+    import wave
+    try:
+        with wave.open(str(audio_path), "rb") as f:
+            return f.getnframes() / f.getframerate()
+    except (OSError, EOFError, wave.Error, ZeroDivisionError):
+        return None
+
+@functools.lru_cache(maxsize=None)
+def find_ffmpeg():
+    """Return (path, version line) of ffmpeg, or None when it is not installed."""
+    ffmpeg = shutil.which("ffmpeg")
+    if not ffmpeg:
+        return None
+    try:
+        result = probe_tool(ffmpeg, ("-version",), timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return None
+    if result.returncode != 0:
+        return None
+    return ffmpeg, result.stdout.splitlines()[0] if result.stdout else "unknown"
+
+def find_ffmpeg_encoders(ffmpeg_path):
+    """Return the names of the encoders ffmpeg was built with, empty when it cannot tell."""
+    try:
+        result = probe_tool(ffmpeg_path, ("-hide_banner", "-encoders"), timeout=30)
+    except (OSError, subprocess.SubprocessError):
+        return frozenset()
+    # Encoders follow the legend, one per line after its flags
+    lines = result.stdout.splitlines()
+    start = next((index + 1 for index, line in enumerate(lines) if line.strip().startswith("---")), len(lines))
+    return frozenset(line.split()[1] for line in lines[start:] if len(line.split()) > 1)
+
+def transcode_audio(source, settings, ffmpeg):
+    """Return the cached transcode of an audio file, encoding it with ffmpeg on a miss.
+
+    Outputs are keyed by the source content, the settings and the ffmpeg
+    version. Returns (output_path, from_cache).
+    """
+    extension, encoder, container, _ = AUDIO_FORMATS[settings["format"]]
+    ffmpeg_path, ffmpeg_version = ffmpeg
+    key_inputs = {
+        "source": hash_file(source),
+        "settings": settings,
+        "ffmpeg": ffmpeg_version,
+        "version": AUDIO_PIPELINE_VERSION,
+    }
+    key = hashlib.sha256(json.dumps(key_inputs, sort_keys=True).encode("utf-8")).hexdigest()
+    output_path = get_cache_dir("audio") / key[:2] / f"{key}{extension}"
+    if output_path.exists():
+        return output_path, True
+
+    output_path.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = output_path.with_name(f".{output_path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    args = [ffmpeg_path, "-hide_banner", "-loglevel", "error", "-nostdin", "-y", "-i", str(source),
+            "-vn", "-map_metadata", "-1", "-c:a", encoder, "-b:a", str(settings["bitrate"])]
+    if settings.get("channels"):
+        args.extend(["-ac", str(settings["channels"])])
+    if settings.get("sample_rate"):
+        args.extend(["-ar", str(settings["sample_rate"])])
+    if container == "ipod":
+        # Index up front so the browser can decode without seeking to the end
+        args.extend(["-movflags", "+faststart"])
+    args.extend(["-f", container, str(temp_path)])
+    try:
+        result = subprocess.run(args, capture_output=True, text=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"ffmpeg failed: {result.stderr.strip() or f'exit code {result.returncode}'}")
+        os.replace(temp_path, output_path)
+    finally:
+        temp_path.unlink(missing_ok=True)
+    return output_path, False
+
+def prepare_asset_pipelines(project_path, project_config, relatives):
+    """Return the rules and tools the staging workers apply to the project's assets.
+
+    Host tools are built and the project's characters scanned here, once
+    per sync and only when some asset needs them. Returns None when the
+    rules are invalid.
+    """
+    config = project_config or {}
+    audio_rules = config.get("audio", {}).get("rules", [])
+    unknown_formats = {rule.get("format", DEFAULT_AUDIO_FORMAT) for rule in audio_rules} - set(AUDIO_FORMATS) - {"pcm"}
+    if unknown_formats:
+        print(f"ERROR: Unknown audio format {', '.join(sorted(map(str, unknown_formats)))} in {PROJECT_CONFIG_NAME}, "
+              f"use one of {', '.join(sorted(AUDIO_FORMATS))} or pcm")
+        return None
+    for rule in config.get("fonts", {}).get("rules", []):
+        sdf = rule.get("sdf")
+        spread = sdf.get("spread", DEFAULT_SDF_SPREAD) if isinstance(sdf, dict) else DEFAULT_SDF_SPREAD
+        if not (isinstance(spread, int) and SDF_SPREAD_RANGE[0] <= spread <= SDF_SPREAD_RANGE[1]):
+            print(f"ERROR: SDF spread {spread} in {PROJECT_CONFIG_NAME} is not supported by FreeType, "
+                  f"use {SDF_SPREAD_RANGE[0]} to {SDF_SPREAD_RANGE[1]} pixels")
+            return None
+
+    pipelines = {
+        "texture_rules": config.get("textures", {}).get("rules", []),
+        "model_rules": config.get("models", {}).get("rules", []),
+        "mesh_tool": None,
+        "font_rules": config.get("fonts", {}).get("rules", []),
+        "font_subsetter": None,
+        "sdf_tool": None,
+        "scanned_characters": frozenset(),
+        "audio_rules": audio_rules,
+        "ffmpeg": None,
+        "audio_formats": frozenset(),
+    }
+
+    model_rules = pipelines["model_rules"]
+    if model_rules and any(get_model_settings(relative, model_rules) for relative in relatives):
+        with trace_phase("host_tool_gipmeshconv"):
+            pipelines["mesh_tool"] = ensure_host_tool("gipmeshconv")
+        if not pipelines["mesh_tool"]:
+            print("WARNING: gipmeshconv is unavailable, models are staged unconverted")
+
+    font_rules = pipelines["font_rules"]
+    font_settings = [get_font_settings(relative, font_rules) for relative in relatives] if font_rules else []
+    if any(settings.get("subset") for settings in font_settings):
+        pipelines["font_subsetter"] = get_font_subsetter()
+        if not pipelines["font_subsetter"]:
+            print("WARNING: fontTools is not installed, fonts are staged without subsetting "
+                  "(pip install fonttools)")
+    if any("sdf" in settings for settings in font_settings):
+        with trace_phase("host_tool_gipsdfgen"):
+            pipelines["sdf_tool"] = ensure_host_tool("gipsdfgen")
+        if not pipelines["sdf_tool"]:
+            print("WARNING: gipsdfgen is unavailable, no SDF atlases are generated")
+    if any(settings.get("scan") and ((settings.get("subset") and pipelines["font_subsetter"])
+                                     or ("sdf" in settings and pipelines["sdf_tool"]))
+           for settings in font_settings):
+        with trace_phase("scan_text_characters"):
+            pipelines["scanned_characters"] = scan_text_characters(project_path)
+
+    audio_formats = {get_audio_settings(relative, audio_rules).get("format") for relative in relatives} - {None}
+    if audio_rules and audio_formats:
+        pipelines["ffmpeg"] = find_ffmpeg()
+        if not pipelines["ffmpeg"]:
+            print("WARNING: ffmpeg was not found, audio is staged without transcoding")
+        else:
+            # Builds without e.g. libmp3lame or libvorbis are common
+            encoders = find_ffmpeg_encoders(pipelines["ffmpeg"][0])
+            pipelines["audio_formats"] = frozenset(audio_format for audio_format in audio_formats
+                                                   if AUDIO_FORMATS[audio_format][1] in encoders)
+            for audio_format in sorted(audio_formats - pipelines["audio_formats"]):
+                print(f"WARNING: ffmpeg has no {AUDIO_FORMATS[audio_format][1]} encoder, "
+                      f"{audio_format} audio is staged without transcoding")
+    return pipelines
+
+def sync_asset_file(relative, size, mtime_ns, entry, assets_dir, build_assets_dir, options, pipelines):
+    """Bring one staged asset up to date, run on the staging thread pool.
+
+    Images matching a texture rule go through the texture pipeline first,
+    models matching a model rule are converted, and fonts matching a font
+    rule are subset and rendered to SDF atlases, audio matching an audio rule
+    is transcoded, see prepare_asset_pipelines.
+    Extra files such as KTX2 variants and atlases are staged next to the
+    asset. Returns the new index entry, the staging method used, None when
+    the staged file was already current, and the pipeline result.
+    """
+    source = assets_dir / relative
+    settings = get_texture_settings(relative, pipelines["texture_rules"])
+    mesh_tool = pipelines["mesh_tool"]
+    model_settings = get_model_settings(relative, pipelines["model_rules"]) if mesh_tool else {}
+    font_settings = get_font_settings(relative, pipelines["font_rules"])
+    font_subsetter = pipelines["font_subsetter"] if font_settings.get("subset") else None
+    sdf = font_settings.get("sdf") if pipelines["sdf_tool"] else None
+    if not (font_subsetter or sdf):
+        font_settings = {}
+    ffmpeg = pipelines["ffmpeg"]
+    audio_settings = get_audio_settings(relative, pipelines["audio_rules"]) if ffmpeg else {}
+    if audio_settings and audio_settings["format"] not in pipelines["audio_formats"]:
+        audio_settings = {}
+    if audio_settings.get("pcm_under"):
+        # Short effects stay PCM, they decode instantly and compress poorly
+        duration = get_audio_duration(source)
+        if duration is not None and duration < audio_settings["pcm_under"]:
+            audio_settings = {}
+    settings_key = None
+    target_relative = relative
+    inputs = None
+    if settings:
+        settings_key = json.dumps([settings, is_pillow_available()], sort_keys=True)
+        target_relative = get_texture_target(relative, settings)
+    elif model_settings:
+        settings_key = json.dumps(["model", model_settings], sort_keys=True)
+        inputs = get_model_input_signature(source)
+        if not model_settings["keep_source"]:
+            target_relative = relative + MESH_EXTENSION
+    elif font_settings:
+        characters = get_font_characters(font_settings, pipelines["scanned_characters"])
+        characters_hash = hashlib.sha256(characters.encode("utf-8")).hexdigest()
+        settings_key = json.dumps(["font", font_subsetter and font_subsetter[0], sdf, characters_hash],
+                                  sort_keys=True)
+        if sdf and not sdf["keep_font"]:
+            target_relative = f"{relative}.{sdf['sizes'][0]}{SDF_FONT_EXTENSION}"
+    elif audio_settings:
+        settings_key = json.dumps(["audio", audio_settings, ffmpeg[1]], sort_keys=True)
+        # Appended like model and font outputs, hit.wav and hit.flac stay apart
+        target_relative = relative + AUDIO_FORMATS[audio_settings["format"]][0]
+    target = build_assets_dir / target_relative
+    use_hash = options.get("asset_hash", False)
+    if (entry.get("target", relative) == target_relative and entry.get("settings") == settings_key
+            and entry.get("inputs") == inputs
+            and is_staged_copy_current(entry, size, mtime_ns, source, target, use_hash)):
+        return dict(entry, mtime_ns=mtime_ns), None, None
+
+    staged_source = source
+    processed = None
+    extras = []
+    if settings:
+        staged_source, from_cache = process_texture(source, relative, settings)
+        processed = {"kind": "texture", "from_cache": from_cache, "input_size": size,
+                     "output_size": staged_source.stat().st_size}
+    elif model_settings:
+        mesh_path, from_cache = process_model(source, model_settings, mesh_tool)
+        processed = {"kind": "model", "from_cache": from_cache, "input_size": size,
+                     "output_size": mesh_path.stat().st_size}
+        if not model_settings["keep_source"]:
+            staged_source = mesh_path
+        else:
+            # The converted mesh next to a model that is shipped as well
+            extras.append((relative + MESH_EXTENSION, mesh_path))
+    elif font_settings:
+        font_path, from_cache = process_font(source, characters, font_subsetter) if font_subsetter else (source, True)
+        atlases = []
+        for pixel_size in (sdf["sizes"] if sdf else []):
+            atlas_path, atlas_from_cache = generate_sdf_atlas(source, characters, pixel_size, sdf["spread"],
+                                                              pipelines["sdf_tool"])
+            atlases.append((f"{relative}.{pixel_size}{SDF_FONT_EXTENSION}", atlas_path))
+            from_cache = from_cache and atlas_from_cache
+        keep_font = not sdf or sdf["keep_font"]
+        staged_source = font_path if keep_font else atlases[0][1]
+        extras.extend(atlases if keep_font else atlases[1:])
+        processed = {"kind": "font", "from_cache": from_cache, "input_size": size,
+                     "output_size": font_path.stat().st_size if keep_font else 0,
+                     "subset": bool(font_subsetter), "characters": len(characters),
+                     "atlases": len(atlases), "atlas_bytes": sum(path.stat().st_size for _, path in atlases)}
+    elif audio_settings:
+        staged_source, from_cache = transcode_audio(source, audio_settings, ffmpeg)
+        processed = {"kind": "sound", "from_cache": from_cache, "input_size": size,
+                     "output_size": staged_source.stat().st_size}
+
+    staging_mode = options.get("asset_staging", "auto")
+    method = stage_file(staged_source, target, staging_mode)
+    new_entry = {"size": size, "mtime_ns": mtime_ns,
+                 "sha256": hash_file(source) if use_hash else None}
+    if settings_key:
+        new_entry.update(target=target_relative, settings=settings_key,
+                         staged_size=staged_source.stat().st_size)
+    if inputs is not None:
+        new_entry["inputs"] = inputs
+
+    # GPU-compressed variants the runtime prefers when the browser supports them
+    ktx2 = settings.get("ktx2")
+    if ktx2:
+        families = KTX2_FAMILIES if ktx2 is True else ktx2
+        for variant, variant_path in encode_ktx2_variants(staged_source, families):
+            extras.append((f"{target_relative}.{variant}.ktx2", variant_path))
+
+    for extra_relative, extra_path in extras:
+        stage_file(extra_path, build_assets_dir / extra_relative, staging_mode)
+    if extras:
+        new_entry["extra"] = [extra_relative for extra_relative, _ in extras]
+    return new_entry, method, processed
+
+def create_asset_dirs(build_assets_dir, relatives):
+    """Create the staged directories of all assets up front, parents before children."""
+    directories = {Path(relative).parent for relative in relatives}
+    for directory in sorted(directories, key=lambda d: (len(d.parts), d.as_posix())):
+        (build_assets_dir / directory).mkdir(parents=True, exist_ok=True)
+
+def copy_assets(project_path, build_dir, options=None, project_config=None):
+    """Sync assets into the build directory for Emscripten to pack.
+
+    Only added or changed files are staged and removed ones deleted, by
+    comparing size and mtime, plus a content hash with the asset_hash option,
+    against the index of the last sync. Files are reflinked, hardlinked or
+    copied as the asset_staging option and the filesystem allow, on a pool of
+    asset_jobs threads. Images matching the project's texture rules are
+    optimized on the way. Models matching its model rules are converted to
+    .gmesh files by the gipmeshconv host tool, fonts matching its font rules
+    are subset or rendered to SDF atlases, and audio matching its audio rules
+    is transcoded with ffmpeg. Returns a dict with the sync statistics and
+    whether the staged asset set changed, or None on failure.
+    """
+    options = options or {}
     assets_dir = project_path / "assets"
+    build_assets_dir = build_dir / "assets"
+    index_path = build_dir / ASSET_INDEX_NAME
+    stats = {"changed": False, "staged": 0, "removed": 0, "unchanged": 0, "bytes_staged": 0,
+             "bytes_copied": 0, "reflink": 0, "hardlink": 0, "copy": 0,
+             "textures": 0, "textures_cached": 0, "texture_bytes_in": 0, "texture_bytes_out": 0,
+             "models": 0, "models_cached": 0, "model_bytes_in": 0, "model_bytes_out": 0,
+             "fonts": 0, "fonts_cached": 0, "font_bytes_in": 0, "font_bytes_out": 0,
+             "sounds": 0, "sounds_cached": 0, "sound_bytes_in": 0, "sound_bytes_out": 0}
+
     if not assets_dir.exists():
         print("No assets directory found, skipping asset copying")
+        if build_assets_dir.exists():
+            shutil.rmtree(build_assets_dir)
+            index_path.unlink(missing_ok=True)
+            stats["changed"] = True
+        return stats
+
+    start_time = time.perf_counter()
+    errors = []
+    try:
+        index = read_asset_index(index_path)
+        sources = scan_asset_files(assets_dir)
+        create_asset_dirs(build_assets_dir, sources)
+        new_index = {}
+        pipelines = prepare_asset_pipelines(project_path, project_config, sources)
+        if pipelines is None:
+            return None
+        font_reports = []
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=options.get("asset_jobs") or DEFAULT_ASSET_JOBS) as executor:
+            futures = {
+                executor.submit(sync_asset_file, relative, size, mtime_ns, index.get(relative, {}),
+                                assets_dir, build_assets_dir, options, pipelines): relative
+                for relative, (size, mtime_ns) in sources.items()
+            }
+            for future in concurrent.futures.as_completed(futures):
+                relative = futures[future]
+                try:
+                    entry, method, processed = future.result()
+                except Exception as e:
+                    # Keep staging the rest and report every failure at the end
+                    errors.append((relative, e))
+                    continue
+                new_index[relative] = entry
+                if method is None:
+                    stats["unchanged"] += 1
+                    continue
+                staged_size = entry.get("staged_size", entry["size"])
+                stats["staged"] += 1
+                stats[method] += 1
+                stats["bytes_staged"] += staged_size
+                if method == "copy":
+                    stats["bytes_copied"] += staged_size
+                if processed:
+                    kind = processed["kind"]
+                    stats[f"{kind}s"] += 1
+                    stats[f"{kind}s_cached"] += processed["from_cache"]
+                    stats[f"{kind}_bytes_in"] += processed["input_size"]
+                    stats[f"{kind}_bytes_out"] += processed["output_size"]
+                    if kind == "font":
+                        font_reports.append((relative, processed))
+
+        # Remove staged files whose source is gone, then empty directories
+        staged_targets = {entry.get("target", relative) for relative, entry in new_index.items()}
+        staged_targets.update(extra for entry in new_index.values() for extra in entry.get("extra", []))
+        for dirpath, dirnames, filenames in os.walk(build_assets_dir, topdown=False):
+            for filename in filenames:
+                staged = Path(dirpath) / filename
+                if staged.relative_to(build_assets_dir).as_posix() not in staged_targets:
+                    staged.unlink()
+                    stats["removed"] += 1
+            for dirname in dirnames:
+                with contextlib.suppress(OSError):
+                    (Path(dirpath) / dirname).rmdir()
+
+        # Files that failed are left out, so the next sync retries them
+        write_asset_index(index_path, new_index)
+    except OSError as e:
+        print(f"ERROR: Failed to copy assets: {e}")
+        return None
+
+    if errors:
+        print(f"ERROR: Failed to stage {len(errors)} of {len(sources)} assets:")
+        for relative, error in sorted(errors, key=lambda item: item[0])[:MAX_REPORTED_ASSET_ERRORS]:
+            print(f"  {relative}: {error}")
+        if len(errors) > MAX_REPORTED_ASSET_ERRORS:
+            print(f"  ... and {len(errors) - MAX_REPORTED_ASSET_ERRORS} more")
+        return None
+
+    stats["changed"] = bool(stats["staged"] or stats["removed"])
+    elapsed = time.perf_counter() - start_time
+    methods = ", ".join(f"{stats[method]} {label}" for method, label in
+                        (("reflink", "reflinked"), ("hardlink", "hardlinked"), ("copy", "copied"))
+                        if stats[method])
+    print(f"Assets synced to {build_assets_dir}: {stats['staged']} staged"
+          f"{f' ({methods})' if methods else ''}, "
+          f"{stats['bytes_staged'] / (1024 * 1024):.1f} MB staged, "
+          f"{stats['bytes_copied'] / (1024 * 1024):.1f} MB copied, {stats['removed']} removed, "
+          f"{stats['unchanged']} unchanged in {elapsed:.2f}s")
+    if stats["textures"]:
+        print(f"Textures: {stats['textures']} processed ({stats['textures_cached']} from cache), "
+              f"{stats['texture_bytes_in'] / (1024 * 1024):.1f} MB -> "
+              f"{stats['texture_bytes_out'] / (1024 * 1024):.1f} MB")
+    if stats["models"]:
+        print(f"Models: {stats['models']} converted ({stats['models_cached']} from cache), "
+              f"{stats['model_bytes_in'] / (1024 * 1024):.1f} MB -> "
+              f"{stats['model_bytes_out'] / (1024 * 1024):.1f} MB")
+    if stats["sounds"]:
+        print(f"Audio: {stats['sounds']} transcoded ({stats['sounds_cached']} from cache), "
+              f"{stats['sound_bytes_in'] / (1024 * 1024):.1f} MB -> "
+              f"{stats['sound_bytes_out'] / (1024 * 1024):.1f} MB")
+    if font_reports:
+        print(f"Fonts: {stats['fonts']} processed ({stats['fonts_cached']} from cache), "
+              f"{(stats['font_bytes_in'] - stats['font_bytes_out']) / (1024 * 1024):.1f} MB saved")
+        for relative, font in sorted(font_reports, key=lambda item: item[0]):
+            details = []
+            if font["subset"] or not font["output_size"]:
+                details.append(f"{font['input_size'] / 1024:.1f} KB -> {font['output_size'] / 1024:.1f} KB, "
+                               f"{(font['input_size'] - font['output_size']) / 1024:.1f} KB saved")
+            if font["atlases"]:
+                details.append(f"{font['atlases']} SDF atlas{'es' if font['atlases'] > 1 else ''} "
+                               f"of {font['atlas_bytes'] / 1024:.1f} KB")
+            print(f"  {relative}: {', '.join(details)} ({font['characters']} characters)")
+    if elapsed > 0:
+        print(f"Asset throughput: {len(sources) / elapsed:.0f} files/s, "
+              f"{stats['bytes_staged'] / (1024 * 1024) / elapsed:.1f} MB/s staged")
+    return stats
+
+def get_bundle_rules(project_config):
+    """Return the project's bundle rules, or None when a rule names an invalid bundle."""
+    rules = (project_config or {}).get("bundles", {}).get("rules", [])
+    invalid = {str(rule.get("bundle")) for rule in rules
+               if not BUNDLE_NAME_PATTERN.match(str(rule.get("bundle", "")))}
+    if invalid:
+        print(f"ERROR: Invalid bundle name {', '.join(sorted(invalid))} in {PROJECT_CONFIG_NAME}, "
+              f"use letters, digits, - and _")
+        return None
+    return rules
+
+def assign_asset_bundles(index, rules):
+    """Map each bundle name to the staged files of the assets its rules select.
+
+    Rules match the path of the source asset, its converted target and extra
+    files go with it. Assets no rule applies to are in the boot bundle.
+    """
+    bundles = {BOOT_BUNDLE: []}
+    for relative, entry in index.items():
+        name = (match_asset_rules(relative, rules) or {}).get("bundle", BOOT_BUNDLE)
+        bundles.setdefault(name, []).append(entry.get("target", relative))
+        bundles[name].extend(entry.get("extra", []))
+    return bundles
+
+def mirror_bundle_files(build_assets_dir, bundle_dir, targets):
+    """Link the staged files of one bundle into its own tree, removing any others.
+
+    Returns True if the tree changed.
+    """
+    changed = False
+    wanted = set(targets)
+    for target in sorted(wanted):
+        source = build_assets_dir / target
+        mirrored = bundle_dir / target
+        # Hardlinked, reflinked and copied files all keep the staged mtime
+        with contextlib.suppress(OSError):
+            source_stat, mirrored_stat = source.stat(), mirrored.stat()
+            if (source_stat.st_size, source_stat.st_mtime_ns) == (mirrored_stat.st_size, mirrored_stat.st_mtime_ns):
+                continue
+        mirrored.parent.mkdir(parents=True, exist_ok=True)
+        stage_file(source, mirrored)
+        changed = True
+    for dirpath, dirnames, filenames in os.walk(bundle_dir, topdown=False):
+        for filename in filenames:
+            mirrored = Path(dirpath) / filename
+            if mirrored.relative_to(bundle_dir).as_posix() not in wanted:
+                mirrored.unlink()
+                changed = True
+        for dirname in dirnames:
+            with contextlib.suppress(OSError):
+                (Path(dirpath) / dirname).rmdir()
+    return changed
+
+def get_bundle_signature(build_assets_dir, targets):
+    """Hash the names, sizes and mtimes of a bundle's staged files."""
+    files = []
+    for target in sorted(targets):
+        stat = (build_assets_dir / target).stat()
+        files.append((target, stat.st_size, stat.st_mtime_ns))
+    return hashlib.sha256(json.dumps(files).encode("utf-8")).hexdigest()
+
+@functools.lru_cache(maxsize=None)
+def find_file_packager():
+    """Return the file_packager.py of the emscripten in use, or None."""
+    emcc = get_local_emcc_path() or shutil.which("emcc")
+    if not emcc:
         return None
+    packager = Path(emcc).resolve().parent / "tools" / "file_packager.py"
+    return packager if packager.exists() else None
+
+def run_file_packager(packager, build_dir, data_name, script_name, bundle_dir, lz4=False):
+    """Pack bundle_dir, mounted at /assets, into data_name with its loader script_name.
+
+    With lz4 the package is compressed in chunks that the app's LZ4 runtime
+    decompresses when a file is read.
+    """
+    command = [sys.executable, str(packager), data_name, "--preload", f"{bundle_dir}@/assets",
+               f"--js-output={script_name}"]
+    if lz4:
+        command.append("--lz4")
+    result = subprocess.run(command, cwd=build_dir, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(f"ERROR: file_packager failed for {data_name}:")
+        print(result.stderr.strip() or result.stdout.strip())
+        return False
+    return True
+
+def remove_bundle_outputs(build_dir, state):
+    """Delete the packages and loaders of the bundles recorded in state."""
+    for bundle in state.values():
+        for name in (bundle.get("data"), bundle.get("script")):
+            if name:
+                (build_dir / name).unlink(missing_ok=True)
+
+def package_asset_bundles(project_path, build_dir, project_config, options=None):
+    """Split the staged assets into the bundles of the project's bundle rules.
+
+    The boot bundle is linked into bundles/boot for emcc to preload, every
+    named bundle is packed by Emscripten's file_packager as
+    <project>.<bundle>.data with a .js loader next to the app, which
+    gWebApp::loadBundle() fetches at runtime. The names, files and content
+    hashes of the named bundles go into a --pre-js manifest. Bundles whose
+    files and packing options did not change are not packed again, the
+    asset_lz4 option packs them LZ4-compressed. Returns a dict with the
+    size and file count of each bundle, empty without bundle rules, and
+    whether the app must be relinked, or None on failure.
+    """
+    options = options or {}
+    rules = get_bundle_rules(project_config)
+    if rules is None:
+        return None
+    lz4 = bool(options.get("asset_lz4"))
+    project_name = project_path.name
+    build_assets_dir = build_dir / "assets"
+    bundles_dir = build_dir / BUNDLES_DIR_NAME
+    state_path = build_dir / BUNDLE_STATE_NAME
+    manifest_path = build_dir / BUNDLE_MANIFEST_NAME
+    try:
+        with open(state_path, "r") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        state = {}
+
+    if not rules:
+        # Bundles were turned off, go back to preloading assets/ as a whole
+        changed = manifest_path.exists()
+        remove_bundle_outputs(build_dir, state)
+        for path in (state_path, manifest_path):
+            path.unlink(missing_ok=True)
+        if bundles_dir.exists():
+            shutil.rmtree(bundles_dir)
+        return {"changed": changed, "bundles": {}}
+
+    start_time = time.perf_counter()
+    bundles = assign_asset_bundles(read_asset_index(build_dir / ASSET_INDEX_NAME), rules)
+    packager = None
+    report = {}
+    new_state = {}
+    changed = False
+    try:
+        for name in list(state):
+            if name not in bundles:
+                remove_bundle_outputs(build_dir, {name: state[name]})
+        for stale in bundles_dir.iterdir() if bundles_dir.exists() else ():
+            if stale.name not in bundles:
+                shutil.rmtree(stale)
+
+        for name, targets in sorted(bundles.items()):
+            bundle_dir = bundles_dir / name
+            bundle_dir.mkdir(parents=True, exist_ok=True)
+            mirrored = mirror_bundle_files(build_assets_dir, bundle_dir, targets)
+            size = sum((build_assets_dir / target).stat().st_size for target in targets)
+            report[name] = {"files": len(targets), "size": size, "packed": False}
+            if name == BOOT_BUNDLE:
+                # emcc packs the boot bundle when the app is linked
+                changed = changed or mirrored
+                continue
+
+            signature = get_bundle_signature(build_assets_dir, targets)
+            data_name = f"{project_name}.{name}.data"
+            script_name = f"{project_name}.{name}.js"
+            previous = state.get(name, {})
+            if (previous.get("signature") != signature or previous.get("lz4", False) != lz4
+                    or not (build_dir / data_name).exists() or not (build_dir / script_name).exists()):
+                packager = packager or find_file_packager()
+                if not packager:
+                    print("ERROR: Emscripten's file_packager.py was not found, bundles cannot be packed")
+                    return None
+                with trace_phase(f"file_packager_{name}"):
+                    if not run_file_packager(packager, build_dir, data_name, script_name, bundle_dir, lz4):
+                        return None
+                report[name]["packed"] = True
+                previous = {"size": (build_dir / data_name).stat().st_size,
+                            "hash": hash_file(build_dir / data_name)[:16]}
+            new_state[name] = {"signature": signature, "lz4": lz4, "data": data_name, "script": script_name,
+                               "size": previous["size"], "hash": previous["hash"]}
+            report[name]["packed_size"] = previous["size"]
+
+        manifest = {name: {key: bundle[key] for key in ("data", "script", "size", "hash")}
+                    for name, bundle in new_state.items()}
+        manifest_text = ("// Written by project_builder.py, the asset bundles gWebApp::loadBundle() can fetch\n"
+                         f"Module['gipwebglBundles'] = {json.dumps(manifest, indent=2, sort_keys=True)};\n")
+        # The manifest is linked into the app, only rewrite it when it changed
+        if not manifest_path.exists() or manifest_path.read_text() != manifest_text:
+            temp_path = manifest_path.with_name(manifest_path.name + ".tmp")
+            temp_path.write_text(manifest_text)
+            os.replace(temp_path, manifest_path)
+            changed = True
+        temp_path = state_path.with_name(state_path.name + ".tmp")
+        with open(temp_path, "w") as f:
+            json.dump(new_state, f, indent=2)
+        os.replace(temp_path, state_path)
+    except OSError as e:
+        print(f"ERROR: Failed to package asset bundles: {e}")
+        return None
+
+    elapsed = time.perf_counter() - start_time
+    packed = sum(bundle["packed"] for bundle in report.values())
+    print(f"Asset bundles: {len(report)} ({packed} packed) in {elapsed:.2f}s")
+    for name, bundle in sorted(report.items(), key=lambda item: (item[0] != BOOT_BUNDLE, item[0])):
+        compressed = (f" -> {bundle['packed_size'] / (1024 * 1024):.1f} MB LZ4"
+                      if lz4 and "packed_size" in bundle else "")
+        print(f"  {name}: {bundle['files']} file{'s' if bundle['files'] != 1 else ''}, "
+              f"{bundle['size'] / (1024 * 1024):.1f} MB{compressed}"
+              f"{' (preloaded)' if name == BOOT_BUNDLE else ''}")
+    return {"changed": changed, "bundles": report}
+
+def find_cmake_executable():
+    """Find cmake executable in system PATH or glist zbin directory."""
+    cached = recall_tool("cmake")
+    if cached:
+        print(f"Using cached cmake: {cached['path']}")
+        return cached["path"]
+
+    # First try system PATH
+    try:
+        probe_tool("cmake", check=True)
+        print("Using cmake from system PATH")
+        remember_tool("cmake", "cmake")
+        return "cmake"
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        pass
+
+    # Try to find in glist zbin directory
+    for zbin_platform_dir in find_zbin_platform_dirs():
+        # Try different possible cmake paths
+        cmake_paths = [
+            zbin_platform_dir / "cmake" / "bin" / "cmake",
+            zbin_platform_dir / "cmake" / "bin" / "cmake.exe",
+            zbin_platform_dir / "CMake" / "bin" / "cmake",
+            zbin_platform_dir / "CMake" / "bin" / "cmake.exe",
+            zbin_platform_dir / "bin" / "cmake",
+            zbin_platform_dir / "bin" / "cmake.exe"
+        ]
+
+        for cmake_path in cmake_paths:
+            if cmake_path.exists():
+                print(f"Found cmake at: {cmake_path}")
+                remember_tool("cmake", cmake_path)
+                return str(cmake_path)
+
+    print("ERROR: Could not find cmake executable")
+    return None
+
+def get_preload_dir(build_dir):
+    """Return the staged directory emcc preloads, only the boot bundle with bundle rules."""
+    if (build_dir / BUNDLE_MANIFEST_NAME).exists():
+        return build_dir / BUNDLES_DIR_NAME / BOOT_BUNDLE
+    return build_dir / "assets"
+
+def setup_emscripten_cmake_flags(project_path, build_dir, options=None):
+    """Setup Emscripten-specific CMake flags for asset loading and web output."""
+    options = options or {}
+    flags = []
+    linker_flags = []
+    runtime_methods = ["ccall", "cwrap"]
+
+    # With bundle rules only the boot bundle is preloaded, see package_asset_bundles
+    manifest_path = build_dir / BUNDLE_MANIFEST_NAME
+    if manifest_path.exists():
+        # Bundles loaded later need the filesystem even without boot assets
+        linker_flags.extend(["-sFORCE_FILESYSTEM=1", f"--pre-js {BUNDLE_LOADER_PATH}", f"--pre-js {manifest_path}"])
+        runtime_methods.extend(BUNDLE_RUNTIME_METHODS)
+        print("Asset bundles found - named bundles will be fetched on demand")
+
+    # Check if assets directory exists
+    assets_dir = get_preload_dir(build_dir)
+    preloaded = assets_dir.exists() and any(assets_dir.iterdir())
+    if preloaded:
+        # Use Emscripten's --preload-file to pack assets
+        linker_flags.insert(0, f"--preload-file {assets_dir}@/assets")
+        print("Assets found - will be packed with --preload-file")
+    if linker_flags and options.get("asset_cache"):
+        # Emscripten caches the preloaded package itself, gWebAssetCache.js
+        # caches the bundles and reports which packages came from the cache
+        if preloaded:
+            linker_flags.append("--use-preload-cache")
+        linker_flags.append(f"--pre-js {ASSET_CACHE_SCRIPT_PATH}")
+        print("Asset packages will be cached in the browser's IndexedDB")
+    if linker_flags and options.get("asset_lz4"):
+        # emcc then packs the preloaded assets with file_packager --lz4 and
+        # links the runtime that decompresses files as they are read
+        linker_flags.append("-sLZ4=1")
+        runtime_methods.append("LZ4")
+        print("Asset packages will be LZ4-compressed")
+    if linker_flags:
+        flags.append(f"-DCMAKE_EXE_LINKER_FLAGS={' '.join(linker_flags)}")
+
+    # Add common Emscripten web optimization flags
+    exported_methods = ",".join(f"'{method}'" for method in runtime_methods)
+    common_flags = [
+        "-DCMAKE_EXECUTABLE_SUFFIX='.html'",
+        f"-DCMAKE_EXE_LINKER_FLAGS_RELEASE=-s EXPORTED_FUNCTIONS=['_main','_malloc','_free'] -s EXPORTED_RUNTIME_METHODS=[{exported_methods}]"
+    ]
+
+    flags.extend(common_flags)
+
+    print(f"\nFinal CMake flags: {len(flags)} flags configured")
+    return flags
+
+
+def report_asset_package(build_dir, project_name, options):
+    """Print the expanded and packed size of the asset package emcc preloads."""
+    data_path = build_dir / f"{project_name}.data"
+    if not data_path.exists():
+        return
+    expanded = sum(path.stat().st_size for path in get_preload_dir(build_dir).rglob("*") if path.is_file())
+    packed = data_path.stat().st_size
+    print(f"Preloaded assets: {expanded / (1024 * 1024):.1f} MB expanded, {packed / (1024 * 1024):.1f} MB packed"
+          f"{' with LZ4' if options.get('asset_lz4') else ''}"
+          f"{f' ({packed / expanded:.0%})' if expanded else ''}")
+
+def get_emsdk_version():
+    """Return the version string of the emscripten toolchain in use."""
+    # Reading the version file avoids starting emcc's python interpreter
+    emsdk_dir = Path("./emsdk").absolute()
+    version_file = emsdk_dir / "upstream" / "emscripten" / "emscripten-version.txt"
+    if version_file.exists():
+        return version_file.read_text().strip().strip('"')
+
+    try:
+        result = probe_tool("emcc", timeout=10)
+        if result.returncode == 0 and result.stdout:
+            return result.stdout.splitlines()[0].strip()
+    except Exception:
+        pass
+    return "unknown"
+
+def compute_configure_fingerprint(cmake_args, toolchain_file, generator, emsdk_version, emscripten_flags):
+    """Hash every input that affects the CMake configure step."""
+    inputs = {
+        "cmake_args": [str(arg) for arg in cmake_args],
+        "toolchain_file": str(toolchain_file),
+        "generator": generator,
+        "emsdk_version": emsdk_version,
+        "emscripten_flags": [str(flag) for flag in emscripten_flags],
+    }
+    encoded = json.dumps(inputs, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest(), inputs
+
+def read_configure_stamp(build_dir):
+    """Return the fingerprint and inputs recorded by the last successful configure, {} if none."""
+    stamp_file = build_dir / CONFIGURE_STAMP_NAME
+    try:
+        with open(stamp_file, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+def get_cache_variable_names(cmake_args):
+    """Return the names of the cache variables set with -D in cmake_args."""
+    return {re.split(r"[:=]", str(arg)[2:], maxsplit=1)[0] for arg in cmake_args if str(arg).startswith("-D")}
+
+def needs_fresh_configure(previous_inputs, inputs):
+    """Tell whether the CMake cache of the previous configure cannot be reused.
+
+    A new generator, toolchain or Emscripten version needs a clean cache, and
+    so does a variable that is no longer passed, whose old value would stick.
+    Changed -D values are simply passed to the existing cache.
+    """
+    if not previous_inputs:
+        return True
+    for key in ("toolchain_file", "generator", "emsdk_version"):
+        if previous_inputs.get(key) != inputs[key]:
+            return True
+    previous_names = get_cache_variable_names(previous_inputs.get("cmake_args", []))
+    return not previous_names <= get_cache_variable_names(inputs["cmake_args"])
+
+def write_configure_stamp(build_dir, fingerprint, inputs):
+    """Record the fingerprint of a successful configure."""
+    stamp_file = build_dir / CONFIGURE_STAMP_NAME
+    with open(stamp_file, "w") as f:
+        json.dump({"fingerprint": fingerprint, "inputs": inputs}, f, indent=2)
+
+def clear_cmake_cache(build_dir):
+    """Remove CMake cache files so the next configure starts from scratch."""
+    cmake_cache = build_dir / "CMakeCache.txt"
+    cmake_files_dir = build_dir / "CMakeFiles"
+    stamp_file = build_dir / CONFIGURE_STAMP_NAME
+
+    if cmake_cache.exists():
+        print("Clearing CMake cache...")
+        cmake_cache.unlink()
+
+    if cmake_files_dir.exists():
+        print("Clearing CMakeFiles directory...")
+        shutil.rmtree(cmake_files_dir)
+
+    if stamp_file.exists():
+        stamp_file.unlink()
+
+def force_relink(build_dir, project_name):
+    """Remove the linked web outputs so the build tool relinks and repacks assets."""
+    # --preload-file inputs are not tracked by CMake, so asset changes alone
+    # never trigger a relink
+    for suffix in (".html", ".js", ".wasm", ".data"):
+        output = build_dir / f"{project_name}{suffix}"
+        if output.exists():
+            output.unlink()
+
+def find_emscripten_toolchain_file():
+    """Locate Emscripten.cmake in the local emsdk or the system emscripten."""
+    emsdk_dir = Path("./emsdk").absolute()
+    if emsdk_dir.exists():
+        return emsdk_dir / "upstream" / "emscripten" / "cmake" / "Modules" / "Platform" / "Emscripten.cmake"
+
+    # Try to find in system
+    emcc = shutil.which("emcc") or "emcc"
+    result = probe_tool(emcc, ("--print-sysroot",), extra_files=get_emcc_version_files(emcc))
+    if result.returncode == 0:
+        sysroot = result.stdout.strip()
+        return Path(sysroot).parent / "cmake" / "Modules" / "Platform" / "Emscripten.cmake"
+
+    print("ERROR: Could not find emscripten toolchain file")
+    return None
+
+def resolve_toolchain():
+    """Set up emscripten and find cmake, the build tool and the toolchain file."""
+    # Setup emscripten environment
+    with trace_phase("setup_emscripten_env"):
+        setup_emscripten_env()
+
+    # Find cmake executable
+    with trace_phase("find_cmake"):
+        cmake_cmd = find_cmake_executable()
+    if not cmake_cmd:
+        return None
+
+    # Find build tool (ninja or make)
+    with trace_phase("find_build_tool"):
+        build_cmd, generator = find_or_install_ninja()
+    if not build_cmd:
+        return None
+
+    try:
+        with trace_phase("find_toolchain_file"):
+            toolchain_file = find_emscripten_toolchain_file()
+    except Exception as e:
+        print(f"ERROR: Could not find emscripten toolchain file: {e}")
+        return None
+    if not toolchain_file:
+        return None
+
+    return {
+        "cmake_cmd": cmake_cmd,
+        "build_cmd": build_cmd,
+        "generator": generator,
+        "toolchain_file": str(toolchain_file),
+    }
+
+def get_base_cmake_args(toolchain):
+    """Return the CMake arguments shared by project and dependency builds."""
+    return [
+        "-DCMAKE_TOOLCHAIN_FILE=" + str(toolchain["toolchain_file"]),
+        "-DCMAKE_BUILD_TYPE=Release",
+
+        # Use the appropriate build tool
+        "-DCMAKE_MAKE_PROGRAM=" + toolchain["build_cmd"],
+        "-G", toolchain["generator"],
+
+        # Emscripten-specific fixes
+        "-DCMAKE_CROSSCOMPILING=ON",
+        "-DCMAKE_SYSTEM_NAME=Emscripten",
+        "-DCMAKE_SYSTEM_PROCESSOR=x86",
+
+        # Fix for CheckTypeSize issues with Emscripten
+        "-DCMAKE_TRY_COMPILE_TARGET_TYPE=STATIC_LIBRARY",
+
+        # General dependency management
+        "-DCMAKE_FIND_ROOT_PATH_MODE_PROGRAM=NEVER",
+        "-DCMAKE_FIND_ROOT_PATH_MODE_LIBRARY=ONLY",
+        "-DCMAKE_FIND_ROOT_PATH_MODE_INCLUDE=ONLY",
+
+        # Skip problematic checks
+        "-DHAVE_OFF64_T=OFF",
+        "-DOFF64_T=OFF",
+    ]
+
+def load_project_config(project_path):
+    """Return the project's gipwebgl.json settings, {} without one, or None if it is invalid."""
+    config_file = project_path / PROJECT_CONFIG_NAME
+    if not config_file.exists():
+        return {}
+    try:
+        with open(config_file, "r") as f:
+            config = json.load(f)
+    except (OSError, ValueError) as e:
+        print(f"ERROR: Could not read {config_file}: {e}")
+        return None
+    if not isinstance(config, dict):
+        print(f"ERROR: {config_file} must contain a JSON object")
+        return None
+    error = validate_project_config(config)
+    if error:
+        print(f"ERROR: {error} in {config_file}")
+        return None
+    return config
+
+def validate_project_config(config):
+    """Return what is wrong with the types of the project's settings, None if nothing is."""
+    for section in PROJECT_CONFIG_SECTIONS:
+        if not isinstance(config.get(section, {}), dict):
+            return f"\"{section}\" must be an object"
+    for section in PROJECT_CONFIG_RULE_SECTIONS:
+        rules = config.get(section, {}).get("rules", [])
+        if not (isinstance(rules, list) and all(isinstance(rule, dict) for rule in rules)):
+            return f"\"{section}\" \"rules\" must be a list of objects"
+    for section, key, kind, accepts_all in PROJECT_CONFIG_NAME_LISTS:
+        names = config.get(section, {}).get(key, [])
+        if accepts_all and names == "all":
+            continue
+        if not (isinstance(names, list) and all(isinstance(name, str) for name in names)):
+            return f"\"{section}\" \"{key}\" must be a list of {kind}" + (" or \"all\"" if accepts_all else "")
+    return None
+
+def scan_model_formats(assets_dir, model_rules=()):
+    """Return the assimp importers needed by the model files under assets_dir.
+
+    Models the model rules convert to .gmesh without keeping the source are
+    never imported at runtime and need no importer.
+    """
+    formats = set()
+    if assets_dir.exists():
+        for file_path in assets_dir.rglob("*"):
+            importer = ASSIMP_IMPORTER_EXTENSIONS.get(file_path.suffix.lower())
+            if not importer or not file_path.is_file():
+                continue
+            model_settings = get_model_settings(file_path.relative_to(assets_dir).as_posix(), model_rules)
+            if model_settings and not model_settings["keep_source"]:
+                continue
+            formats.add(importer)
+    return formats
+
+def get_assimp_cmake_args(project_path, project_config):
+    """Return assimp arguments enabling only the importers the project needs.
+
+    The importers come from the model files in assets/ plus the "importers"
+    list of the "assimp" project setting, for models loaded from elsewhere.
+    "importers": "all" builds every importer, "exporters" enables exporters.
+    """
+    assimp_config = project_config.get("assimp", {})
+    importers = assimp_config.get("importers", [])
+    exporters = assimp_config.get("exporters", [])
+
+    args = []
+    if importers == "all":
+        print("Assimp importers: all (project setting)")
+    else:
+        formats = scan_model_formats(project_path / "assets", project_config.get("models", {}).get("rules", []))
+        formats.update(name.upper() for name in importers)
+        print(f"Assimp importers: {', '.join(sorted(formats)) or 'none'}")
+        args.append("-DASSIMP_BUILD_ALL_IMPORTERS_BY_DEFAULT=OFF")
+        args.extend(f"-DASSIMP_BUILD_{name}_IMPORTER=ON" for name in sorted(formats))
+
+    if exporters == "all":
+        args.append("-DASSIMP_BUILD_ALL_EXPORTERS_BY_DEFAULT=ON")
+    else:
+        args.append("-DASSIMP_BUILD_ALL_EXPORTERS_BY_DEFAULT=OFF")
+        args.extend(f"-DASSIMP_BUILD_{name.upper()}_EXPORTER=ON" for name in sorted(exporters))
+        if not exporters:
+            args.append("-DASSIMP_NO_EXPORT=ON")
+    return args
+
+def get_freetype_cmake_args(project_config):
+    """Return FreeType arguments selecting the web or full module profile.
+
+    The web profile builds the TrueType/OpenType drivers and the smooth
+    rasterizer, the "modules" list of the "freetype" project setting adds
+    more, e.g. "type1", "autofit" or "gzip" for WOFF fonts.
+    """
+    freetype_config = project_config.get("freetype", {})
+    profile = freetype_config.get("profile", "web")
+    if profile == "full":
+        print("FreeType profile: full")
+        return [
+            "-DGIPWEBGL_FREETYPE_PROFILE=full",
+            "-DFT_DISABLE_HARFBUZZ=ON",
+        ]
+    if profile != "web":
+        print(f"WARNING: Unknown FreeType profile '{profile}', using web")
+
+    modules = []
+    pending = list(FREETYPE_WEB_MODULES) + list(freetype_config.get("modules", []))
+    while pending:
+        module = pending.pop(0)
+        if module in modules:
+            continue
+        if module not in FREETYPE_MODULE_DEPENDENCIES:
+            print(f"WARNING: Unknown FreeType module '{module}', ignoring it")
+            continue
+        modules.append(module)
+        pending.extend(FREETYPE_MODULE_DEPENDENCIES[module])
+
+    print(f"FreeType profile: web ({', '.join(modules)})")
+    return [
+        "-DGIPWEBGL_FREETYPE_PROFILE=web",
+        f"-DGIPWEBGL_FREETYPE_MODULES={';'.join(modules)}",
+    ]
+
+def get_sqlite_profile(project_config):
+    """Return the name of the SQLite profile selected by the project."""
+    profile = project_config.get("sqlite", {}).get("profile", DEFAULT_SQLITE_PROFILE)
+    if profile not in SQLITE_PROFILES:
+        print(f"WARNING: Unknown SQLite profile '{profile}', using {DEFAULT_SQLITE_PROFILE}")
+        profile = DEFAULT_SQLITE_PROFILE
+    return profile
+
+def get_sqlite_cmake_args(project_config):
+    """Return the SQLite compile options of the project's profile and extra definitions."""
+    profile = get_sqlite_profile(project_config)
+    definitions = list(SQLITE_PROFILES[profile]) + list(project_config.get("sqlite", {}).get("definitions", []))
+    print(f"SQLite profile: {profile}")
+    return [f"-DGIPWEBGL_SQLITE_DEFINITIONS={';'.join(definitions)}"]
+
+def get_dependency_cmake_args(project_path=None, project_config=None):
+    """Return the CMake arguments that configure the third-party dependencies."""
+    project_config = project_config or {}
+    args = [
+        # Assimp configuration
+        "-DASSIMP_BUILD_ZLIB=ON",
+        "-DASSIMP_WARNINGS_AS_ERRORS=OFF",
+    ]
+    if project_path is not None:
+        args.extend(get_assimp_cmake_args(project_path, project_config))
+
+    # FreeType configuration
+    args.extend(get_freetype_cmake_args(project_config))
+
+    # SQLite configuration
+    args.extend(get_sqlite_cmake_args(project_config))
+    return args
+
+def scan_dependency_usage(project_path):
+    """Find which bundled dependencies the project's sources or CMake files reference.
+
+    Returns a dict of dependency name to the first file that references it,
+    through its own headers, the engine headers that wrap it, or by name in a
+    CMake file.
+    """
+    usage = {}
+    for directory in iter_watched_dirs(project_path):
+        if directory.name == "assets":
+            continue
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            file_path = Path(entry.path)
+            is_cmake = file_path.name == "CMakeLists.txt" or file_path.suffix == ".cmake"
+            if not entry.is_file() or not (is_cmake or file_path.suffix.lower() in WATCH_SOURCE_EXTENSIONS):
+                continue
+            try:
+                with open(file_path, "r", encoding="utf-8", errors="replace") as f:
+                    text = f.read()
+            except OSError:
+                continue
+
+            if is_cmake:
+                for dependency in DEPENDENCY_INCLUDE_PATTERNS:
+                    if dependency not in usage and re.search(rf"\b{dependency}\b", text):
+                        usage[dependency] = file_path
+                continue
+            for include in INCLUDE_PATTERN.findall(text):
+                name = Path(include).name
+                for dependency, patterns in DEPENDENCY_INCLUDE_PATTERNS.items():
+                    if dependency not in usage and any(
+                            include.startswith(pattern) if pattern.endswith("/") else name == pattern
+                            for pattern in patterns):
+                        usage[dependency] = file_path
+    return usage
+
+def read_required_dependencies(build_dir, usage):
+    """Return the dependencies an earlier link of this project proved it needs.
+
+    They were proven for the includes scanned then, a different scan result
+    starts over so dependencies the app stopped using get dropped again.
+    """
+    try:
+        with open(build_dir / DEPENDENCY_STATE_NAME, "r") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return set()
+    if state.get("usage") != sorted(usage):
+        return set()
+    return set(state.get("required", []))
+
+def write_required_dependencies(build_dir, required, usage):
+    """Remember dependencies the link needs although the include scan found no use."""
+    with open(build_dir / DEPENDENCY_STATE_NAME, "w") as f:
+        json.dump({"required": sorted(required), "usage": sorted(usage)}, f, indent=2)
+
+def get_cmake_version(cmake_cmd):
+    """Return the version of cmake_cmd as a tuple of ints, () if it cannot be read."""
+    try:
+        output = probe_tool(cmake_cmd).stdout
+    except (OSError, subprocess.SubprocessError):
+        return ()
+    match = re.search(r"cmake version (\d+)\.(\d+)", output)
+    return tuple(int(part) for part in match.groups()) if match else ()
+
+def get_dropped_dependencies(project_path, project_config, build_dir, cmake_version=None):
+    """Decide which dependencies to leave out of the link and report why.
+
+    Nothing is dropped with a CMake older than MIN_LINKER_LAUNCHER_CMAKE,
+    whose links cannot go through the launcher that retries them.
+    """
+    if cmake_version is not None and cmake_version < MIN_LINKER_LAUNCHER_CMAKE:
+        version = ".".join(map(str, cmake_version)) or "of unknown version"
+        print(f"  all linked (CMake {version} is older than "
+              f"{'.'.join(map(str, MIN_LINKER_LAUNCHER_CMAKE))}, which unused dependency dropping needs)")
+        return []
+    keep = set(project_config.get("dependencies", {}).get("keep", []))
+    usage = scan_dependency_usage(project_path)
+    required = read_required_dependencies(build_dir, usage)
+
+    dropped = []
+    for dependency in DEPENDENCY_INCLUDE_PATTERNS:
+        if dependency in keep:
+            print(f"  {dependency:<8}  linked (project setting)")
+        elif dependency in required:
+            print(f"  {dependency:<8}  linked (needed by the engine code the app uses)")
+        elif dependency in usage:
+            print(f"  {dependency:<8}  linked (referenced by {usage[dependency].relative_to(project_path)})")
+        else:
+            print(f"  {dependency:<8}  dropped (not referenced)")
+            dropped.append(dependency)
+    return dropped
+
+def get_dependency_link_args(dropped):
+    """Return the CMake switches that link or drop each bundled dependency."""
+    return [f"-DGIPWEBGL_WITH_{dependency.upper()}={'OFF' if dependency in dropped else 'ON'}"
+            for dependency in DEPENDENCY_INCLUDE_PATTERNS]
+
+def record_undefined_symbols(stderr_text):
+    """Append the undefined symbols a failed link reported to the build's log."""
+    log_path = os.environ.get("GIPWEBGL_UNDEFINED_LOG")
+    symbols = UNDEFINED_SYMBOL_PATTERN.findall(stderr_text)
+    if not log_path or not symbols:
+        return
+    with open(log_path, "a", encoding="utf-8") as f:
+        f.write("".join(f"{symbol.strip()}\n" for symbol in symbols))
+
+def find_dependencies_for_symbols(log_path, dropped):
+    """Return the dropped dependencies that define symbols the link was missing."""
+    needed = set()
+    try:
+        with open(log_path, "r", encoding="utf-8", errors="replace") as f:
+            symbols = [line.strip() for line in f if line.strip()]
+    except OSError:
+        return needed
+    for symbol in symbols:
+        for dependency in dropped:
+            if any(re.match(pattern, symbol) for pattern in DEPENDENCY_SYMBOL_PATTERNS[dependency]):
+                needed.add(dependency)
+    return needed
+
+def get_cache_dir(name):
+    """Return a directory under the builder's cache root, shared by all projects."""
+    cache_root = os.environ.get("GIPWEBGL_CACHE_DIR") or Path("./build") / ".cache"
+    return Path(cache_root).absolute() / name
+
+@contextlib.contextmanager
+def file_lock(lock_path):
+    """Hold an exclusive lock on a file, serializing concurrent builders."""
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a+") as lock_file:
+        if os.name == 'nt':
+            import msvcrt
+            lock_file.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(lock_file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    # LK_LOCK gives up after 10 seconds, keep waiting
+                    continue
+        else:
+            import fcntl
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if os.name == 'nt':
+                import msvcrt
+                lock_file.seek(0)
+                msvcrt.locking(lock_file.fileno(), msvcrt.LK_UNLCK, 1)
+            else:
+                import fcntl
+                fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+def hash_file(file_path):
+    """Return the sha256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def get_git_revision(repo_dir):
+    """Return the commit of a dependency checkout, marked when it has local changes."""
+    try:
+        result = subprocess.run(["git", "-C", str(repo_dir), "rev-parse", "HEAD"],
+                                capture_output=True, text=True, check=True)
+        revision = result.stdout.strip()
+        diff = subprocess.run(["git", "-C", str(repo_dir), "diff", "HEAD"],
+                              capture_output=True, check=True).stdout
+        if diff:
+            revision += "+" + hashlib.sha256(diff).hexdigest()[:16]
+        return revision
+    except (subprocess.CalledProcessError, FileNotFoundError):
+        return "unknown"
+
+def compute_dependency_cache_key(toolchain, dependency_args):
+    """Hash dependency revisions, toolchain version and compile flags into a cache key."""
+    inputs = {
+        "assimp": get_git_revision(PLUGIN_DIR / "deps" / "assimp"),
+        "freetype": get_git_revision(PLUGIN_DIR / "deps" / "freetype"),
+        "sqlite3": hash_file(PLUGIN_DIR / "libs" / "sqlite3.c"),
+        "deps_project": hash_file(PLUGIN_DIR / "cmake" / "deps" / "CMakeLists.txt"),
+        "freetype_project": hash_file(PLUGIN_DIR / "cmake" / "freetype.cmake"),
+        "emsdk_version": get_emsdk_version(),
+        "toolchain_file": str(toolchain["toolchain_file"]),
+        "build_type": "Release",
+        "dependency_args": list(dependency_args),
+    }
+    encoded = json.dumps(inputs, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:24]
+
+def write_dependency_manifest(cache_dir, key, libs):
+    """Write the CMake file that exposes cached libraries as imported targets."""
+    assimp_includes = f"{(PLUGIN_DIR / 'deps' / 'assimp' / 'include').as_posix()};${{CMAKE_CURRENT_LIST_DIR}}/include"
+    zlib_link = f"${{CMAKE_CURRENT_LIST_DIR}}/lib/{libs['zlibstatic']}" if libs.get("zlibstatic") else ""
+
+    manifest = f"""# Generated by project_builder.py, do not edit
+set(GIPWEBGL_DEPS_KEY "{key}")
+
+if(NOT TARGET assimp)
+	add_library(assimp STATIC IMPORTED GLOBAL)
+	set_target_properties(assimp PROPERTIES
+		IMPORTED_LOCATION "${{CMAKE_CURRENT_LIST_DIR}}/lib/{libs['assimp']}"
+		INTERFACE_INCLUDE_DIRECTORIES "{assimp_includes}"
+		INTERFACE_LINK_LIBRARIES "{zlib_link}"
+	)
+endif()
+
+if(NOT TARGET freetype)
+	add_library(freetype STATIC IMPORTED GLOBAL)
+	set_target_properties(freetype PROPERTIES
+		IMPORTED_LOCATION "${{CMAKE_CURRENT_LIST_DIR}}/lib/{libs['freetype']}"
+		INTERFACE_INCLUDE_DIRECTORIES "{(PLUGIN_DIR / 'deps' / 'freetype' / 'include').as_posix()}"
+	)
+endif()
+
+if(NOT TARGET sqlite3)
+	add_library(sqlite3 STATIC IMPORTED GLOBAL)
+	set_target_properties(sqlite3 PROPERTIES
+		IMPORTED_LOCATION "${{CMAKE_CURRENT_LIST_DIR}}/lib/{libs['sqlite3']}"
+	)
+endif()
+"""
+    # Written last, its presence marks the cache entry as complete
+    with open(cache_dir / DEPS_MANIFEST_NAME, "w") as f:
+        f.write(manifest)
+
+def build_dependency_cache(toolchain, dependency_args, cache_dir, key, jobs=None, launcher_args=()):
+    """Build assimp, freetype and sqlite3 once and store them in the cache."""
+    deps_build_dir = cache_dir.parent / f"build-{key}"
+    if deps_build_dir.exists():
+        shutil.rmtree(deps_build_dir)
+
+    cmake_cmd = toolchain["cmake_cmd"]
+    cmake_args = [cmake_cmd] + get_base_cmake_args(toolchain) + dependency_args + list(launcher_args) + [
+        "-B", str(deps_build_dir),
+        "-S", str(PLUGIN_DIR / "cmake" / "deps")
+    ]
+    print("Configuring shared dependencies...")
+    print(f"Running: {' '.join(cmake_args)}")
+    if subprocess.run(cmake_args).returncode != 0:
+        print("ERROR: Dependency configuration failed")
+        return False
+
+    build_args = [cmake_cmd, "--build", str(deps_build_dir)]
+    if jobs:
+        build_args.extend(["--parallel", str(jobs)])
+
+    if toolchain["generator"] == "Ninja":
+        step_log = deps_build_dir / ".ninja_log"
+    else:
+        step_log = deps_build_dir / TIMING_LOG_NAME
+    step_log_position = get_log_position(step_log)
+    project_step_log = os.environ.get("GIPWEBGL_TIMING_LOG")
+    if project_step_log:
+        os.environ["GIPWEBGL_TIMING_LOG"] = str(step_log)
+
+    print("Building shared dependencies...")
+    print(f"Running: {' '.join(build_args)}")
+    try:
+        result = subprocess.run(build_args)
+    finally:
+        if project_step_log:
+            os.environ["GIPWEBGL_TIMING_LOG"] = project_step_log
+    if result.returncode != 0:
+        print("ERROR: Dependency build failed")
+        return False
+    steps = report_build_steps(step_log, position=step_log_position)
+
+    # Collect the libraries and generated headers into the cache entry
+    built = {}
+    with open(deps_build_dir / "gipwebgl_deps_libs.txt", "r") as f:
+        for line in f:
+            name, _, value = line.strip().partition("=")
+            if name and value:
+                built[name] = Path(value)
+
+    if cache_dir.exists():
+        shutil.rmtree(cache_dir)
+    lib_dir = cache_dir / "lib"
+    lib_dir.mkdir(parents=True)
+
+    libs = {}
+    for name in ("assimp", "zlibstatic", "freetype", "sqlite3"):
+        if name in built:
+            shutil.copy2(built[name], lib_dir / built[name].name)
+            libs[name] = built[name].name
+    # Assimp generates config.h into its build tree
+    if built.get("assimp_include") and built["assimp_include"].exists():
+        shutil.copytree(built["assimp_include"], cache_dir / "include")
+    else:
+        (cache_dir / "include").mkdir()
+
+    with open(cache_dir / DEPS_STATS_NAME, "w") as f:
+        json.dump({"compile_seconds": get_component_compile_seconds(steps)}, f, indent=2)
+
+    write_dependency_manifest(cache_dir, key, libs)
+    shutil.rmtree(deps_build_dir, ignore_errors=True)
+    return True
+
+def ensure_dependency_cache(toolchain, dependency_args, jobs=None, launcher_args=()):
+    """Return the cache entry for these dependency settings, building it on a miss."""
+    key = compute_dependency_cache_key(toolchain, dependency_args)
+    cache_root = get_cache_dir("deps")
+    cache_dir = cache_root / key
+
+    if (cache_dir / DEPS_MANIFEST_NAME).exists():
+        print(f"Dependency cache: HIT {key} (assimp, freetype, sqlite3)")
+        return cache_dir
+
+    # Other builders may be producing the same entry, wait for them
+    with file_lock(cache_root / f"{key}.lock"):
+        if (cache_dir / DEPS_MANIFEST_NAME).exists():
+            print(f"Dependency cache: HIT {key} (built by a concurrent build)")
+            return cache_dir
+
+        print(f"Dependency cache: MISS {key}, building assimp, freetype and sqlite3")
+        try:
+            if not build_dependency_cache(toolchain, dependency_args, cache_dir, key, jobs, launcher_args):
+                return None
+        except Exception as e:
+            print(f"ERROR: Failed to build dependency cache: {e}")
+            return None
+
+    print(f"Dependency cache: stored {key}")
+    return cache_dir
+
+def compute_host_tool_key(name):
+    """Hash a host tool's sources, the dependency revisions it compiles in and the host platform."""
+    inputs = {
+        "tool": name,
+        "project": hash_file(HOST_TOOLS_DIR / "CMakeLists.txt"),
+        "sources": {source: hash_file(HOST_TOOLS_DIR / source) for source in HOST_TOOL_SOURCES[name]},
+        "dependencies": {dependency: get_git_revision(PLUGIN_DIR / "deps" / dependency)
+                         for dependency in HOST_TOOL_DEPENDENCIES[name]},
+        "platform": [platform.system(), platform.machine()],
+    }
+    encoded = json.dumps(inputs, sort_keys=True).encode("utf-8")
+    return hashlib.sha256(encoded).hexdigest()[:24]
+
+def build_host_tool(name, executable, key):
+    """Build a host tool with the host compiler and store its executable in the cache."""
+    cmake_cmd = find_cmake_executable()
+    if not cmake_cmd:
+        return False
+    tool_build_dir = executable.parent.parent.parent / f"build-{name}-{key}"
+    if tool_build_dir.exists():
+        shutil.rmtree(tool_build_dir)
+
+    cmake_args = [cmake_cmd, "-DCMAKE_BUILD_TYPE=Release", f"-DGIPWEBGL_HOST_TOOL={name}",
+                  "-B", str(tool_build_dir), "-S", str(HOST_TOOLS_DIR)]
+    print(f"Configuring host tool {name}...")
+    print(f"Running: {' '.join(cmake_args)}")
+    if subprocess.run(cmake_args).returncode != 0:
+        print(f"ERROR: Host tool {name} configuration failed")
+        return False
+
+    build_args = [cmake_cmd, "--build", str(tool_build_dir), "--target", name, "--config", "Release",
+                  "--parallel", str(os.cpu_count() or 1)]
+    print(f"Building host tool {name}...")
+    print(f"Running: {' '.join(build_args)}")
+    if subprocess.run(build_args).returncode != 0:
+        print(f"ERROR: Host tool {name} build failed")
+        return False
+
+    with open(tool_build_dir / HOST_TOOL_MANIFEST_NAME, "r") as f:
+        built = Path(f.read().strip())
+    # Copied under a temporary name, the executable's presence marks the entry complete
+    executable.parent.mkdir(parents=True, exist_ok=True)
+    temp_path = executable.with_name(f".{executable.name}.tmp")
+    shutil.copy2(built, temp_path)
+    os.replace(temp_path, executable)
+    shutil.rmtree(tool_build_dir, ignore_errors=True)
+    return True
+
+@functools.lru_cache(maxsize=None)
+def ensure_host_tool(name):
+    """Return the executable of a host tool, building it on a cache miss, or None if it cannot be built."""
+    missing = [dependency for dependency in HOST_TOOL_DEPENDENCIES[name]
+               if not (PLUGIN_DIR / "deps" / dependency / "CMakeLists.txt").exists()]
+    if missing:
+        print(f"WARNING: Cannot build host tool {name}, deps/{', deps/'.join(missing)} is not checked out")
+        return None
+
+    key = compute_host_tool_key(name)
+    cache_root = get_cache_dir("host_tools")
+    executable = cache_root / f"{name}-{key}" / "bin" / (name + (".exe" if os.name == 'nt' else ""))
+    if executable.exists():
+        print(f"Host tool cache: HIT {name}-{key}")
+        return executable
+
+    # Other builders may be producing the same tool, wait for them
+    with file_lock(cache_root / f"{name}-{key}.lock"):
+        if executable.exists():
+            print(f"Host tool cache: HIT {name}-{key} (built by a concurrent build)")
+            return executable
+
+        print(f"Host tool cache: MISS {name}-{key}, building {name}")
+        try:
+            if not build_host_tool(name, executable, key):
+                return None
+        except Exception as e:
+            print(f"ERROR: Failed to build host tool {name}: {e}")
+            return None
+
+    print(f"Host tool cache: stored {name}-{key}")
+    return executable
+
+def parse_size(size):
+    """Parse a size such as '500M' or '5G' into bytes."""
+    size = str(size).strip().upper().rstrip("B")
+    units = {"K": 1024, "M": 1024 ** 2, "G": 1024 ** 3, "T": 1024 ** 4}
+    if size and size[-1] in units:
+        return int(float(size[:-1]) * units[size[-1]])
+    return int(size)
+
+def get_compiler_launcher_args(include_linker=False):
+    """Return CMake arguments that route emcc/em++ through this script."""
+    launcher = f"{sys.executable};{Path(__file__).resolve()};{COMPILER_LAUNCHER_FLAG}"
+    launcher_args = [
+        f"-DCMAKE_C_COMPILER_LAUNCHER={launcher}",
+        f"-DCMAKE_CXX_COMPILER_LAUNCHER={launcher}",
+    ]
+    if include_linker:
+        launcher_args.extend(get_linker_launcher_args())
+    return launcher_args
+
+def get_linker_launcher_args():
+    """Return CMake arguments that route links through this script."""
+    linker_launcher = f"{sys.executable};{Path(__file__).resolve()};{LINKER_LAUNCHER_FLAG}"
+    return [
+        f"-DCMAKE_C_LINKER_LAUNCHER={linker_launcher}",
+        f"-DCMAKE_CXX_LINKER_LAUNCHER={linker_launcher}",
+    ]
+
+def expand_response_files(args):
+    """Replace @file arguments with the arguments stored in the file."""
+    expanded = []
+    for arg in args:
+        if arg.startswith("@") and os.path.isfile(arg[1:]):
+            with open(arg[1:], "r") as f:
+                expanded.extend(shlex.split(f.read(), posix=(os.name != 'nt')))
+        else:
+            expanded.append(arg)
+    return expanded
+
+def get_compiler_identity(compiler):
+    """Describe the compiler cheaply, without running it."""
+    compiler_path = Path(shutil.which(compiler) or compiler)
+    identity = [str(compiler_path)]
+    for candidate in (compiler_path, compiler_path.parent / "emscripten-version.txt"):
+        try:
+            stat = candidate.stat()
+            identity.append(f"{candidate.name}:{stat.st_size}:{stat.st_mtime_ns}")
+        except OSError:
+            pass
+    return "|".join(identity)
+
+def analyze_compile_command(args):
+    """Split a compile command into the parts the object cache needs.
+
+    Returns (output, hashed_args, preprocess_args), or None when the command
+    cannot be cached (linking, multiple sources, preprocessing only...).
+    """
+    if "-c" not in args or "-E" in args or "-" in args:
+        return None
+
+    output = None
+    sources = []
+    hashed_args = []
+    preprocess_args = []
+    skip_next = False
+    for i, arg in enumerate(args):
+        if skip_next:
+            skip_next = False
+            continue
+        if arg == "-o":
+            if i + 1 >= len(args):
+                return None
+            output = args[i + 1]
+            skip_next = True
+            continue
+        if arg.startswith("-o") and len(arg) > 2:
+            output = arg[2:]
+            continue
+        if arg == "-c":
+            continue
+
+        preprocess_args.append(arg)
+
+        # Preprocessor-only flags are already reflected in the preprocessed source
+        if arg in ("-I", "-D", "-U", "-MF", "-MT", "-MQ", "-isystem", "-include"):
+            if i + 1 < len(args):
+                preprocess_args.append(args[i + 1])
+            skip_next = True
+            continue
+        if arg.startswith(PREPROCESSOR_ONLY_PREFIXES) or arg in ("-MD", "-MMD"):
+            continue
+        if arg.startswith("@"):
+            # CMake keeps include paths in response files, hash the rest
+            hashed_args.extend(a for a in expand_response_files([arg])
+                               if not a.startswith(PREPROCESSOR_ONLY_PREFIXES))
+            continue
+        if not arg.startswith("-") and Path(arg).suffix.lower() in COMPILER_SOURCE_EXTENSIONS:
+            sources.append(arg)
+            continue
+        hashed_args.append(arg)
+
+    if output is None or len(sources) != 1:
+        return None
+    return output, hashed_args, preprocess_args + ["-E"]
+
+def record_compiler_cache_event(event, size=0):
+    """Append one hit/miss record to the current build's statistics log."""
+    log_path = os.environ.get("GIPWEBGL_CCACHE_LOG")
+    if not log_path:
+        return
+    # Small O_APPEND writes are atomic, so parallel launchers can share the log
+    fd = os.open(log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+    try:
+        os.write(fd, f"{event} {size}\n".encode("utf-8"))
+    finally:
+        os.close(fd)
+
+def run_cached_compile(argv, cache_dir):
+    """Compile through the object cache, returning the compiler's exit code."""
+    compiler, args = argv[0], argv[1:]
+    analysis = analyze_compile_command(args)
+    if analysis is None:
+        record_compiler_cache_event("uncacheable")
+        return subprocess.call(argv)
+    output, hashed_args, preprocess_args = analysis
+
+    # Hash the preprocessed source, this also writes the dependency file
+    result = subprocess.run([compiler] + preprocess_args, capture_output=True)
+    if result.returncode != 0:
+        record_compiler_cache_event("uncacheable")
+        return subprocess.call(argv)
+
+    digest = hashlib.sha256()
+    digest.update(get_compiler_identity(compiler).encode("utf-8"))
+    digest.update("\0".join(hashed_args).encode("utf-8"))
+    digest.update(result.stdout)
+    key = digest.hexdigest()
+
+    object_dir = cache_dir / "objects" / key[:2]
+    cached_object = object_dir / f"{key}.o"
+    cached_stderr = object_dir / f"{key}.stderr"
+
+    if cached_object.exists():
+        try:
+            shutil.copyfile(cached_object, output)
+            # Mark as recently used for LRU eviction
+            os.utime(cached_object)
+            if cached_stderr.exists():
+                sys.stderr.buffer.write(cached_stderr.read_bytes())
+            record_compiler_cache_event("hit", cached_object.stat().st_size)
+            return 0
+        except OSError:
+            # Evicted by a concurrent trim, compile instead
+            pass
+
+    result = subprocess.run(argv, stderr=subprocess.PIPE)
+    sys.stderr.buffer.write(result.stderr)
+    if result.returncode != 0:
+        return result.returncode
+
+    try:
+        object_dir.mkdir(parents=True, exist_ok=True)
+        temp_object = object_dir / f"{key}.{os.getpid()}.tmp"
+        shutil.copyfile(output, temp_object)
+        os.replace(temp_object, cached_object)
+        if result.stderr:
+            cached_stderr.write_bytes(result.stderr)
+        record_compiler_cache_event("miss", cached_object.stat().st_size)
+    except OSError:
+        record_compiler_cache_event("miss")
+    return 0
+
+def run_compiler_launcher(argv, link=False):
+    """Entry point used by CMake's compiler and linker launchers to run emcc/em++."""
+    if not argv:
+        print("ERROR: No compiler given to the compiler launcher")
+        return 1
+
+    start_time = time.time()
+    cache_dir = os.environ.get("GIPWEBGL_CCACHE_DIR")
+    if cache_dir and not link:
+        returncode = run_cached_compile(argv, Path(cache_dir))
+    elif link and os.environ.get("GIPWEBGL_UNDEFINED_LOG"):
+        # Keep the linker's errors to find symbols of dropped dependencies
+        result = subprocess.run(argv, stderr=subprocess.PIPE, text=True, errors="replace")
+        sys.stderr.write(result.stderr)
+        if result.returncode != 0:
+            record_undefined_symbols(result.stderr)
+        returncode = result.returncode
+    else:
+        returncode = subprocess.call(argv)
+
+    # Makefile builds have no .ninja_log, so the launcher keeps one
+    record_build_step(start_time, time.time(), get_command_output(argv[1:]))
+    return returncode
 
-    # Copy assets to build directory so Emscripten can find them
-    build_assets_dir = build_dir / "assets"
-    if build_assets_dir.exists():
-        shutil.rmtree(build_assets_dir)
+def read_compiler_cache_stats(log_path):
+    """Summarize the hit/miss records written by the launchers during a build."""
+    stats = {"hit": 0, "miss": 0, "uncacheable": 0, "bytes_saved": 0}
+    try:
+        with open(log_path, "r") as f:
+            for line in f:
+                event, _, size = line.strip().partition(" ")
+                if event in stats:
+                    stats[event] += 1
+                if event == "hit" and size:
+                    stats["bytes_saved"] += int(size)
+    except OSError:
+        pass
+    return stats
+
+def trim_compiler_cache(cache_dir, max_size):
+    """Evict the least recently used objects until the cache fits in max_size bytes."""
+    with file_lock(cache_dir / "trim.lock"):
+        entries = []
+        total_size = 0
+        for object_file in (cache_dir / "objects").glob("*/*.o"):
+            try:
+                stat = object_file.stat()
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, object_file))
+            total_size += stat.st_size
+
+        evicted = 0
+        for _, size, object_file in sorted(entries):
+            if total_size <= max_size:
+                break
+            try:
+                object_file.unlink()
+                stderr_file = object_file.with_suffix(".stderr")
+                if stderr_file.exists():
+                    stderr_file.unlink()
+            except OSError:
+                continue
+            total_size -= size
+            evicted += 1
+    return evicted, total_size
+
+def report_compiler_cache(build_dir, options):
+    """Print this build's compiler cache statistics and enforce the size cap."""
+    cache_dir = get_cache_dir("ccache")
+    stats = read_compiler_cache_stats(build_dir / CCACHE_LOG_NAME)
+    cacheable = stats["hit"] + stats["miss"]
+    hit_rate = 100.0 * stats["hit"] / cacheable if cacheable else 0.0
+
+    print(f"Compiler cache: {stats['hit']} hits, {stats['miss']} misses, "
+          f"{stats['uncacheable']} uncacheable ({hit_rate:.0f}% hit rate), "
+          f"{stats['bytes_saved'] / (1024 * 1024):.1f} MB of objects reused")
+
+    max_size = parse_size(options.get("ccache_size") or DEFAULT_CCACHE_SIZE)
+    evicted, total_size = trim_compiler_cache(cache_dir, max_size)
+    if evicted:
+        print(f"Compiler cache: evicted {evicted} objects to stay under {max_size / (1024 ** 3):.1f} GB")
+    print(f"Compiler cache size: {total_size / (1024 * 1024):.1f} MB")
 
+def get_command_output(args):
+    """Return the -o argument of a compiler or linker command line."""
+    for i, arg in enumerate(args):
+        if arg == "-o" and i + 1 < len(args):
+            return args[i + 1]
+        if arg.startswith("-o") and len(arg) > 2:
+            return arg[2:]
+    return "unknown"
+
+def record_build_step(start_time, end_time, output):
+    """Append a .ninja_log style line for one compile or link step."""
+    log_path = os.environ.get("GIPWEBGL_TIMING_LOG")
+    if not log_path:
+        return
+    line = f"{int(start_time * 1000)}\t{int(end_time * 1000)}\t0\t{output}\t0\n"
+    fd = os.open(log_path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
     try:
-        shutil.copytree(assets_dir, build_assets_dir)
-        print(f"Assets copied to: {build_assets_dir}")
-        return build_assets_dir
-    except Exception as e:
-        print(f"ERROR: Failed to copy assets: {e}")
+        os.write(fd, line.encode("utf-8"))
+    finally:
+        os.close(fd)
+
+def get_log_position(log_path):
+    """Return where a build log ends before a build, None when there is no log yet."""
+    try:
+        stat = log_path.stat()
+    except OSError:
         return None
+    return stat.st_ino, stat.st_size
 
-def find_cmake_executable():
-    """Find cmake executable in system PATH or glist zbin directory."""
-    # First try system PATH
+def read_build_steps(log_path, position=None):
+    """Read the steps a build appended to a .ninja_log style file.
+
+    position is the get_log_position of the log before the build, Ninja
+    appends to its log across builds. Returns a list of (start_ms, end_ms,
+    outputs) tuples, [] when the build appended nothing, e.g. because it had
+    nothing to do, or when Ninja recompacted the log into a new file, whose
+    order no longer tells the builds apart.
+    """
+    steps = []
+    last_edge = None
     try:
-        subprocess.run(["cmake", "--version"], check=True, capture_output=True)
-        print("Using cmake from system PATH")
-        return "cmake"
-    except (subprocess.CalledProcessError, FileNotFoundError):
-        pass
+        with open(log_path, "rb") as f:
+            if position is not None:
+                inode, size = position
+                if os.fstat(f.fileno()).st_ino != inode:
+                    return []
+                f.seek(size)
+            for raw_line in f:
+                line = raw_line.decode("utf-8", errors="replace")
+                if line.startswith("#"):
+                    continue
+                fields = line.rstrip("\r\n").split("\t")
+                if len(fields) < 4:
+                    continue
+                start, end, output = int(fields[0]), int(fields[1]), fields[3]
+                # Edges with several outputs are logged once per output on
+                # consecutive lines, other edges can share their times
+                edge = (start, end, fields[4] if len(fields) > 4 else None)
+                if edge == last_edge:
+                    steps[-1][2].append(output)
+                else:
+                    steps.append((start, end, [output]))
+                last_edge = edge
+    except (OSError, ValueError):
+        return []
+    return steps
 
-    # Try to find in glist zbin directory
-    current_dir = Path.cwd()
-    glist_dir = current_dir.parent.parent  # gipWebGL -> glistplugins -> glist
-    zbin_dir = glist_dir / "zbin"
+def classify_build_step(output):
+    """Return the (component, kind) of a build step from its output path."""
+    path = output.replace("\\", "/").lower()
+    kind = "compile" if path.endswith((".o", ".obj")) else "link"
+    if "sqlite3" in path:
+        return "sqlite3", kind
+    if "assimp" in path or "zlib" in path:
+        return "assimp", kind
+    if "freetype" in path:
+        return "freetype", kind
+    if "glistengine" in path or "glistplugins" in path:
+        return "engine", kind
+    return "app", kind
 
-    if zbin_dir.exists():
-        # Look for glistzbin-* directories
-        for zbin_platform_dir in zbin_dir.glob("glistzbin-*"):
-            if zbin_platform_dir.is_dir():
-                # Try different possible cmake paths
-                cmake_paths = [
-                    zbin_platform_dir / "cmake" / "bin" / "cmake",
-                    zbin_platform_dir / "cmake" / "bin" / "cmake.exe",
-                    zbin_platform_dir / "CMake" / "bin" / "cmake",
-                    zbin_platform_dir / "CMake" / "bin" / "cmake.exe",
-                    zbin_platform_dir / "bin" / "cmake",
-                    zbin_platform_dir / "bin" / "cmake.exe"
-                ]
-
-                for cmake_path in cmake_paths:
-                    if cmake_path.exists():
-                        print(f"Found cmake at: {cmake_path}")
-                        return str(cmake_path)
+def estimate_critical_path(steps):
+    """Estimate the critical path by chaining steps that finished before each start.
 
-    print("ERROR: Could not find cmake executable")
-    return None
+    The log holds no dependency edges, so walk back from the last step to the
+    step that finished most recently before it started.
+    """
+    if not steps:
+        return []
+    by_end = sorted(steps, key=lambda step: step[1])
+    ends = [step[1] for step in by_end]
+    chain = [by_end[-1]]
+    while True:
+        # Allow a few milliseconds of scheduling slack between steps
+        index = bisect.bisect_right(ends, chain[-1][0] + 5) - 1
+        while index >= 0 and by_end[index] in chain:
+            index -= 1
+        if index < 0:
+            break
+        chain.append(by_end[index])
+    chain.reverse()
+    return chain
 
-def setup_emscripten_cmake_flags(project_path, build_dir):
-    """Setup Emscripten-specific CMake flags for asset loading and web output."""
-    flags = []
+def report_build_steps(log_path, top_count=10, position=None):
+    """Print the slowest steps, per-component totals, critical path and parallelism."""
+    steps = read_build_steps(log_path, position)
+    if not steps or top_count <= 0:
+        return steps
 
-    # Check if assets directory exists
-    assets_dir = build_dir / "assets"
-    if assets_dir.exists() and any(assets_dir.iterdir()):
-        # Use Emscripten's --preload-file to pack assets
-        flags.extend([
-            f"-DCMAKE_EXE_LINKER_FLAGS=--preload-file {assets_dir}@/assets"
-        ])
-        print("Assets found - will be packed with --preload-file")
+    wall_ms = max(step[1] for step in steps) - min(step[0] for step in steps)
+    total_ms = sum(step[1] - step[0] for step in steps)
 
-    # Add common Emscripten web optimization flags
-    common_flags = [
-        "-DCMAKE_EXECUTABLE_SUFFIX='.html'",
-        "-DCMAKE_EXE_LINKER_FLAGS_RELEASE=-s EXPORTED_FUNCTIONS=['_main','_malloc','_free'] -s EXPORTED_RUNTIME_METHODS=['ccall','cwrap']"
-    ]
+    print(f"\nSlowest {min(top_count, len(steps))} of {len(steps)} build steps:")
+    for start, end, outputs in sorted(steps, key=lambda step: step[0] - step[1])[:top_count]:
+        component, kind = classify_build_step(outputs[0])
+        print(f"  {(end - start) / 1000:8.2f}s  {component:<8}  {kind:<7}  {outputs[0]}")
 
-    flags.extend(common_flags)
+    components = {}
+    for start, end, outputs in steps:
+        component, _ = classify_build_step(outputs[0])
+        count, duration = components.get(component, (0, 0))
+        components[component] = (count + 1, duration + end - start)
 
-    print(f"\nFinal CMake flags: {len(flags)} flags configured")
-    return flags
+    print("\nBuild time by component:")
+    for component, (count, duration) in sorted(components.items(), key=lambda item: -item[1][1]):
+        share = 100.0 * duration / total_ms if total_ms else 0.0
+        print(f"  {component:<8}  {count:5d} steps  {duration / 1000:8.2f}s  ({share:.0f}%)")
+
+    chain = estimate_critical_path(steps)
+    critical_ms = sum(end - start for start, end, _ in chain)
+    parallelism = total_ms / wall_ms if wall_ms else 1.0
+    print(f"\nEstimated critical path: {critical_ms / 1000:.2f}s over {len(chain)} steps "
+          f"(build wall time {wall_ms / 1000:.2f}s)")
+    for start, end, outputs in chain[-5:]:
+        print(f"  {(end - start) / 1000:8.2f}s  {outputs[0]}")
+    print(f"Achieved parallelism: {parallelism:.1f} jobs on average")
+    return steps
+
+def get_component_compile_seconds(steps):
+    """Return the total compile time of each component in a list of build steps."""
+    seconds = {}
+    for start, end, outputs in steps:
+        component, kind = classify_build_step(outputs[0])
+        if kind == "compile":
+            seconds[component] = seconds.get(component, 0.0) + (end - start) / 1000
+    return seconds
+
+def report_sqlite_profile(build_dir, project_name, profile, steps, deps_dir=None):
+    """Record the .wasm size and sqlite3.c compile time of this build's SQLite profile
+    and print them next to the other profiles this project was built with."""
+    stats_file = build_dir / SQLITE_STATS_NAME
+    try:
+        with open(stats_file, "r") as f:
+            stats = json.load(f)
+    except (OSError, ValueError):
+        stats = {}
+    entry = stats.setdefault(profile, {})
+
+    wasm_file = build_dir / f"{project_name}.wasm"
+    if wasm_file.exists():
+        entry["wasm_size"] = wasm_file.stat().st_size
+
+    # With the dependency cache sqlite3.c was compiled when the entry was built
+    compile_seconds = get_component_compile_seconds(steps)
+    if "sqlite3" not in compile_seconds and deps_dir:
+        try:
+            with open(deps_dir / DEPS_STATS_NAME, "r") as f:
+                compile_seconds = json.load(f).get("compile_seconds", {})
+        except (OSError, ValueError):
+            pass
+    if "sqlite3" in compile_seconds:
+        entry["compile_seconds"] = compile_seconds["sqlite3"]
+
+    with open(stats_file, "w") as f:
+        json.dump(stats, f, indent=2)
 
+    print("\nSQLite profiles:")
+    current_size = entry.get("wasm_size")
+    for name in sorted(stats):
+        wasm_size = stats[name].get("wasm_size")
+        size_text = f"{wasm_size / (1024 * 1024):.2f} MB .wasm" if wasm_size else "no .wasm"
+        if wasm_size and current_size and name != profile:
+            size_text += f" ({(wasm_size - current_size) / 1024:+.0f} KB)"
+        seconds = stats[name].get("compile_seconds")
+        time_text = f", sqlite3.c compiled in {seconds:.2f}s" if seconds is not None else ""
+        marker = " (this build)" if name == profile else ""
+        print(f"  {name:<8}  {size_text}{time_text}{marker}")
+
+def build_steps_to_trace_events(steps, base_us):
+    """Lay build steps out on lanes as Chrome trace events starting at base_us."""
+    events = []
+    lane_ends = []
+    for start, end, outputs in sorted(steps):
+        # Reuse the first lane that is free again, like a job slot
+        lane = next((i for i, lane_end in enumerate(lane_ends) if lane_end <= start), len(lane_ends))
+        if lane == len(lane_ends):
+            lane_ends.append(end)
+        else:
+            lane_ends[lane] = end
+        component, kind = classify_build_step(outputs[0])
+        events.append({
+            "name": Path(outputs[0]).name,
+            "cat": f"{component},{kind}",
+            "ph": "X",
+            "ts": base_us + start * 1000,
+            "dur": (end - start) * 1000,
+            "pid": "build steps",
+            "tid": lane,
+            "args": {"outputs": outputs},
+        })
+    return events
 
-def compile_project(project_path):
+def compile_project(project_path, options=None):
     """Compile the selected project using emscripten with native asset packing."""
+    options = options or {}
     project_name = project_path.name
     build_dir = Path("./build").absolute() / project_name
 
     # Create build directory
     build_dir.mkdir(parents=True, exist_ok=True)
 
-    # Clear CMake cache to avoid generator conflicts
-    cmake_cache = build_dir / "CMakeCache.txt"
-    cmake_files_dir = build_dir / "CMakeFiles"
-
-    if cmake_cache.exists():
-        print("Clearing CMake cache...")
-        cmake_cache.unlink()
-
-    if cmake_files_dir.exists():
-        print("Clearing CMakeFiles directory...")
-        shutil.rmtree(cmake_files_dir)
-
-    # Copy assets for Emscripten to pack
-    copy_assets(project_path, build_dir)
+    project_config = load_project_config(project_path)
+    if project_config is None:
+        return False
 
-    # Setup emscripten environment
-    setup_emscripten_env()
+    # Sync assets for Emscripten to pack and split them into bundles, unless
+    # the caller knows they are unchanged
+    if not options.get("skip_assets"):
+        with trace_phase("copy_assets"):
+            asset_sync = copy_assets(project_path, build_dir, options, project_config)
+        if asset_sync is None:
+            return False
+        with trace_phase("package_asset_bundles"):
+            bundles = package_asset_bundles(project_path, build_dir, project_config, options)
+        if bundles is None:
+            return False
+        if asset_sync["changed"] or bundles["changed"]:
+            force_relink(build_dir, project_name)
 
-    # Find cmake executable
-    cmake_cmd = find_cmake_executable()
-    if not cmake_cmd:
+    # Reuse a toolchain resolved by the caller, e.g. once for a whole batch
+    toolchain = options.get("toolchain") or resolve_toolchain()
+    if not toolchain:
         return False
 
-    # Find build tool (ninja or make)
-    build_cmd, generator = find_or_install_ninja()
-    if not build_cmd:
-        return False
+    cmake_cmd = toolchain["cmake_cmd"]
+    build_cmd = toolchain["build_cmd"]
+    generator = toolchain["generator"]
+    toolchain_file = toolchain["toolchain_file"]
 
     try:
-        # Find emscripten toolchain file
-        emsdk_dir = Path("./emsdk").absolute()
-        if emsdk_dir.exists():
-            toolchain_file = emsdk_dir / "upstream" / "emscripten" / "cmake" / "Modules" / "Platform" / "Emscripten.cmake"
-        else:
-            # Try to find in system
-            result = subprocess.run(["emcc", "--print-sysroot"], capture_output=True, text=True)
-            if result.returncode == 0:
-                sysroot = result.stdout.strip()
-                toolchain_file = Path(sysroot).parent / "cmake" / "Modules" / "Platform" / "Emscripten.cmake"
-            else:
-                print("ERROR: Could not find emscripten toolchain file")
-                return False
-
         print(f"Using toolchain file: {toolchain_file}")
         print(f"Using cmake: {cmake_cmd}")
         print(f"Using build tool: {build_cmd} (generator: {generator})")
 
         # Get Emscripten-specific flags
-        emscripten_flags = setup_emscripten_cmake_flags(project_path, build_dir)
+        emscripten_flags = setup_emscripten_cmake_flags(project_path, build_dir, options)
 
         # Configure with CMake
-        cmake_args = [
-            cmake_cmd,
-            "-DCMAKE_TOOLCHAIN_FILE=" + str(toolchain_file),
-            "-DCMAKE_BUILD_TYPE=Release",
-
-            # Use the appropriate build tool
-            "-DCMAKE_MAKE_PROGRAM=" + build_cmd,
-            "-G", generator,
-
-            # Emscripten-specific fixes
-            "-DCMAKE_CROSSCOMPILING=ON",
-            "-DCMAKE_SYSTEM_NAME=Emscripten",
-            "-DCMAKE_SYSTEM_PROCESSOR=x86",
+        dependency_args = get_dependency_cmake_args(project_path, project_config)
+        cmake_args = [cmake_cmd] + get_base_cmake_args(toolchain) + dependency_args
 
-            # Fix for CheckTypeSize issues with Emscripten
-            "-DCMAKE_TRY_COMPILE_TARGET_TYPE=STATIC_LIBRARY",
-
-            # Assimp configuration
-            "-DASSIMP_BUILD_ZLIB=ON",
-            "-DASSIMP_WARNINGS_AS_ERRORS=OFF",
+        # Route emcc/em++ through the object cache
+        launcher_args = []
+        if options.get("ccache"):
+            launcher_args = get_compiler_launcher_args()
+            os.environ["GIPWEBGL_CCACHE_DIR"] = str(get_cache_dir("ccache"))
+            os.environ["GIPWEBGL_CCACHE_LOG"] = str(build_dir / CCACHE_LOG_NAME)
+            (build_dir / CCACHE_LOG_NAME).unlink(missing_ok=True)
+        else:
+            os.environ.pop("GIPWEBGL_CCACHE_DIR", None)
 
-            # FreeType configuration
-            "-DFT_DISABLE_HARFBUZZ=ON",
+        # Only Ninja logs step timings itself, time Makefile steps in the launcher
+        if generator == "Ninja":
+            step_log = build_dir / ".ninja_log"
+            os.environ.pop("GIPWEBGL_TIMING_LOG", None)
+        else:
+            step_log = build_dir / TIMING_LOG_NAME
+            launcher_args = get_compiler_launcher_args(include_linker=True)
+            os.environ["GIPWEBGL_TIMING_LOG"] = str(step_log)
+        cmake_args.extend(launcher_args)
 
-            # General dependency management
-            "-DCMAKE_FIND_ROOT_PATH_MODE_PROGRAM=NEVER",
-            "-DCMAKE_FIND_ROOT_PATH_MODE_LIBRARY=ONLY",
-            "-DCMAKE_FIND_ROOT_PATH_MODE_INCLUDE=ONLY",
+        # Leave dependencies the project never references out of the link,
+        # the linker launcher reports symbols that prove otherwise
+        print("Dependencies:")
+        cmake_version = get_cmake_version(cmake_cmd)
+        dropped = get_dropped_dependencies(project_path, project_config, build_dir, cmake_version)
+        cmake_args.extend(get_dependency_link_args(dropped))
+        undefined_log = build_dir / UNDEFINED_LOG_NAME
+        undefined_log.unlink(missing_ok=True)
+        if dropped:
+            os.environ["GIPWEBGL_UNDEFINED_LOG"] = str(undefined_log)
+        else:
+            os.environ.pop("GIPWEBGL_UNDEFINED_LOG", None)
+        if generator == "Ninja" and cmake_version >= MIN_LINKER_LAUNCHER_CMAKE:
+            # Always set, so linking a dropped dependency again only updates the cache
+            cmake_args.extend(get_linker_launcher_args() if dropped else
+                              ["-DCMAKE_C_LINKER_LAUNCHER=", "-DCMAKE_CXX_LINKER_LAUNCHER="])
 
-            # Skip problematic checks
-            "-DHAVE_OFF64_T=OFF",
-            "-DOFF64_T=OFF",
+        # Link the shared prebuilt dependencies instead of compiling them here
+        deps_dir = None
+        if options.get("dep_cache", True):
+            with trace_phase("dependency_cache"):
+                deps_dir = ensure_dependency_cache(toolchain, dependency_args, options.get("jobs"), launcher_args)
+            if deps_dir:
+                cmake_args.append(f"-DGIPWEBGL_PREBUILT_DEPS={deps_dir}")
+            else:
+                print("WARNING: Dependency cache unavailable, building dependencies in the project")
 
+        cmake_args.extend([
             "-B", str(build_dir),
             "-S", str(project_path)
-        ]
+        ])
 
         # Add Emscripten-specific flags
         cmake_args.extend(emscripten_flags)
 
-        print("Configuring project...")
-        print(f"Running: {' '.join(cmake_args)}")
-        result = subprocess.run(cmake_args)
-        if result.returncode != 0:
-            print("ERROR: CMake configuration failed")
-            return False
+        # Only reconfigure when something that affects the configure step changed
+        fingerprint, fingerprint_inputs = compute_configure_fingerprint(
+            cmake_args, toolchain_file, generator, get_emsdk_version(), emscripten_flags)
+        cmake_cache = build_dir / "CMakeCache.txt"
+
+        stamp = read_configure_stamp(build_dir) if cmake_cache.exists() else {}
+        configured = stamp.get("fingerprint") == fingerprint
+        if configured and not options.get("force_configure"):
+            print("Configuration unchanged, skipping CMake configure")
+        else:
+            # Clear CMake cache to avoid generator conflicts, changed -D
+            # values alone keep it and only rebuild what they affect
+            if needs_fresh_configure(stamp.get("inputs"), fingerprint_inputs):
+                clear_cmake_cache(build_dir)
+
+            print("Configuring project...")
+            print(f"Running: {' '.join(cmake_args)}")
+            with trace_phase("cmake_configure"):
+                result = subprocess.run(cmake_args)
+            if result.returncode != 0:
+                print("ERROR: CMake configuration failed")
+                return False
+
+            write_configure_stamp(build_dir, fingerprint, fingerprint_inputs)
 
         # Build project
         print("Building project...")
         build_args = [cmake_cmd, "--build", str(build_dir)]
+        if options.get("jobs"):
+            build_args.extend(["--parallel", str(options["jobs"])])
         print(f"Running: {' '.join(build_args)}")
-        result = subprocess.run(build_args)
+        if generator != "Ninja":
+            step_log.unlink(missing_ok=True)
+        step_log_position = get_log_position(step_log)
+        build_start = time.time()
+        with trace_phase("cmake_build"):
+            result = subprocess.run(build_args)
+        if options.get("ccache"):
+            report_compiler_cache(build_dir, options)
+
+        steps = report_build_steps(step_log, options.get("slowest", DEFAULT_SLOWEST_STEPS), step_log_position)
+        if steps and _build_trace is not None:
+            # Ninja times are relative to its start, the launcher's are absolute
+            base_us = build_start * 1e6 if generator == "Ninja" else 0
+            _build_trace.events.extend(build_steps_to_trace_events(steps, base_us))
         if result.returncode != 0:
+            needed = find_dependencies_for_symbols(undefined_log, dropped)
+            if needed and not options.get("dependency_retry"):
+                # The engine code the app uses needs them, keep them from now on
+                print(f"Link needs {', '.join(sorted(needed))}, rebuilding with them linked")
+                usage = scan_dependency_usage(project_path)
+                write_required_dependencies(build_dir, read_required_dependencies(build_dir, usage) | needed, usage)
+                return compile_project(project_path, dict(options, dependency_retry=True, skip_assets=True))
             print("ERROR: Build failed")
             return False
 
+        if dropped:
+            print(f"Dropped unused dependencies: {', '.join(dropped)}")
+        if "sqlite3" not in dropped:
+            report_sqlite_profile(build_dir, project_name, get_sqlite_profile(project_config), steps, deps_dir)
+
+        report_asset_package(build_dir, project_name, options)
         print(f"Project built successfully in {build_dir}")
         return True
 
@@ -218,6 +3427,11 @@ def compile_project(project_path):
 
 def create_zip_package(project_path):
     """Create a zip file with only the Emscripten-generated web files."""
+    with trace_phase("zip_package"):
+        return write_zip_package(project_path)
+
+def write_zip_package(project_path):
+    """Write the zip file for create_zip_package."""
     project_name = project_path.name
     build_dir = Path("./build") / project_name
     zip_path = Path("./build") / f"{project_name}_webgl.zip"
@@ -340,7 +3554,8 @@ def check_and_install_emsdk():
     """Check if emsdk is available and install if needed."""
     # Check if emcc is available in PATH
     try:
-        subprocess.run(["emcc", "--version"], check=True, capture_output=True)
+        emcc = shutil.which("emcc") or "emcc"
+        probe_tool(emcc, check=True, extra_files=get_emcc_version_files(emcc))
         print("Emscripten found in PATH")
         return True
     except (subprocess.CalledProcessError, FileNotFoundError):
@@ -441,39 +3656,46 @@ def select_project(projects):
 def find_or_install_ninja():
     """Find ninja executable in system PATH, glist zbin, or install it."""
 
+    # Only ninja is cached, a make fallback is looked up again so a ninja
+    # installed later gets used
+    cached = recall_tool("build_tool")
+    if cached and cached["generator"] == "Ninja":
+        print(f"Using cached build tool: {cached['path']} ({cached['generator']})")
+        return cached["path"], cached["generator"]
+
+    build_cmd, generator = find_ninja()
+    if build_cmd and generator == "Ninja":
+        remember_tool("build_tool", build_cmd, generator=generator)
+    return build_cmd, generator
+
+def find_ninja():
+    """Find ninja executable in system PATH, glist zbin, or install it, uncached."""
     # First try system PATH
     try:
-        subprocess.run(["ninja", "--version"], check=True, capture_output=True)
+        probe_tool("ninja", check=True)
         print("Using ninja from PATH ")
         return Path(shutil.which("ninja")).absolute().__str__(), "Ninja"
     except (subprocess.CalledProcessError, FileNotFoundError):
         pass
 
     # Try to find in glist zbin directory
-    current_dir = Path.cwd()
-    glist_dir = current_dir.parent.parent  # gipWebGL -> glistplugins -> glist
-    zbin_dir = glist_dir / "zbin"
-    
-    if zbin_dir.exists():
-        # Look for glistzbin-* directories
-        for zbin_platform_dir in zbin_dir.glob("glistzbin-*"):
-            if zbin_platform_dir.is_dir():
-                # Try different possible ninja paths
-                ninja_paths = [
-                    zbin_platform_dir / "bin" / "ninja.exe",
-                    zbin_platform_dir / "bin" / "ninja",
-                    zbin_platform_dir / "clang64" / "bin" / "ninja.exe",
-                    zbin_platform_dir / "clang64" / "bin" / "ninja"
-                ]
-                
-                for ninja_path in ninja_paths:
-                    if ninja_path.exists():
-                        print(f"Found ninja at: {ninja_path}")
-                        # Add the bin directory to PATH
-                        bin_dir = ninja_path.parent
-                        current_path = os.environ.get('PATH', '')
-                        os.environ["PATH"] = f"{bin_dir}{os.pathsep}{current_path}"
-                        return str(ninja_path), "Ninja"
+    for zbin_platform_dir in find_zbin_platform_dirs():
+        # Try different possible ninja paths
+        ninja_paths = [
+            zbin_platform_dir / "bin" / "ninja.exe",
+            zbin_platform_dir / "bin" / "ninja",
+            zbin_platform_dir / "clang64" / "bin" / "ninja.exe",
+            zbin_platform_dir / "clang64" / "bin" / "ninja"
+        ]
+        
+        for ninja_path in ninja_paths:
+            if ninja_path.exists():
+                print(f"Found ninja at: {ninja_path}")
+                # Add the bin directory to PATH
+                bin_dir = ninja_path.parent
+                current_path = os.environ.get('PATH', '')
+                os.environ["PATH"] = f"{bin_dir}{os.pathsep}{current_path}"
+                return str(ninja_path), "Ninja"
     
     # Check if ninja is already installed locally
     local_ninja = Path("./ninja").absolute()
@@ -494,8 +3716,7 @@ def find_or_install_ninja():
         
         # Test that ninja actually works
         try:
-            ninja_cmd = "ninja.exe" if os.name == 'nt' else "ninja"
-            result = subprocess.run([ninja_cmd, "--version"], check=True, capture_output=True, text=True)
+            result = probe_tool(local_ninja, check=True)
             print(f"Local ninja version: {result.stdout.strip()}")
             return str(local_ninja), "Ninja"
         except Exception as e:
@@ -683,35 +3904,28 @@ def fallback_to_make():
     print("Falling back to make...")
     
     # First try to find in glist zbin directory
-    current_dir = Path.cwd()
-    glist_dir = current_dir.parent.parent  # gipWebGL -> glistplugins -> glist
-    zbin_dir = glist_dir / "zbin"
-    
-    if zbin_dir.exists():
-        # Look for glistzbin-* directories
-        for zbin_platform_dir in zbin_dir.glob("glistzbin-*"):
-            if zbin_platform_dir.is_dir():
-                # Try different possible make paths
-                make_paths = [
-                    zbin_platform_dir / "clang64" / "bin" / "mingw32-make.exe",
-                    zbin_platform_dir / "clang64" / "bin" / "make.exe",
-                    zbin_platform_dir / "bin" / "mingw32-make.exe",
-                    zbin_platform_dir / "bin" / "make.exe",
-                    zbin_platform_dir / "bin" / "make"
-                ]
-                
-                for make_path in make_paths:
-                    if make_path.exists():
-                        print(f"Found make at: {make_path}")
-                        # Add the bin directory to PATH
-                        bin_dir = make_path.parent
-                        current_path = os.environ.get('PATH', '')
-                        os.environ["PATH"] = f"{bin_dir}{os.pathsep}{current_path}"
-                        return str(make_path), "Unix Makefiles"
+    for zbin_platform_dir in find_zbin_platform_dirs():
+        # Try different possible make paths
+        make_paths = [
+            zbin_platform_dir / "clang64" / "bin" / "mingw32-make.exe",
+            zbin_platform_dir / "clang64" / "bin" / "make.exe",
+            zbin_platform_dir / "bin" / "mingw32-make.exe",
+            zbin_platform_dir / "bin" / "make.exe",
+            zbin_platform_dir / "bin" / "make"
+        ]
+        
+        for make_path in make_paths:
+            if make_path.exists():
+                print(f"Found make at: {make_path}")
+                # Add the bin directory to PATH
+                bin_dir = make_path.parent
+                current_path = os.environ.get('PATH', '')
+                os.environ["PATH"] = f"{bin_dir}{os.pathsep}{current_path}"
+                return str(make_path), "Unix Makefiles"
     
     # Fall back to system PATH
     try:
-        subprocess.run(["make", "--version"], check=True, capture_output=True)
+        probe_tool("make", check=True)
         print("Using make from system PATH")
         return "make", "Unix Makefiles"
     except (subprocess.CalledProcessError, FileNotFoundError):
@@ -719,7 +3933,7 @@ def fallback_to_make():
     
     # Try mingw32-make in system PATH
     try:
-        subprocess.run(["mingw32-make", "--version"], check=True, capture_output=True)
+        probe_tool("mingw32-make", check=True)
         print("Using mingw32-make from system PATH")
         return "mingw32-make", "Unix Makefiles"
     except (subprocess.CalledProcessError, FileNotFoundError):
@@ -740,7 +3954,8 @@ def setup_emscripten_env():
         
         # Add emscripten to PATH at the beginning
         current_path = os.environ.get('PATH', '')
-        os.environ["PATH"] = f"{upstream_emscripten}{os.pathsep}{current_path}"
+        if str(upstream_emscripten) not in current_path.split(os.pathsep):
+            os.environ["PATH"] = f"{upstream_emscripten}{os.pathsep}{current_path}"
         
         # Set emscripten-specific variables
         os.environ["EMSCRIPTEN"] = str(upstream_emscripten)
@@ -749,20 +3964,8 @@ def setup_emscripten_env():
         
         # Verify emcc is accessible
         try:
-            emcc_path = upstream_emscripten / "emcc"
-            if os.name == 'nt':
-                # On Windows, try both emcc.bat and emcc
-                emcc_candidates = [
-                    upstream_emscripten / "emcc.bat",
-                    upstream_emscripten / "emcc"
-                ]
-                for candidate in emcc_candidates:
-                    if candidate.exists():
-                        emcc_path = candidate
-                        break
-            
-            result = subprocess.run([str(emcc_path), "--version"], 
-                                  capture_output=True, text=True, timeout=10)
+            emcc_path = get_local_emcc_path() or upstream_emscripten / "emcc"
+            result = probe_tool(emcc_path, timeout=10, extra_files=get_emcc_version_files(emcc_path))
             if result.returncode == 0:
                 print("Emscripten compiler verification: OK")
             else:
@@ -773,7 +3976,8 @@ def setup_emscripten_env():
         # Try to use system emscripten
         print("Using system emscripten (not found locally)")
         try:
-            result = subprocess.run(["emcc", "--version"], capture_output=True, text=True, timeout=10)
+            emcc = shutil.which("emcc") or "emcc"
+            result = probe_tool(emcc, timeout=10, extra_files=get_emcc_version_files(emcc))
             if result.returncode == 0:
                 print("System emscripten verification: OK")
             else:
@@ -781,41 +3985,778 @@ def setup_emscripten_env():
         except Exception as e:
             print(f"WARNING: Could not verify system emscripten: {e}")
 
-def main():
-    """Main function."""
-    print("GlistEngine WebGL Project Builder")
-    print("=" * 40)
-    
+class PollingWatcher:
+    """Detects file changes by comparing directory snapshots."""
+
+    def __init__(self, root, interval=WATCH_POLL_INTERVAL):
+        self.root = root
+        self.interval = interval
+        self.snapshot = snapshot_watched_files(root)
+
+    def poll(self, timeout):
+        """Return the paths that changed, waiting at most timeout seconds."""
+        deadline = time.monotonic() + timeout
+        while True:
+            current = snapshot_watched_files(self.root)
+            changed = {path for path in current.keys() | self.snapshot.keys()
+                       if current.get(path) != self.snapshot.get(path)}
+            self.snapshot = current
+            if changed or time.monotonic() >= deadline:
+                return changed
+            time.sleep(min(self.interval, max(0.0, deadline - time.monotonic())))
+
+    def close(self):
+        pass
+
+class InotifyWatcher:
+    """Detects file changes with Linux inotify, watching every directory of a tree."""
+
+    IN_MODIFY = 0x00000002
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_Q_OVERFLOW = 0x00004000
+    IN_ISDIR = 0x40000000
+    WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+                  IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+
+    def __init__(self, root):
+        import ctypes
+        import ctypes.util
+        self.root = root
+        self.libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.watches = {}
+        for directory in iter_watched_dirs(root):
+            self.add_watch(directory)
+
+    def add_watch(self, directory):
+        """Start watching one directory."""
+        wd = self.libc.inotify_add_watch(self.fd, os.fsencode(str(directory)), self.WATCH_MASK)
+        if wd >= 0:
+            self.watches[wd] = directory
+
+    def poll(self, timeout):
+        """Return the paths that changed, waiting at most timeout seconds."""
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return set()
+
+        changed = set()
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return changed
+
+        offset = 0
+        while offset + 16 <= len(data):
+            wd, mask, _, name_length = struct.unpack_from("iIII", data, offset)
+            name = data[offset + 16:offset + 16 + name_length].split(b"\0", 1)[0]
+            offset += 16 + name_length
+
+            if mask & self.IN_Q_OVERFLOW:
+                # Events were dropped, treat the whole tree as changed
+                changed.add(self.root)
+                continue
+            directory = self.watches.get(wd)
+            if directory is None:
+                continue
+            path = directory / os.fsdecode(name) if name else directory
+            if mask & self.IN_ISDIR and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                # Watch new directories and report the files they already hold
+                for new_dir in iter_watched_dirs(path):
+                    self.add_watch(new_dir)
+                changed.update(snapshot_watched_files(path).keys())
+            if mask & self.IN_DELETE_SELF:
+                self.watches.pop(wd, None)
+            changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+def iter_watched_dirs(root):
+    """Yield root and its subdirectories, skipping build output and VCS folders."""
+    if not root.is_dir():
+        return
+    yield root
+    for dirpath, dirnames, _ in os.walk(root):
+        dirnames[:] = [d for d in dirnames if not is_ignored_watch_dir(d)]
+        for dirname in dirnames:
+            yield Path(dirpath) / dirname
+
+def is_ignored_watch_dir(name):
+    """Return True for directories whose changes never need a rebuild."""
+    return name.startswith(".") or name.startswith("cmake-build") or name in WATCH_IGNORED_DIRS
+
+def snapshot_watched_files(root):
+    """Map every watched file under root to its (mtime, size)."""
+    snapshot = {}
+    for directory in iter_watched_dirs(root):
+        try:
+            entries = list(os.scandir(directory))
+        except OSError:
+            continue
+        for entry in entries:
+            try:
+                if entry.is_file():
+                    stat = entry.stat()
+                    snapshot[Path(entry.path)] = (stat.st_mtime_ns, stat.st_size)
+            except OSError:
+                continue
+    return snapshot
+
+def create_file_watcher(root):
+    """Use inotify where available and fall back to polling."""
+    if sys.platform.startswith("linux"):
+        try:
+            watcher = InotifyWatcher(root)
+            print("Watching for changes with inotify")
+            return watcher
+        except (OSError, AttributeError) as e:
+            print(f"WARNING: inotify unavailable ({e}), falling back to polling")
+    print(f"Watching for changes by polling every {WATCH_POLL_INTERVAL}s")
+    return PollingWatcher(root)
+
+def wait_for_changes(watcher, debounce):
+    """Block until files change, then collect changes until debounce seconds pass quietly."""
+    changed = set()
+    while not changed:
+        changed = watcher.poll(1.0)
+    while True:
+        more = watcher.poll(debounce)
+        if not more:
+            return changed
+        changed.update(more)
+
+def classify_changes(changed, project_path):
+    """Decide which build steps a set of changed paths requires."""
+    actions = set()
+    scans_sources = None
+    for path in changed:
+        if path == project_path:
+            return {"reconfigure", "assets", "compile"}
+        try:
+            relative = path.relative_to(project_path)
+        except ValueError:
+            continue
+        if relative.parts and relative.parts[0] == "assets":
+            actions.add("assets")
+        elif path.name == PROJECT_CONFIG_NAME:
+            # Holds dependency settings as well as asset rules
+            actions.update({"reconfigure", "assets"})
+        elif path.name == "CMakeLists.txt" or path.suffix == ".cmake":
+            actions.add("reconfigure")
+        elif path.suffix.lower() in WATCH_SOURCE_EXTENSIONS:
+            actions.add("compile")
+            # Fonts subset to the characters of source strings follow them
+            if scans_sources is None:
+                scans_sources = uses_source_characters(load_project_config(project_path))
+            if scans_sources:
+                actions.add("assets")
+    return actions
+
+def watch_project(project_path, options, build_first=False):
+    """Rebuild and repackage a project whenever its sources, CMake files or assets change.
+
+    With build_first the project is built once after the watcher started,
+    changes saved during that build are picked up by the first rebuild.
+    """
+    # Resolve the toolchain once for the whole session
+    if not options.get("toolchain"):
+        options = dict(options, toolchain=resolve_toolchain())
+        if not options["toolchain"]:
+            return False
+
+    # Both watchers keep what changes while a build runs until the next poll
+    watcher = create_file_watcher(project_path)
+    try:
+        if build_first:
+            if compile_project(project_path, options) and create_zip_package(project_path):
+                print("\nBuild completed successfully!")
+        print(f"Watching {project_path} (press Ctrl+C to stop)")
+        while True:
+            changed = wait_for_changes(watcher, options.get("debounce", WATCH_DEBOUNCE))
+            actions = classify_changes(changed, project_path)
+            if not actions:
+                continue
+
+            print(f"\nChanges detected ({', '.join(sorted(actions))}), rebuilding...")
+            start_time = time.perf_counter()
+            rebuild_options = dict(options,
+                                   force_configure="reconfigure" in actions,
+                                   skip_assets="assets" not in actions)
+            ok = compile_project(project_path, rebuild_options) and create_zip_package(project_path)
+            status = "Rebuild finished" if ok else "Rebuild FAILED"
+            print(f"{status} in {time.perf_counter() - start_time:.1f}s, watching for changes...")
+    except KeyboardInterrupt:
+        print("\nStopped watching")
+    finally:
+        watcher.close()
+    return True
+
+def match_projects(projects, patterns):
+    """Pick projects by exact name or glob pattern, keeping discovery order."""
+    selected = []
+    for pattern in patterns:
+        matches = [p for p in projects if fnmatch.fnmatchcase(p.name, pattern)]
+        if not matches:
+            print(f"ERROR: No project matches '{pattern}'")
+            return None
+        for project in matches:
+            if project not in selected:
+                selected.append(project)
+    return selected
+
+@contextlib.contextmanager
+def redirect_output(log_file):
+    """Redirect stdout and stderr, including child processes, to a log file."""
+    sys.stdout.flush()
+    sys.stderr.flush()
+    saved_stdout = os.dup(1)
+    saved_stderr = os.dup(2)
+    os.dup2(log_file.fileno(), 1)
+    os.dup2(log_file.fileno(), 2)
+    try:
+        yield
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os.dup2(saved_stdout, 1)
+        os.dup2(saved_stderr, 2)
+        os.close(saved_stdout)
+        os.close(saved_stderr)
+
+def run_traced_project_build(project_path, options):
+    """Compile and package one project with its own build trace.
+
+    Returns success and the recorded trace.
+    """
+    build_dir = Path("./build").absolute() / project_path.name
+    trace = start_build_trace()
+    profiler = start_profiler() if options.get("profile") else None
+    ok = False
+    try:
+        with trace.phase(project_path.name, "project"):
+            ok = compile_project(project_path, options) and create_zip_package(project_path)
+    except Exception:
+        import traceback
+        print(traceback.format_exc())
+    finally:
+        finish_build_trace(trace, profiler, build_dir, project_path.name)
+    return bool(ok), trace
+
+def build_project_worker(project_path, options, log_path):
+    """Compile and package one project inside a batch worker process."""
+    start_time = time.perf_counter()
+    with open(log_path, "w") as log_file, redirect_output(log_file):
+        ok, _ = run_traced_project_build(project_path, options)
+    return {
+        "project": project_path.name,
+        "ok": bool(ok),
+        "duration": time.perf_counter() - start_time,
+        "log": str(log_path),
+    }
+
+def build_projects_batch(projects, options, total_jobs=None, max_parallel=None):
+    """Build several projects at once, sharing a global job-slot budget.
+
+    A project starting gets an equal share of the free slots among the
+    projects that can start with it, and hands them back when it finishes,
+    so projects started later get the slots of those that finished early.
+    The sum of all build tool jobs never exceeds the budget.
+    """
+    total_jobs = total_jobs or os.cpu_count() or 1
+
+    if not max_parallel:
+        max_parallel = max(1, total_jobs // MIN_JOBS_PER_PROJECT)
+    workers = max(1, min(len(projects), max_parallel, total_jobs))
+
+    # Resolve the toolchain once so workers skip discovery entirely
+    with trace_phase("resolve_toolchain"):
+        toolchain = resolve_toolchain()
+    if not toolchain:
+        return False
+
+    options = dict(options, toolchain=toolchain)
+    log_dir = Path("./build").absolute() / "logs"
+    log_dir.mkdir(parents=True, exist_ok=True)
+
+    print(f"\nBuilding {len(projects)} projects: {workers} at a time, sharing {total_jobs} job slots")
+
+    batch_start = time.perf_counter()
+    results = []
+    pending = list(projects)
+    running = {}
+    free_jobs = total_jobs
+    with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+        while pending or running:
+            while pending and len(running) < workers:
+                starting = min(workers - len(running), len(pending))
+                jobs = max(1, free_jobs // starting)
+                free_jobs -= jobs
+                project = pending.pop(0)
+                future = executor.submit(build_project_worker, project, dict(options, jobs=jobs),
+                                         log_dir / f"{project.name}.log")
+                running[future] = (project, jobs)
+
+            done, _ = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                project, jobs = running.pop(future)
+                free_jobs += jobs
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = {"project": project.name, "ok": False, "duration": 0.0,
+                              "log": str(log_dir / f"{project.name}.log"), "error": str(e)}
+                results.append(result)
+                status = "PASS" if result["ok"] else "FAIL"
+                print(f"[{len(results)}/{len(projects)}] {status} {result['project']} "
+                      f"({result['duration']:.1f}s, {jobs} jobs)")
+
+    batch_duration = time.perf_counter() - batch_start
+
+    # Show summary
+    print("\nBatch summary:")
+    name_width = max(len(r["project"]) for r in results)
+    for result in sorted(results, key=lambda r: r["project"]):
+        status = "PASS" if result["ok"] else "FAIL"
+        line = f"  {result['project']:<{name_width}}  {status}  {result['duration']:8.1f}s"
+        if not result["ok"]:
+            line += f"  (log: {result['log']})"
+        print(line)
+
+    failed = [r for r in results if not r["ok"]]
+    print(f"\n{len(results) - len(failed)} passed, {len(failed)} failed in {batch_duration:.1f}s")
+    return not failed
+
+class BuildDaemon:
+    """Long-lived local build server that resolves the toolchain once.
+
+    Clients connect to a Unix socket and send one JSON request per line. Build
+    requests are queued and run one at a time; their output is streamed back
+    as "log" messages followed by a structured "result" message.
+    """
+
+    def __init__(self, socket_path):
+        self.socket_path = socket_path
+        self.requests = queue.Queue()
+        self.toolchain = None
+        self.running = True
+        # Builds redirect fd 1 and 2, keep a handle on the real console
+        self.console = os.fdopen(os.dup(1), "w", buffering=1)
+
+    def log(self, message):
+        """Print a daemon message to the console, never into a build log."""
+        self.console.write(message + "\n")
+
+    def resolve(self):
+        """Run the startup checks and toolchain discovery once."""
+        if not check_folder_structure():
+            return False
+        prefetch_tool_probes()
+        if not check_and_install_emsdk():
+            return False
+        self.toolchain = resolve_toolchain()
+        return self.toolchain is not None
+
+    def serve(self):
+        """Accept clients until a shutdown request arrives."""
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(str(self.socket_path))
+        server.listen(8)
+        server.settimeout(0.5)
+        threading.Thread(target=self.process_requests, daemon=True).start()
+        self.log(f"Build daemon listening on {self.socket_path}")
+        try:
+            while self.running:
+                try:
+                    connection, _ = server.accept()
+                except socket.timeout:
+                    continue
+                threading.Thread(target=self.handle_client, args=(connection,), daemon=True).start()
+        except KeyboardInterrupt:
+            self.log("Build daemon interrupted")
+        finally:
+            server.close()
+            if self.socket_path.exists():
+                self.socket_path.unlink()
+        self.log("Build daemon stopped")
+
+    def handle_client(self, connection):
+        """Read one request from a client and answer it."""
+        with connection, connection.makefile("r", encoding="utf-8") as reader:
+            try:
+                request = json.loads(reader.readline() or "{}")
+            except ValueError:
+                send_daemon_message(connection, {"type": "error", "message": "invalid request"})
+                return
+
+            command = request.get("command")
+            if command == "status":
+                send_daemon_message(connection, {"type": "status", "toolchain": self.toolchain,
+                                                 "queued": self.requests.qsize()})
+            elif command in ("build", "refresh", "shutdown"):
+                # Queued so they never overlap a running build
+                done = threading.Event()
+                send_daemon_message(connection, {"type": "queued", "position": self.requests.qsize() + 1})
+                self.requests.put((request, connection, done))
+                done.wait()
+            else:
+                send_daemon_message(connection, {"type": "error", "message": f"unknown command: {command}"})
+
+    def process_requests(self):
+        """Run queued requests one after another."""
+        while True:
+            request, connection, done = self.requests.get()
+            try:
+                command = request.get("command")
+                if command == "build":
+                    result = self.run_build(request, connection)
+                    self.log(f"{'PASS' if result['ok'] else 'FAIL'} {result.get('project')} "
+                             f"({result.get('duration', 0.0):.1f}s)")
+                elif command == "refresh":
+                    with redirect_output_to_client(connection):
+                        ok = self.resolve()
+                    result = {"type": "result", "ok": ok, "toolchain": self.toolchain}
+                else:
+                    self.running = False
+                    result = {"type": "result", "ok": True}
+                send_daemon_message(connection, result)
+            except Exception as e:
+                send_daemon_message(connection, {"type": "result", "ok": False, "error": str(e)})
+            finally:
+                done.set()
+
+    def run_build(self, request, connection):
+        """Build the requested project, streaming its output to the client."""
+        matches = match_projects(find_cmake_projects(), [request.get("project", "")])
+        if not matches or len(matches) != 1:
+            return {"type": "result", "ok": False, "project": request.get("project"),
+                    "error": "project must match exactly one project"}
+        project_path = matches[0]
+
+        self.log(f"Building {project_path.name}")
+        options = dict(request.get("options") or {}, toolchain=self.toolchain)
+        start_time = time.perf_counter()
+        with redirect_output_to_client(connection):
+            ok, trace = run_traced_project_build(project_path, options)
+
+        return {
+            "type": "result",
+            "ok": ok,
+            "project": project_path.name,
+            "duration": time.perf_counter() - start_time,
+            "phases": {event["name"]: event["args"]["wall_ms"]
+                       for event in trace.events if event.get("cat") == "builder"},
+            "package": str(Path("./build").absolute() / f"{project_path.name}_webgl.zip"),
+        }
+
+def send_daemon_message(connection, message):
+    """Send one JSON message, ignoring clients that went away."""
+    try:
+        connection.sendall((json.dumps(message) + "\n").encode("utf-8"))
+        return True
+    except OSError:
+        return False
+
+@contextlib.contextmanager
+def redirect_output_to_client(connection):
+    """Stream stdout and stderr, including child processes, to a daemon client."""
+    read_fd, write_fd = os.pipe()
+
+    def forward():
+        with os.fdopen(read_fd, "r", encoding="utf-8", errors="replace") as reader:
+            for line in reader:
+                send_daemon_message(connection, {"type": "log", "line": line.rstrip("\n")})
+
+    forwarder = threading.Thread(target=forward, daemon=True)
+    forwarder.start()
+    with os.fdopen(write_fd, "w") as writer:
+        with redirect_output(writer):
+            yield
+    # Every write end is closed now, the forwarder sees EOF
+    forwarder.join()
+
+def get_daemon_socket_path():
+    """Return the Unix socket path of the build daemon."""
+    return Path("./build").absolute() / DAEMON_SOCKET_NAME
+
+def connect_to_daemon():
+    """Connect to a running build daemon, or return None."""
+    socket_path = get_daemon_socket_path()
+    if not hasattr(socket, "AF_UNIX") or not socket_path.exists():
+        return None
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        client.connect(str(socket_path))
+        return client
+    except OSError:
+        client.close()
+        return None
+
+def run_build_daemon():
+    """Start the build daemon in the foreground."""
+    if not hasattr(socket, "AF_UNIX"):
+        print("ERROR: The build daemon needs Unix domain socket support")
+        return False
+
+    socket_path = get_daemon_socket_path()
+    if socket_path.exists():
+        client = connect_to_daemon()
+        if client:
+            client.close()
+            print(f"ERROR: A build daemon is already running on {socket_path}")
+            return False
+        # Left behind by a daemon that did not shut down cleanly
+        socket_path.unlink()
+
+    daemon = BuildDaemon(socket_path)
+    if not daemon.resolve():
+        return False
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+    daemon.serve()
+    return True
+
+def send_daemon_request(request):
+    """Send a request to the daemon, printing streamed logs. Returns the result or None."""
+    client = connect_to_daemon()
+    if not client:
+        return None
+
+    result = None
+    with client, client.makefile("r", encoding="utf-8") as reader:
+        client.sendall((json.dumps(request) + "\n").encode("utf-8"))
+        for line in reader:
+            message = json.loads(line)
+            if message["type"] == "log":
+                print(message["line"])
+            elif message["type"] == "queued" and message["position"] > 1:
+                print(f"Queued behind {message['position'] - 1} build(s)")
+            elif message["type"] in ("result", "status", "error"):
+                result = message
+                break
+    return result
+
+def build_with_daemon(project_names, options):
+    """Build projects through a running daemon. Returns None if none is running."""
+    if not connect_to_daemon():
+        return None
+
+    ok = True
+    for name in project_names:
+        result = send_daemon_request({"command": "build", "project": name, "options": options})
+        if result is None:
+            print("ERROR: Lost connection to the build daemon")
+            return False
+        if result["type"] == "error" or not result.get("ok"):
+            print(f"ERROR: Build of {name} failed{': ' + result['error'] if result.get('error') else ''}")
+            ok = False
+        else:
+            print(f"Built {result['project']} in {result['duration']:.1f}s: {result['package']}")
+    return ok
+
+def parse_args(argv=None):
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(description="GlistEngine WebGL Project Builder")
+    parser.add_argument("projects", nargs="*",
+                        help="project names or glob patterns to build without prompting")
+    parser.add_argument("--all", action="store_true",
+                        help="build every project found in myglistapps")
+    parser.add_argument("-j", "--jobs", type=int, default=None,
+                        help="total build job slots shared by all projects, those of a finished project "
+                             "go to the next one started (default: CPU count)")
+    parser.add_argument("-p", "--parallel-projects", type=int, default=None,
+                        help="maximum number of projects built at the same time")
+    parser.add_argument("--ccache", action="store_true",
+                        help="cache compiled objects of emcc/em++ and reuse them across builds")
+    parser.add_argument("--ccache-size", default=DEFAULT_CCACHE_SIZE,
+                        help=f"maximum size of the object cache, e.g. 500M or 10G (default: {DEFAULT_CCACHE_SIZE})")
+    parser.add_argument("--watch", action="store_true",
+                        help="after building, rebuild and repackage the project whenever it changes")
+    parser.add_argument("--debounce", type=float, default=WATCH_DEBOUNCE,
+                        help=f"seconds of quiet after a change before rebuilding (default: {WATCH_DEBOUNCE})")
+    parser.add_argument("--daemon", action="store_true",
+                        help="run a build daemon that keeps the toolchain resolved and serves build requests")
+    parser.add_argument("--use-daemon", action="store_true",
+                        help="send the named projects to a running build daemon, building locally if none runs")
+    parser.add_argument("--stop-daemon", action="store_true",
+                        help="ask a running build daemon to shut down")
+    parser.add_argument("--slowest", type=int, default=DEFAULT_SLOWEST_STEPS,
+                        help=f"number of slowest build steps to report, 0 to disable (default: {DEFAULT_SLOWEST_STEPS})")
+    parser.add_argument("--profile", action="store_true",
+                        help=f"also write a cProfile dump of the builder ({PROFILE_NAME}) next to the build trace")
+    parser.add_argument("--no-dep-cache", action="store_true",
+                        help="compile assimp, freetype and sqlite3 inside each project "
+                             "instead of linking the shared prebuilt cache")
+    parser.add_argument("--asset-staging", choices=ASSET_STAGING_MODES, default="auto",
+                        help="how assets are staged for packing: reflink, hardlink or copy "
+                             "(default: auto, reflink where the filesystem supports it, else copy). "
+                             "Hardlinks share the source file, only use them if nothing writes "
+                             "to staged assets")
+    parser.add_argument("--asset-jobs", type=int, default=None, metavar="N",
+                        help=f"threads for asset staging and hashing (default: {DEFAULT_ASSET_JOBS})")
+    parser.add_argument("--hash-assets", action="store_true",
+                        help="compare asset contents by hash, not just size and mtime, "
+                             "so touched but unchanged files are not restaged")
+    parser.add_argument("--lz4-assets", action="store_true",
+                        help="pack assets LZ4-compressed, decompressed per file when the app reads them")
+    parser.add_argument("--cache-assets", action="store_true",
+                        help="keep asset packages in the browser's IndexedDB, so later visits "
+                             "only download the packages that changed")
+    return parser.parse_args(argv)
+
+def build_options_from_args(args):
+    """Translate command line arguments into compile_project options."""
+    return {
+        "jobs": args.jobs,
+        "dep_cache": not args.no_dep_cache,
+        "ccache": args.ccache,
+        "ccache_size": args.ccache_size,
+        "profile": args.profile,
+        "slowest": args.slowest,
+        "debounce": args.debounce,
+        "asset_hash": args.hash_assets,
+        "asset_staging": args.asset_staging,
+        "asset_jobs": args.asset_jobs,
+        "asset_lz4": args.lz4_assets,
+        "asset_cache": args.cache_assets,
+    }
+
+def start_profiler():
+    """Start profiling the builder itself with cProfile."""
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    return profiler
+
+def finish_build_trace(trace, profiler, output_dir, label, extra_events=()):
+    """Write the phase trace and the optional profile into output_dir."""
+    if profiler:
+        profiler.disable()
+    trace.print_summary()
+    if not output_dir.exists():
+        return
+
+    trace.write(output_dir / BUILD_TRACE_NAME, label, extra_events)
+    print(f"Build trace written to: {output_dir / BUILD_TRACE_NAME}")
+
+    if profiler:
+        profiler.dump_stats(str(output_dir / PROFILE_NAME))
+        print(f"Builder profile written to: {output_dir / PROFILE_NAME}")
+
+def run_builder(args, options):
+    """Run the builder, returning success and the directory for trace output."""
+    output_dir = Path("./build").absolute()
+
     # Check folder structure
-    if not check_folder_structure():
-        sys.exit(1)
+    with trace_phase("check_folder_structure"):
+        if not check_folder_structure():
+            return False, output_dir
     
+    # Warm the tool cache with all probes at once instead of one after another
+    with trace_phase("prefetch_tool_probes"):
+        prefetch_tool_probes()
+
     # Check and install emsdk
-    if not check_and_install_emsdk():
-        sys.exit(1)
+    with trace_phase("check_and_install_emsdk"):
+        if not check_and_install_emsdk():
+            return False, output_dir
     
     # Find cmake projects
-    projects = find_cmake_projects()
+    with trace_phase("find_cmake_projects"):
+        projects = find_cmake_projects()
     if not projects:
         print("No projects found")
-        sys.exit(1)
+        return False, output_dir
+
+    # Batch mode builds the requested projects without prompting
+    if args.all or args.projects:
+        selected_projects = projects if args.all else match_projects(projects, args.projects)
+        if not selected_projects:
+            return False, output_dir
+
+        # Watch mode follows a single project
+        if args.watch:
+            if len(selected_projects) != 1:
+                print("ERROR: --watch needs exactly one project")
+                return False, output_dir
+            return run_single_project(selected_projects[0], args, options)
+
+        ok = build_projects_batch(selected_projects, options, args.jobs, args.parallel_projects)
+        return ok, output_dir
     
     # Select project
     selected_project = select_project(projects)
     if not selected_project:
-        sys.exit(1)
+        return False, output_dir
     
     print(f"\nSelected project: {selected_project.name}")
-    
-    # Compile project
-    if not compile_project(selected_project):
-        sys.exit(1)
-    
-    # Create zip package
-    if not create_zip_package(selected_project):
+    return run_single_project(selected_project, args, options)
+
+def run_single_project(selected_project, args, options):
+    """Build and package one project, then keep rebuilding it in watch mode."""
+    output_dir = Path("./build").absolute() / selected_project.name
+
+    # Keep rebuilding on changes, also after a failed first build. The
+    # watcher starts first so edits saved during that build are not lost
+    if args.watch:
+        return watch_project(selected_project, options, build_first=True), output_dir
+
+    # Compile project and create zip package
+    ok = compile_project(selected_project, options) and create_zip_package(selected_project)
+    if ok:
+        print("\nBuild completed successfully!")
+    return ok, output_dir
+
+def main():
+    """Main function."""
+    args = parse_args()
+    options = build_options_from_args(args)
+
+    # Daemon requests skip all local startup checks
+    if args.stop_daemon:
+        result = send_daemon_request({"command": "shutdown"})
+        print("Build daemon stopped" if result else "No build daemon is running")
+        return
+    if args.use_daemon and args.projects:
+        ok = build_with_daemon(args.projects, options)
+        if ok is not None:
+            sys.exit(0 if ok else 1)
+        print("No build daemon is running, building locally")
+
+    print("GlistEngine WebGL Project Builder")
+    print("=" * 40)
+
+    if args.daemon:
+        sys.exit(0 if run_build_daemon() else 1)
+
+    trace = start_build_trace()
+    profiler = start_profiler() if args.profile else None
+    ok, output_dir = False, Path("./build").absolute()
+    try:
+        ok, output_dir = run_builder(args, options)
+    finally:
+        # Batch traces also show every project's phases on one timeline
+        extra_events = []
+        if (args.all or args.projects) and not args.watch:
+            for trace_path in output_dir.glob(f"*/{BUILD_TRACE_NAME}"):
+                if trace_path.stat().st_mtime >= trace.origin_epoch:
+                    extra_events.extend(read_trace_events(trace_path))
+        finish_build_trace(trace, profiler, output_dir, "project_builder", extra_events)
+
+    if not ok:
         sys.exit(1)
-    
-    print("\nBuild completed successfully!")
 
 if __name__ == "__main__":
+    # CMake runs every compile through this script when the object cache is on
+    if len(sys.argv) > 1 and sys.argv[1] == COMPILER_LAUNCHER_FLAG:
+        sys.exit(run_compiler_launcher(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == LINKER_LAUNCHER_FLAG:
+        sys.exit(run_compiler_launcher(sys.argv[2:], link=True))
     main()
\ No newline at end of file
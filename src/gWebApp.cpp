@@ -7,6 +7,72 @@
 
 #include "gWebApp.h"
 
+#include <emscripten/em_js.h>
+#include <emscripten/html5.h>
+#include <GLES2/gl2.h>
+#include <cstdint>
+#include <cstring>
+#include <fstream>
+#include <iterator>
+#include <vector>
+
+// Compressed formats of the WebGL texture extensions
+#ifndef GL_COMPRESSED_RGB_S3TC_DXT1_EXT
+#define GL_COMPRESSED_RGB_S3TC_DXT1_EXT 0x83F0
+#endif
+#ifndef GL_COMPRESSED_RGBA_S3TC_DXT5_EXT
+#define GL_COMPRESSED_RGBA_S3TC_DXT5_EXT 0x83F3
+#endif
+#ifndef GL_ETC1_RGB8_OES
+#define GL_ETC1_RGB8_OES 0x8D64
+#endif
+#ifndef GL_COMPRESSED_RGB8_ETC2
+#define GL_COMPRESSED_RGB8_ETC2 0x9274
+#endif
+
+namespace {
+
+// vkFormat values of the KTX2 files written by project_builder.py
+const uint32_t VK_FORMAT_BC1_RGB_UNORM_BLOCK = 131;
+const uint32_t VK_FORMAT_BC3_UNORM_BLOCK = 137;
+const uint32_t VK_FORMAT_ETC2_R8G8B8_UNORM_BLOCK = 147;
+
+const unsigned char KTX2_IDENTIFIER[12] = {
+		0xAB, 'K', 'T', 'X', ' ', '2', '0', 0xBB, '\r', '\n', 0x1A, '\n'
+};
+const size_t KTX2_HEADER_SIZE = 80;
+
+bool enableWebGLExtension(const char* name) {
+	EMSCRIPTEN_WEBGL_CONTEXT_HANDLE context = emscripten_webgl_get_current_context();
+	return context && emscripten_webgl_enable_extension(context, name);
+}
+
+bool fileExists(const std::string& path) {
+	std::ifstream file(path, std::ios::binary);
+	return file.good();
+}
+
+template<typename T>
+T readValue(const std::vector<unsigned char>& data, size_t offset) {
+	T value;
+	std::memcpy(&value, data.data() + offset, sizeof(T));
+	return value;
+}
+
+}
+
+// Defined by gWebBundleLoader.js, which project_builder.py links only when
+// the project has bundle rules
+EM_JS(void, gipwebgl_load_bundle, (const char* name, int priority), {
+	if(Module.gipwebglLoadBundle) Module.gipwebglLoadBundle(UTF8ToString(name), priority);
+});
+
+EM_JS(int, gipwebgl_get_bundle_state, (const char* name), {
+	if(Module.gipwebglGetBundleState) return Module.gipwebglGetBundleState(UTF8ToString(name));
+	// Without bundle rules every asset is in the boot bundle
+	return UTF8ToString(name) == "boot" ? 3 : 4;
+});
+
 gWebApp::gWebApp() : gBaseApp() {
 
 }
@@ -21,4 +87,118 @@ void gWebApp::pause() {
 
 void gWebApp::resume() {
 
-}
\ No newline at end of file
+}
+
+// Extension checks are only cached once a WebGL context is current, an
+// earlier call must not disable compressed textures for the session
+bool gWebApp::supportsS3tc() {
+	static bool checked = false;
+	static bool supported = false;
+	if(!checked && emscripten_webgl_get_current_context()) {
+		supported = enableWebGLExtension("WEBGL_compressed_texture_s3tc");
+		checked = true;
+	}
+	return supported;
+}
+
+unsigned int gWebApp::getEtcFormat() {
+	static bool checked = false;
+	static unsigned int format = 0;
+	if(!checked && emscripten_webgl_get_current_context()) {
+		// ETC1 data is valid ETC2 RGB8, so WebGL 2's ETC extension can load it too
+		format = enableWebGLExtension("WEBGL_compressed_texture_etc1") ? GL_ETC1_RGB8_OES
+				: enableWebGLExtension("WEBGL_compressed_texture_etc") ? GL_COMPRESSED_RGB8_ETC2 : 0;
+		checked = true;
+	}
+	return format;
+}
+
+std::string gWebApp::getPreferredTexturePath(const std::string& imagePath) {
+	// Variants are named after the staged image, the .webp one for images
+	// a texture rule converted to WebP
+	std::vector<std::string> stagedPaths = {imagePath};
+	size_t dot = imagePath.find_last_of('.');
+	size_t slash = imagePath.find_last_of('/');
+	if(dot != std::string::npos && (slash == std::string::npos || dot > slash)
+			&& imagePath.compare(dot, std::string::npos, ".webp") != 0) {
+		stagedPaths.push_back(imagePath.substr(0, dot) + ".webp");
+	}
+	for(const std::string& stagedPath : stagedPaths) {
+		if(supportsS3tc()) {
+			for(const char* variant : {".bc3.ktx2", ".bc1.ktx2"}) {
+				std::string candidate = stagedPath + variant;
+				if(fileExists(candidate)) return candidate;
+			}
+		}
+		if(getEtcFormat() != 0) {
+			std::string candidate = stagedPath + ".etc1.ktx2";
+			if(fileExists(candidate)) return candidate;
+		}
+	}
+	return imagePath;
+}
+
+unsigned int gWebApp::loadCompressedTexture(const std::string& ktx2Path, int* width, int* height) {
+	std::ifstream file(ktx2Path, std::ios::binary);
+	std::vector<unsigned char> data((std::istreambuf_iterator<char>(file)), std::istreambuf_iterator<char>());
+	if(data.size() < KTX2_HEADER_SIZE || std::memcmp(data.data(), KTX2_IDENTIFIER, sizeof(KTX2_IDENTIFIER)) != 0) {
+		return 0;
+	}
+
+	uint32_t vkFormat = readValue<uint32_t>(data, 12);
+	uint32_t pixelWidth = readValue<uint32_t>(data, 20);
+	uint32_t pixelHeight = readValue<uint32_t>(data, 24);
+	uint32_t levelCount = readValue<uint32_t>(data, 40);
+	if(levelCount == 0) levelCount = 1;
+	if(data.size() < KTX2_HEADER_SIZE + levelCount * 24) return 0;
+
+	GLenum format = 0;
+	if(vkFormat == VK_FORMAT_BC1_RGB_UNORM_BLOCK && supportsS3tc()) format = GL_COMPRESSED_RGB_S3TC_DXT1_EXT;
+	else if(vkFormat == VK_FORMAT_BC3_UNORM_BLOCK && supportsS3tc()) format = GL_COMPRESSED_RGBA_S3TC_DXT5_EXT;
+	else if(vkFormat == VK_FORMAT_ETC2_R8G8B8_UNORM_BLOCK) format = getEtcFormat();
+	if(format == 0) return 0;
+
+	GLuint texture = 0;
+	glGenTextures(1, &texture);
+	glBindTexture(GL_TEXTURE_2D, texture);
+	for(uint32_t level = 0; level < levelCount; level++) {
+		// Level index entries are byteOffset, byteLength and uncompressedByteLength
+		size_t entry = KTX2_HEADER_SIZE + level * 24;
+		uint64_t offset = readValue<uint64_t>(data, entry);
+		uint64_t length = readValue<uint64_t>(data, entry + 8);
+		if(offset + length > data.size()) {
+			glDeleteTextures(1, &texture);
+			return 0;
+		}
+		GLsizei levelWidth = pixelWidth >> level > 0 ? pixelWidth >> level : 1;
+		GLsizei levelHeight = pixelHeight >> level > 0 ? pixelHeight >> level : 1;
+		glCompressedTexImage2D(GL_TEXTURE_2D, level, format, levelWidth, levelHeight, 0,
+				(GLsizei)length, data.data() + offset);
+	}
+
+	glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR);
+	if(levelCount > 1) {
+		glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR_MIPMAP_LINEAR);
+	} else {
+		// Single level files may be non-power-of-two, which WebGL 1 only samples clamped
+		glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR);
+		glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE);
+		glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE);
+	}
+
+	if(width) *width = pixelWidth;
+	if(height) *height = pixelHeight;
+	return texture;
+}
+
+void gWebApp::loadBundle(const std::string& name, int priority) {
+	gipwebgl_load_bundle(name.c_str(), priority);
+}
+
+gWebApp::BundleState gWebApp::getBundleState(const std::string& name) {
+	return (BundleState)gipwebgl_get_bundle_state(name.c_str());
+}
+
+bool gWebApp::isBundleLoaded(const std::string& name) {
+	return getBundleState(name) == BUNDLE_LOADED;
+}
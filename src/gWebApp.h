@@ -9,6 +9,7 @@
 #define GWEBAPP_H
 
 #include "gBaseApp.h"
+#include <string>
 
 class gWebApp : public gBaseApp {
 public:
@@ -16,6 +17,14 @@ public:
    virtual ~gWebApp();
    gWebApp(int argc, char **argv) = delete;
 
+   enum BundleState {
+	   BUNDLE_NOT_LOADED,
+	   BUNDLE_QUEUED,
+	   BUNDLE_LOADING,
+	   BUNDLE_LOADED,
+	   BUNDLE_FAILED
+   };
+
    /**
 	* Called when current activity is invisible.
 	* Application will stop rendering after this but will
@@ -28,6 +37,35 @@ public:
 	*/
    virtual void resume();
 
+   /**
+	* Returns the GPU-compressed KTX2 variant of an image that the browser
+	* can upload directly, as written by project_builder.py's ktx2 texture
+	* rule, or imagePath itself when there is no usable variant. The
+	* original name of an image converted to WebP finds the variants of
+	* its .webp file.
+	*/
+   static std::string getPreferredTexturePath(const std::string& imagePath);
+   /**
+	* Uploads a KTX2 texture with all of its mip levels to a new GL texture.
+	* Returns the texture id, or 0 if the file is invalid or the browser
+	* lacks the WebGL extension for its format.
+	*/
+   static unsigned int loadCompressedTexture(const std::string& ktx2Path, int* width = nullptr, int* height = nullptr);
+
+   /**
+	* Starts fetching an asset bundle of the project's bundle rules in the
+	* background. Bundles with a higher priority are fetched first, asking
+	* again for a queued bundle raises its priority and a failed one is
+	* retried. Its files appear under assets/ once getBundleState() returns
+	* BUNDLE_LOADED. The boot bundle is loaded before the app starts.
+	*/
+   static void loadBundle(const std::string& name, int priority = 0);
+   static BundleState getBundleState(const std::string& name);
+   static bool isBundleLoaded(const std::string& name);
+
+private:
+   static bool supportsS3tc();
+   static unsigned int getEtcFormat();
 };
 
 
@@ -0,0 +1,77 @@
+/*
+* gWebAssetCache.js
+*
+* Linked with --pre-js by project_builder.py for --cache-assets builds.
+* Keeps the asset bundles of gWebBundleLoader.js in IndexedDB, stored with
+* the content hash of the build that packed them, so a later visit only
+* downloads the bundles that changed. The preloaded package is cached by
+* Emscripten itself (--use-preload-cache), this reports where it came from.
+*/
+
+(function() {
+	var DATABASE_NAME = 'gipwebgl_assets';
+	var DATABASE_VERSION = 1;
+	var STORE_NAME = 'packages';
+
+	var database = null;
+
+	function openDatabase() {
+		if(!database) {
+			database = new Promise(function(resolve, reject) {
+				if(typeof indexedDB === 'undefined') throw new Error('IndexedDB is not available');
+				var request = indexedDB.open(DATABASE_NAME, DATABASE_VERSION);
+				request.onupgradeneeded = function() {
+					request.result.createObjectStore(STORE_NAME);
+				};
+				request.onsuccess = function() { resolve(request.result); };
+				request.onerror = function() { reject(request.error); };
+			});
+		}
+		return database;
+	}
+
+	function transact(mode, action) {
+		return openDatabase().then(function(db) {
+			return new Promise(function(resolve, reject) {
+				var transaction = db.transaction([STORE_NAME], mode);
+				var request = action(transaction.objectStore(STORE_NAME));
+				transaction.oncomplete = function() { resolve(request.result); };
+				transaction.onerror = function() { reject(transaction.error); };
+				transaction.onabort = function() { reject(transaction.error); };
+			});
+		});
+	}
+
+	Module['gipwebglAssetCache'] = {
+		// Resolves to the cached package, or null when it is missing or
+		// from another build. Cache errors count as misses.
+		get: function(name, hash, size) {
+			return transact('readonly', function(store) {
+				return store.get(name);
+			}).then(function(entry) {
+				if(!entry || entry.hash !== hash || !entry.data || entry.data.byteLength !== size) return null;
+				return entry.data;
+			}, function(error) {
+				console.warn('Asset cache unavailable: ' + error);
+				return null;
+			});
+		},
+		// One entry per package name, so a new build replaces the old one
+		put: function(name, hash, data) {
+			return transact('readwrite', function(store) {
+				return store.put({hash: hash, data: data}, name);
+			}).catch(function(error) {
+				console.warn('Could not cache asset package ' + name + ': ' + error);
+			});
+		}
+	};
+
+	// Emscripten records for each preloaded package whether it came from its cache
+	var postRun = Module['postRun'] || [];
+	Module['postRun'] = (typeof postRun === 'function' ? [postRun] : postRun).concat(function() {
+		var results = Module['preloadResults'] || {};
+		for(var name in results) {
+			console.log('Asset package ' + name + (results[name].fromCache ? ' loaded from the browser cache' : ' downloaded'));
+		}
+	});
+})();
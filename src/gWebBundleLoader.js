@@ -0,0 +1,168 @@
+/*
+* gWebBundleLoader.js
+*
+* Linked with --pre-js by project_builder.py when gipwebgl.json has bundle
+* rules. Fetches the asset bundles gWebApp::loadBundle() asks for, highest
+* priority first, and hands each one to the loader file_packager wrote for
+* it, which mounts its files under /assets. The bundle list comes from the
+* gipwebgl_bundles.js manifest the builder links after this file.
+*/
+
+(function() {
+	// Matches gWebApp::BundleState
+	var NOT_LOADED = 0;
+	var QUEUED = 1;
+	var LOADING = 2;
+	var LOADED = 3;
+	var FAILED = 4;
+
+	var BOOT_BUNDLE = 'boot';
+	var MAX_ACTIVE_DOWNLOADS = 2;
+
+	var states = {};
+	var queue = [];
+	var requests = 0;
+	var active = 0;
+	// Data file name -> bundle name, while its package script runs
+	var unpacking = {};
+	// Data file name -> fetched package, until its package script asks for it
+	var fetched = {};
+	var hooked = false;
+
+	function getBundles() {
+		return Module['gipwebglBundles'] || {};
+	}
+
+	function locate(path) {
+		return Module['locateFile'] ? Module['locateFile'](path, '') : path;
+	}
+
+	function baseName(path) {
+		return path.substring(path.lastIndexOf('/') + 1);
+	}
+
+	// file_packager asks Module.getPreloadedPackage for its data before
+	// fetching it, and removes its datafile_ run dependency once the files
+	// are in place. Both are hooked when the first bundle loads, after the
+	// runtime exported removeRunDependency.
+	function hookPackageLoader() {
+		if(hooked) return;
+		hooked = true;
+		var getPreloadedPackage = Module['getPreloadedPackage'];
+		Module['getPreloadedPackage'] = function(name, size) {
+			var dataName = baseName(name);
+			if(fetched.hasOwnProperty(dataName)) {
+				var data = fetched[dataName];
+				delete fetched[dataName];
+				return data;
+			}
+			return getPreloadedPackage ? getPreloadedPackage(name, size) : null;
+		};
+		var removeRunDependency = Module['removeRunDependency'];
+		Module['removeRunDependency'] = function(id) {
+			removeRunDependency(id);
+			if(typeof id !== 'string' || id.indexOf('datafile_') !== 0) return;
+			var dataName = baseName(id.substring('datafile_'.length));
+			if(unpacking.hasOwnProperty(dataName)) {
+				var name = unpacking[dataName];
+				delete unpacking[dataName];
+				finish(name, LOADED);
+			}
+		};
+	}
+
+	function finish(name, state) {
+		states[name] = state;
+		active--;
+		if(state === FAILED) {
+			var bundle = getBundles()[name];
+			delete fetched[bundle.data];
+			delete unpacking[bundle.data];
+		}
+		next();
+	}
+
+	function unpack(name, data) {
+		var bundle = getBundles()[name];
+		fetched[bundle.data] = data;
+		unpacking[bundle.data] = name;
+		var script = document.createElement('script');
+		script.src = locate(bundle.script) + '?' + bundle.hash;
+		script.onerror = function() {
+			console.error('Could not load the package script of asset bundle ' + name);
+			finish(name, FAILED);
+		};
+		document.body.appendChild(script);
+	}
+
+	function download(name) {
+		var bundle = getBundles()[name];
+		var cache = Module['gipwebglAssetCache'];
+		// The content hash in the URL keeps browsers from mixing up two builds
+		fetch(locate(bundle.data) + '?' + bundle.hash).then(function(response) {
+			if(!response.ok) throw new Error(response.status + ' ' + response.statusText);
+			return response.arrayBuffer();
+		}).then(function(data) {
+			if(cache) cache.put(bundle.data, bundle.hash, data);
+			unpack(name, data);
+		}, function(error) {
+			console.error('Could not fetch asset bundle ' + name + ': ' + error);
+			finish(name, FAILED);
+		});
+	}
+
+	function start(name) {
+		var bundle = getBundles()[name];
+		states[name] = LOADING;
+		active++;
+		hookPackageLoader();
+		// gWebAssetCache.js is linked in for --cache-assets builds
+		var cache = Module['gipwebglAssetCache'];
+		if(!cache) {
+			download(name);
+			return;
+		}
+		cache.get(bundle.data, bundle.hash, bundle.size).then(function(data) {
+			if(data) {
+				console.log('Asset bundle ' + name + ' loaded from the browser cache');
+				unpack(name, data);
+			} else {
+				download(name);
+			}
+		});
+	}
+
+	function next() {
+		queue.sort(function(a, b) {
+			return b.priority - a.priority || a.order - b.order;
+		});
+		while(active < MAX_ACTIVE_DOWNLOADS && queue.length > 0) {
+			start(queue.shift().name);
+		}
+	}
+
+	Module['gipwebglLoadBundle'] = function(name, priority) {
+		if(name === BOOT_BUNDLE) return;
+		if(!getBundles().hasOwnProperty(name)) {
+			console.error('Unknown asset bundle ' + name);
+			states[name] = FAILED;
+			return;
+		}
+		var state = states[name] || NOT_LOADED;
+		if(state === QUEUED) {
+			// Asking again can only raise the priority of a waiting bundle
+			for(var i = 0; i < queue.length; i++) {
+				if(queue[i].name === name) queue[i].priority = Math.max(queue[i].priority, priority);
+			}
+		} else if(state === NOT_LOADED || state === FAILED) {
+			states[name] = QUEUED;
+			queue.push({name: name, priority: priority, order: requests++});
+		}
+		next();
+	};
+
+	Module['gipwebglGetBundleState'] = function(name) {
+		if(name === BOOT_BUNDLE) return LOADED;
+		return states[name] || NOT_LOADED;
+	};
+})();
@@ -0,0 +1,151 @@
+/*
+* gWebMesh.cpp
+*
+* Loads the .gmesh files that project_builder.py converts models into.
+*/
+
+#include "gWebMesh.h"
+
+#include <emscripten/html5.h>
+#include <GLES2/gl2.h>
+#include <cstring>
+#include <fstream>
+#include <iterator>
+
+using namespace gWebMeshFormat;
+
+namespace {
+
+const char* MESH_EXTENSION = ".gmesh";
+
+bool supportsUintIndices() {
+	static bool supported = [] {
+		EMSCRIPTEN_WEBGL_CONTEXT_HANDLE context = emscripten_webgl_get_current_context();
+		return context && emscripten_webgl_enable_extension(context, "OES_element_index_uint");
+	}();
+	return supported;
+}
+
+bool isInside(const std::vector<unsigned char>& data, uint32_t offset, uint32_t size) {
+	return (uint64_t)offset + size <= data.size();
+}
+
+void pointAttribute(int location, GLint size, GLenum type, bool normalized, GLsizei stride, uint32_t offset) {
+	if(location < 0) return;
+	glEnableVertexAttribArray(location);
+	glVertexAttribPointer(location, size, type, normalized ? GL_TRUE : GL_FALSE, stride,
+			reinterpret_cast<const void*>((uintptr_t)offset));
+}
+
+}
+
+gWebMesh::gWebMesh() : quantized(false) {
+
+}
+
+gWebMesh::~gWebMesh() {
+	clear();
+}
+
+std::string gWebMesh::getPreferredModelPath(const std::string& modelPath) {
+	std::string candidate = modelPath + MESH_EXTENSION;
+	std::ifstream file(candidate, std::ios::binary);
+	return file.good() ? candidate : modelPath;
+}
+
+bool gWebMesh::load(const std::string& path) {
+	clear();
+	std::ifstream file(path, std::ios::binary);
+	std::vector<unsigned char> data((std::istreambuf_iterator<char>(file)), std::istreambuf_iterator<char>());
+	if(data.size() < sizeof(FileHeader)) return false;
+
+	FileHeader fileHeader;
+	std::memcpy(&fileHeader, data.data(), sizeof(fileHeader));
+	if(std::memcmp(fileHeader.magic, MAGIC, sizeof(MAGIC)) != 0 || fileHeader.version != VERSION
+			|| !isInside(data, sizeof(FileHeader), fileHeader.partCount * sizeof(PartHeader))) {
+		return false;
+	}
+	quantized = (fileHeader.flags & FLAG_QUANTIZED) != 0;
+
+	for(uint32_t i = 0; i < fileHeader.partCount; i++) {
+		PartHeader header;
+		std::memcpy(&header, data.data() + sizeof(FileHeader) + i * sizeof(PartHeader), sizeof(header));
+		if(!isInside(data, header.vertexDataOffset, header.vertexDataSize)
+				|| !isInside(data, header.indexDataOffset, header.indexDataSize)
+				|| (header.indexType == INDEX_UNSIGNED_INT && !supportsUintIndices())) {
+			clear();
+			return false;
+		}
+
+		Part part;
+		part.vertexCount = header.vertexCount;
+		part.indexCount = header.indexCount;
+		part.attributes = header.attributes;
+		part.vertexStride = header.vertexStride;
+		part.indexType = header.indexType;
+		part.materialIndex = header.materialIndex;
+		std::memcpy(part.positionOffset, header.positionOffset, sizeof(part.positionOffset));
+		std::memcpy(part.positionScale, header.positionScale, sizeof(part.positionScale));
+		std::memcpy(part.texCoordOffset, header.texCoordOffset, sizeof(part.texCoordOffset));
+		std::memcpy(part.texCoordScale, header.texCoordScale, sizeof(part.texCoordScale));
+
+		// The stored data is already in its GL layout
+		glGenBuffers(1, &part.vertexBuffer);
+		glBindBuffer(GL_ARRAY_BUFFER, part.vertexBuffer);
+		glBufferData(GL_ARRAY_BUFFER, header.vertexDataSize, data.data() + header.vertexDataOffset, GL_STATIC_DRAW);
+		glGenBuffers(1, &part.indexBuffer);
+		glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, part.indexBuffer);
+		glBufferData(GL_ELEMENT_ARRAY_BUFFER, header.indexDataSize, data.data() + header.indexDataOffset, GL_STATIC_DRAW);
+		parts.push_back(part);
+	}
+	glBindBuffer(GL_ARRAY_BUFFER, 0);
+	glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, 0);
+	return true;
+}
+
+void gWebMesh::clear() {
+	for(const Part& part : parts) {
+		glDeleteBuffers(1, &part.vertexBuffer);
+		glDeleteBuffers(1, &part.indexBuffer);
+	}
+	parts.clear();
+}
+
+bool gWebMesh::isQuantized() const {
+	return quantized;
+}
+
+int gWebMesh::getPartCount() const {
+	return (int)parts.size();
+}
+
+const gWebMesh::Part& gWebMesh::getPart(int index) const {
+	return parts[index];
+}
+
+void gWebMesh::bindPart(int index, int positionLocation, int normalLocation, int texCoordLocation, int colorLocation) const {
+	const Part& part = parts[index];
+	glBindBuffer(GL_ARRAY_BUFFER, part.vertexBuffer);
+	glBindBuffer(GL_ELEMENT_ARRAY_BUFFER, part.indexBuffer);
+
+	GLsizei stride = part.vertexStride;
+	pointAttribute(positionLocation, 3, quantized ? GL_UNSIGNED_SHORT : GL_FLOAT, quantized, stride,
+			getAttributeOffset(part.attributes, ATTRIBUTE_POSITION, quantized));
+	if(part.attributes & ATTRIBUTE_NORMAL) {
+		pointAttribute(normalLocation, 3, quantized ? GL_BYTE : GL_FLOAT, quantized, stride,
+				getAttributeOffset(part.attributes, ATTRIBUTE_NORMAL, quantized));
+	}
+	if(part.attributes & ATTRIBUTE_TEXCOORD) {
+		pointAttribute(texCoordLocation, 2, quantized ? GL_UNSIGNED_SHORT : GL_FLOAT, quantized, stride,
+				getAttributeOffset(part.attributes, ATTRIBUTE_TEXCOORD, quantized));
+	}
+	if(part.attributes & ATTRIBUTE_COLOR) {
+		pointAttribute(colorLocation, 4, GL_UNSIGNED_BYTE, true, stride,
+				getAttributeOffset(part.attributes, ATTRIBUTE_COLOR, quantized));
+	}
+}
+
+void gWebMesh::drawPart(int index) const {
+	const Part& part = parts[index];
+	glDrawElements(GL_TRIANGLES, part.indexCount, part.indexType, nullptr);
+}
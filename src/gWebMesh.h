@@ -0,0 +1,72 @@
+/*
+* gWebMesh.h
+*
+* Loads the .gmesh files that project_builder.py converts models into,
+* see the "models" rules of gipwebgl.json.
+*/
+
+#ifndef GWEBMESH_H
+#define GWEBMESH_H
+
+#include "gWebMeshFormat.h"
+#include <string>
+#include <vector>
+
+class gWebMesh {
+public:
+   /**
+	* One drawable piece of the model with a single material. Vertex
+	* positions and texture coordinates are offset + scale * attribute,
+	* a shader applies this with two uniforms per attribute.
+	*/
+   struct Part {
+	   unsigned int vertexCount;
+	   unsigned int indexCount;
+	   unsigned int attributes;
+	   unsigned int vertexStride;
+	   unsigned int indexType;
+	   unsigned int materialIndex;
+	   float positionOffset[3];
+	   float positionScale[3];
+	   float texCoordOffset[2];
+	   float texCoordScale[2];
+	   unsigned int vertexBuffer;
+	   unsigned int indexBuffer;
+   };
+
+   gWebMesh();
+   ~gWebMesh();
+   gWebMesh(const gWebMesh&) = delete;
+   gWebMesh& operator=(const gWebMesh&) = delete;
+
+   /**
+	* Returns the converted mesh of a model written by project_builder.py,
+	* or modelPath itself when the model was staged unconverted.
+	*/
+   static std::string getPreferredModelPath(const std::string& modelPath);
+
+   /**
+	* Reads a .gmesh file and uploads its vertex and index data to GL
+	* buffers as they are stored. Returns false if the file is invalid.
+	*/
+   bool load(const std::string& path);
+   void clear();
+
+   bool isQuantized() const;
+   int getPartCount() const;
+   const Part& getPart(int index) const;
+
+   /**
+	* Binds the buffers of a part and points the given attribute locations
+	* at its vertex data, a location of -1 skips that attribute.
+	*/
+   void bindPart(int index, int positionLocation, int normalLocation = -1,
+		   int texCoordLocation = -1, int colorLocation = -1) const;
+   void drawPart(int index) const;
+
+private:
+   std::vector<Part> parts;
+   bool quantized;
+};
+
+#endif //GWEBMESH_H
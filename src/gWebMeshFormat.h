@@ -0,0 +1,97 @@
+/*
+* gWebMeshFormat.h
+*
+* Layout of the .gmesh files written by tools/host/gipmeshconv and loaded
+* by gWebMesh. All values are little-endian.
+*
+*   gWebMeshFileHeader
+*   gWebMeshPartHeader[partCount]
+*   vertex and index data of each part, 4-byte aligned
+*/
+
+#ifndef GWEBMESHFORMAT_H
+#define GWEBMESHFORMAT_H
+
+#include <cstdint>
+
+namespace gWebMeshFormat {
+
+const char MAGIC[4] = {'G', 'M', 'S', 'H'};
+const uint32_t VERSION = 1;
+
+// File flags
+const uint32_t FLAG_QUANTIZED = 1;
+
+// Vertex attributes, interleaved in this order
+const uint32_t ATTRIBUTE_POSITION = 1;
+const uint32_t ATTRIBUTE_NORMAL = 2;
+const uint32_t ATTRIBUTE_TEXCOORD = 4;
+const uint32_t ATTRIBUTE_COLOR = 8;
+
+// GL index types
+const uint32_t INDEX_UNSIGNED_SHORT = 0x1403;
+const uint32_t INDEX_UNSIGNED_INT = 0x1405;
+
+struct FileHeader {
+	char magic[4];
+	uint32_t version;
+	uint32_t flags;
+	uint32_t partCount;
+};
+
+/*
+* Quantized files store positions as normalized unsigned shorts (x, y, z,
+* padding), normals as normalized signed bytes (x, y, z, padding) and
+* texture coordinates as normalized unsigned shorts. The original values
+* are offset + scale * attribute, unquantized files have an offset of 0
+* and a scale of 1 with float attributes. Colors are always unsigned bytes.
+*/
+struct PartHeader {
+	uint32_t vertexCount;
+	uint32_t indexCount;
+	uint32_t attributes;
+	uint32_t vertexStride;
+	uint32_t indexType;
+	uint32_t materialIndex;
+	float positionOffset[3];
+	float positionScale[3];
+	float texCoordOffset[2];
+	float texCoordScale[2];
+	uint32_t vertexDataOffset;
+	uint32_t vertexDataSize;
+	uint32_t indexDataOffset;
+	uint32_t indexDataSize;
+};
+
+static_assert(sizeof(FileHeader) == 16, "gmesh file header must be 16 bytes");
+static_assert(sizeof(PartHeader) == 80, "gmesh part header must be 80 bytes");
+
+inline uint32_t getAttributeSize(uint32_t attribute, bool quantized) {
+	switch(attribute) {
+	case ATTRIBUTE_POSITION: return quantized ? 8 : 12;
+	case ATTRIBUTE_NORMAL: return quantized ? 4 : 12;
+	case ATTRIBUTE_TEXCOORD: return quantized ? 4 : 8;
+	case ATTRIBUTE_COLOR: return 4;
+	}
+	return 0;
+}
+
+/*
+* Returns the byte offset of an attribute inside a vertex, attributes that
+* come before it in the interleaved order and are present take up space.
+*/
+inline uint32_t getAttributeOffset(uint32_t attributes, uint32_t attribute, bool quantized) {
+	uint32_t offset = 0;
+	for(uint32_t current = ATTRIBUTE_POSITION; current < attribute; current <<= 1) {
+		if(attributes & current) offset += getAttributeSize(current, quantized);
+	}
+	return offset;
+}
+
+inline uint32_t getVertexStride(uint32_t attributes, bool quantized) {
+	return getAttributeOffset(attributes, ATTRIBUTE_COLOR << 1, quantized);
+}
+
+}
+
+#endif //GWEBMESHFORMAT_H
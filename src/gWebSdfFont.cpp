@@ -0,0 +1,248 @@
+/*
+* gWebSdfFont.cpp
+*
+* Draws text from the signed distance field atlases of project_builder.py.
+*/
+
+#include "gWebSdfFont.h"
+
+#include <GLES2/gl2.h>
+#include <algorithm>
+#include <cstring>
+#include <fstream>
+#include <iterator>
+
+using namespace gWebSdfFontFormat;
+
+namespace {
+
+const char* ATLAS_EXTENSION = ".gsdf";
+
+const GLuint POSITION_LOCATION = 0;
+const GLuint TEXCOORD_LOCATION = 1;
+
+const char* VERTEX_SHADER =
+		"attribute vec2 a_position;\n"
+		"attribute vec2 a_texCoord;\n"
+		"uniform vec2 u_viewport;\n"
+		"varying vec2 v_texCoord;\n"
+		"void main() {\n"
+		"	v_texCoord = a_texCoord;\n"
+		"	vec2 clip = a_position / u_viewport * 2.0 - 1.0;\n"
+		"	gl_Position = vec4(clip.x, -clip.y, 0.0, 1.0);\n"
+		"}\n";
+
+// Distances are stored with 0.5 on the outline, u_smoothing covers about one screen pixel
+const char* FRAGMENT_SHADER =
+		"precision mediump float;\n"
+		"uniform sampler2D u_atlas;\n"
+		"uniform vec4 u_color;\n"
+		"uniform float u_smoothing;\n"
+		"varying vec2 v_texCoord;\n"
+		"void main() {\n"
+		"	float distance = texture2D(u_atlas, v_texCoord).a;\n"
+		"	float coverage = smoothstep(0.5 - u_smoothing, 0.5 + u_smoothing, distance);\n"
+		"	gl_FragColor = vec4(u_color.rgb, u_color.a * coverage);\n"
+		"}\n";
+
+GLuint compileShader(GLenum type, const char* source) {
+	GLuint shader = glCreateShader(type);
+	glShaderSource(shader, 1, &source, nullptr);
+	glCompileShader(shader);
+	GLint compiled = GL_FALSE;
+	glGetShaderiv(shader, GL_COMPILE_STATUS, &compiled);
+	if(!compiled) {
+		glDeleteShader(shader);
+		return 0;
+	}
+	return shader;
+}
+
+}
+
+gWebSdfFont::gWebSdfFont() : header(), texture(0), vertexBuffer(0) {
+
+}
+
+gWebSdfFont::~gWebSdfFont() {
+	clear();
+}
+
+std::string gWebSdfFont::getAtlasPath(const std::string& fontPath, int pixelSize) {
+	return fontPath + "." + std::to_string(pixelSize) + ATLAS_EXTENSION;
+}
+
+bool gWebSdfFont::load(const std::string& atlasPath) {
+	clear();
+	std::ifstream file(atlasPath, std::ios::binary);
+	std::vector<unsigned char> data((std::istreambuf_iterator<char>(file)), std::istreambuf_iterator<char>());
+	if(data.size() < sizeof(FileHeader)) return false;
+
+	FileHeader fileHeader;
+	std::memcpy(&fileHeader, data.data(), sizeof(fileHeader));
+	size_t glyphsSize = (size_t)fileHeader.glyphCount * sizeof(Glyph);
+	size_t atlasSize = (size_t)fileHeader.atlasWidth * fileHeader.atlasHeight;
+	if(std::memcmp(fileHeader.magic, MAGIC, sizeof(MAGIC)) != 0 || fileHeader.version != VERSION
+			|| data.size() < sizeof(FileHeader) + glyphsSize + atlasSize) {
+		return false;
+	}
+	header = fileHeader;
+	glyphs.resize(fileHeader.glyphCount);
+	std::memcpy(glyphs.data(), data.data() + sizeof(FileHeader), glyphsSize);
+
+	glGenTextures(1, &texture);
+	glBindTexture(GL_TEXTURE_2D, texture);
+	glPixelStorei(GL_UNPACK_ALIGNMENT, 1);
+	glTexImage2D(GL_TEXTURE_2D, 0, GL_ALPHA, header.atlasWidth, header.atlasHeight, 0, GL_ALPHA,
+			GL_UNSIGNED_BYTE, data.data() + sizeof(FileHeader) + glyphsSize);
+	glPixelStorei(GL_UNPACK_ALIGNMENT, 4);
+	glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MIN_FILTER, GL_LINEAR);
+	glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_MAG_FILTER, GL_LINEAR);
+	glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_S, GL_CLAMP_TO_EDGE);
+	glTexParameteri(GL_TEXTURE_2D, GL_TEXTURE_WRAP_T, GL_CLAMP_TO_EDGE);
+	glGenBuffers(1, &vertexBuffer);
+	return true;
+}
+
+void gWebSdfFont::clear() {
+	if(texture) glDeleteTextures(1, &texture);
+	if(vertexBuffer) glDeleteBuffers(1, &vertexBuffer);
+	texture = 0;
+	vertexBuffer = 0;
+	glyphs.clear();
+	header = FileHeader();
+}
+
+bool gWebSdfFont::isLoaded() const {
+	return texture != 0;
+}
+
+float gWebSdfFont::getLineHeight(float size) const {
+	return header.pixelSize > 0 ? header.lineHeight * size / header.pixelSize : 0.0f;
+}
+
+float gWebSdfFont::getAscender(float size) const {
+	return header.pixelSize > 0 ? header.ascender * size / header.pixelSize : 0.0f;
+}
+
+float gWebSdfFont::getStringWidth(const std::string& text, float size) const {
+	if(header.pixelSize <= 0) return 0.0f;
+	float width = 0.0f;
+	for(uint32_t codepoint : decodeUtf8(text)) {
+		const Glyph* glyph = getGlyph(codepoint);
+		if(glyph) width += glyph->advance;
+	}
+	return width * size / header.pixelSize;
+}
+
+void gWebSdfFont::drawText(const std::string& text, float x, float y, float size,
+		float red, float green, float blue, float alpha) {
+	if(!isLoaded()) return;
+	float scale = size / header.pixelSize;
+	float baseline = y + header.ascender * scale;
+	float penX = x;
+
+	vertices.clear();
+	for(uint32_t codepoint : decodeUtf8(text)) {
+		const Glyph* glyph = getGlyph(codepoint);
+		if(!glyph) continue;
+		if(glyph->width > 0 && glyph->height > 0) {
+			float left = penX + glyph->bearingX * scale;
+			float top = baseline - glyph->bearingY * scale;
+			float right = left + glyph->width * scale;
+			float bottom = top + glyph->height * scale;
+			float u0 = (float)glyph->x / header.atlasWidth;
+			float v0 = (float)glyph->y / header.atlasHeight;
+			float u1 = (float)(glyph->x + glyph->width) / header.atlasWidth;
+			float v1 = (float)(glyph->y + glyph->height) / header.atlasHeight;
+			const float quad[] = {
+					left, top, u0, v0,  right, top, u1, v0,  right, bottom, u1, v1,
+					left, top, u0, v0,  right, bottom, u1, v1,  left, bottom, u0, v1
+			};
+			vertices.insert(vertices.end(), std::begin(quad), std::end(quad));
+		}
+		penX += glyph->advance * scale;
+	}
+	if(vertices.empty()) return;
+
+	GLint previousProgram = 0;
+	GLint previousBuffer = 0;
+	GLint viewport[4];
+	glGetIntegerv(GL_CURRENT_PROGRAM, &previousProgram);
+	glGetIntegerv(GL_ARRAY_BUFFER_BINDING, &previousBuffer);
+	glGetIntegerv(GL_VIEWPORT, viewport);
+	GLboolean blendEnabled = glIsEnabled(GL_BLEND);
+
+	GLuint program = getProgram();
+	glUseProgram(program);
+	glUniform2f(glGetUniformLocation(program, "u_viewport"), (float)viewport[2], (float)viewport[3]);
+	glUniform4f(glGetUniformLocation(program, "u_color"), red, green, blue, alpha);
+	// Half a screen pixel in stored distance units, a texel changes by 128 / spread / 255
+	float smoothing = 0.5f * (128.0f / 255.0f) / (header.spread * scale);
+	glUniform1f(glGetUniformLocation(program, "u_smoothing"), std::min(smoothing, 0.5f));
+	glUniform1i(glGetUniformLocation(program, "u_atlas"), 0);
+	glActiveTexture(GL_TEXTURE0);
+	glBindTexture(GL_TEXTURE_2D, texture);
+
+	glBindBuffer(GL_ARRAY_BUFFER, vertexBuffer);
+	glBufferData(GL_ARRAY_BUFFER, vertices.size() * sizeof(float), vertices.data(), GL_STREAM_DRAW);
+	glEnableVertexAttribArray(POSITION_LOCATION);
+	glEnableVertexAttribArray(TEXCOORD_LOCATION);
+	glVertexAttribPointer(POSITION_LOCATION, 2, GL_FLOAT, GL_FALSE, 4 * sizeof(float), nullptr);
+	glVertexAttribPointer(TEXCOORD_LOCATION, 2, GL_FLOAT, GL_FALSE, 4 * sizeof(float),
+			reinterpret_cast<const void*>(2 * sizeof(float)));
+
+	glEnable(GL_BLEND);
+	glBlendFunc(GL_SRC_ALPHA, GL_ONE_MINUS_SRC_ALPHA);
+	glDrawArrays(GL_TRIANGLES, 0, (GLsizei)(vertices.size() / 4));
+
+	glDisableVertexAttribArray(POSITION_LOCATION);
+	glDisableVertexAttribArray(TEXCOORD_LOCATION);
+	if(!blendEnabled) glDisable(GL_BLEND);
+	glBindBuffer(GL_ARRAY_BUFFER, previousBuffer);
+	glUseProgram(previousProgram);
+}
+
+const Glyph* gWebSdfFont::getGlyph(uint32_t codepoint) const {
+	auto it = std::lower_bound(glyphs.begin(), glyphs.end(), codepoint,
+			[](const Glyph& glyph, uint32_t value) { return glyph.codepoint < value; });
+	return it != glyphs.end() && it->codepoint == codepoint ? &*it : nullptr;
+}
+
+unsigned int gWebSdfFont::getTexture() const {
+	return texture;
+}
+
+unsigned int gWebSdfFont::getProgram() {
+	static GLuint program = 0;
+	if(program) return program;
+	GLuint vertexShader = compileShader(GL_VERTEX_SHADER, VERTEX_SHADER);
+	GLuint fragmentShader = compileShader(GL_FRAGMENT_SHADER, FRAGMENT_SHADER);
+	program = glCreateProgram();
+	glAttachShader(program, vertexShader);
+	glAttachShader(program, fragmentShader);
+	glBindAttribLocation(program, POSITION_LOCATION, "a_position");
+	glBindAttribLocation(program, TEXCOORD_LOCATION, "a_texCoord");
+	glLinkProgram(program);
+	glDeleteShader(vertexShader);
+	glDeleteShader(fragmentShader);
+	return program;
+}
+
+std::vector<uint32_t> gWebSdfFont::decodeUtf8(const std::string& text) {
+	std::vector<uint32_t> codepoints;
+	for(size_t i = 0; i < text.size();) {
+		unsigned char lead = text[i];
+		int length = lead < 0x80 ? 1 : (lead >> 5) == 0x6 ? 2 : (lead >> 4) == 0xE ? 3 : (lead >> 3) == 0x1E ? 4 : 0;
+		if(length == 0 || i + length > text.size()) {
+			// Skip bytes that do not start a valid sequence
+			i++;
+			continue;
+		}
+		uint32_t codepoint = length == 1 ? lead : lead & (0x7F >> length);
+		for(int j = 1; j < length; j++) codepoint = (codepoint << 6) | (text[i + j] & 0x3F);
+		codepoints.push_back(codepoint);
+		i += length;
+	}
+	return codepoints;
+}
@@ -0,0 +1,67 @@
+/*
+* gWebSdfFont.h
+*
+* Draws text from the signed distance field atlases project_builder.py
+* renders for fonts with an "sdf" font rule in gipwebgl.json. Glyphs scale
+* to any size without rasterizing them, so FreeType is not needed at runtime.
+*/
+
+#ifndef GWEBSDFFONT_H
+#define GWEBSDFFONT_H
+
+#include "gWebSdfFontFormat.h"
+#include <string>
+#include <vector>
+
+class gWebSdfFont {
+public:
+   gWebSdfFont();
+   ~gWebSdfFont();
+   gWebSdfFont(const gWebSdfFont&) = delete;
+   gWebSdfFont& operator=(const gWebSdfFont&) = delete;
+
+   /**
+	* Returns the path of the atlas generated for a font at one of the
+	* sizes of its rule, e.g. getAtlasPath("assets/fonts/ui.ttf", 48).
+	*/
+   static std::string getAtlasPath(const std::string& fontPath, int pixelSize);
+
+   /**
+	* Reads a .gsdf atlas and uploads it to a GL texture. Returns false if
+	* the file is invalid.
+	*/
+   bool load(const std::string& atlasPath);
+   void clear();
+   bool isLoaded() const;
+
+   /**
+	* Metrics for text drawn at size pixels, scaled from the size the atlas
+	* was generated for.
+	*/
+   float getLineHeight(float size) const;
+   float getAscender(float size) const;
+   float getStringWidth(const std::string& text, float size) const;
+
+   /**
+	* Draws UTF-8 text with its top left corner at x, y in viewport pixels,
+	* with the origin at the top left. Characters missing from the atlas
+	* are skipped.
+	*/
+   void drawText(const std::string& text, float x, float y, float size,
+		   float red = 1.0f, float green = 1.0f, float blue = 1.0f, float alpha = 1.0f);
+
+   const gWebSdfFontFormat::Glyph* getGlyph(uint32_t codepoint) const;
+   unsigned int getTexture() const;
+
+private:
+   static unsigned int getProgram();
+   static std::vector<uint32_t> decodeUtf8(const std::string& text);
+
+   gWebSdfFontFormat::FileHeader header;
+   std::vector<gWebSdfFontFormat::Glyph> glyphs;
+   std::vector<float> vertices;
+   unsigned int texture;
+   unsigned int vertexBuffer;
+};
+
+#endif //GWEBSDFFONT_H
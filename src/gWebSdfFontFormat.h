@@ -0,0 +1,57 @@
+/*
+* gWebSdfFontFormat.h
+*
+* Layout of the .gsdf glyph atlases written by tools/host/gipsdfgen and
+* loaded by gWebSdfFont. All values are little-endian, metrics are in
+* pixels at the size the atlas was generated for.
+*
+*   gWebSdfFontFormat::FileHeader
+*   gWebSdfFontFormat::Glyph[glyphCount], sorted by codepoint
+*   atlasWidth * atlasHeight bytes of signed distances, 128 on the outline
+*   and larger inside the glyph
+*/
+
+#ifndef GWEBSDFFONTFORMAT_H
+#define GWEBSDFFONTFORMAT_H
+
+#include <cstdint>
+
+namespace gWebSdfFontFormat {
+
+const char MAGIC[4] = {'G', 'S', 'D', 'F'};
+const uint32_t VERSION = 1;
+
+struct FileHeader {
+	char magic[4];
+	uint32_t version;
+	uint32_t glyphCount;
+	uint32_t atlasWidth;
+	uint32_t atlasHeight;
+	float pixelSize;
+	float spread;
+	float ascender;
+	float descender;
+	float lineHeight;
+};
+
+/*
+* A glyph's bitmap includes the spread on every side, bearingX and bearingY
+* place its top left corner relative to the pen position on the baseline.
+*/
+struct Glyph {
+	uint32_t codepoint;
+	uint16_t x;
+	uint16_t y;
+	uint16_t width;
+	uint16_t height;
+	float bearingX;
+	float bearingY;
+	float advance;
+};
+
+static_assert(sizeof(FileHeader) == 40, "gsdf file header must be 40 bytes");
+static_assert(sizeof(Glyph) == 24, "gsdf glyph must be 24 bytes");
+
+}
+
+#endif //GWEBSDFFONTFORMAT_H
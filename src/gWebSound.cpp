@@ -0,0 +1,191 @@
+/*
+* gWebSound.cpp
+*
+* Plays sounds through the browser's Web Audio API.
+*/
+
+#include "gWebSound.h"
+
+#include <emscripten/em_js.h>
+#include <fstream>
+#include <iterator>
+#include <vector>
+
+namespace {
+
+// Extensions the audio rules of project_builder.py append to transcoded sounds
+const char* TRANSCODED_EXTENSIONS[] = {".mp3", ".m4a", ".ogg"};
+
+bool fileExists(const std::string& path) {
+	std::ifstream file(path, std::ios::binary);
+	return file.good();
+}
+
+}
+
+// Sounds live in Module.gipwebglSounds, keyed by id, and share one AudioContext
+EM_JS(int, gipwebgl_sound_create, (const unsigned char* data, int size), {
+	if(!Module.gipwebglSounds) {
+		Module.gipwebglSounds = {nextId: 1, entries: {}};
+		Module.gipwebglStartSound = function(entry) {
+			var context = Module.gipwebglAudioContext;
+			// Browsers keep the context suspended until the page got a user gesture
+			if(context.state === "suspended") context.resume();
+			if(entry.source) entry.source.stop();
+			var source = context.createBufferSource();
+			source.buffer = entry.buffer;
+			source.loop = entry.loop;
+			source.connect(entry.gain);
+			source.onended = function() { if(entry.source === source) entry.source = null; };
+			entry.gain.gain.value = entry.volume;
+			entry.source = source;
+			entry.playWhenDecoded = false;
+			source.start();
+		};
+	}
+	var AudioContextClass = window.AudioContext || window.webkitAudioContext;
+	if(!AudioContextClass) return 0;
+	if(!Module.gipwebglAudioContext) Module.gipwebglAudioContext = new AudioContextClass();
+	var context = Module.gipwebglAudioContext;
+
+	var id = Module.gipwebglSounds.nextId++;
+	var entry = {buffer: null, failed: false, source: null, gain: context.createGain(), playWhenDecoded: false,
+			volume: 1.0, loop: false};
+	entry.gain.connect(context.destination);
+	Module.gipwebglSounds.entries[id] = entry;
+
+	// Copied out of the wasm heap, decodeAudioData takes ownership of its buffer
+	var bytes = HEAPU8.slice(data, data + size).buffer;
+	var onDecoded = function(buffer) {
+		entry.buffer = buffer;
+		if(entry.playWhenDecoded && Module.gipwebglSounds.entries[id] === entry) Module.gipwebglStartSound(entry);
+	};
+	var onFailed = function() { entry.failed = true; };
+	var promise = context.decodeAudioData(bytes, onDecoded, onFailed);
+	if(promise && promise.catch) promise.catch(onFailed);
+	return id;
+});
+
+EM_JS(void, gipwebgl_sound_play, (int id), {
+	var entry = Module.gipwebglSounds && Module.gipwebglSounds.entries[id];
+	if(!entry) return;
+	if(!entry.buffer) {
+		entry.playWhenDecoded = true;
+		return;
+	}
+	Module.gipwebglStartSound(entry);
+});
+
+EM_JS(void, gipwebgl_sound_stop, (int id), {
+	var entry = Module.gipwebglSounds && Module.gipwebglSounds.entries[id];
+	if(!entry) return;
+	entry.playWhenDecoded = false;
+	if(entry.source) {
+		var source = entry.source;
+		entry.source = null;
+		source.stop();
+	}
+});
+
+EM_JS(void, gipwebgl_sound_configure, (int id, float volume, int loop), {
+	var entry = Module.gipwebglSounds && Module.gipwebglSounds.entries[id];
+	if(!entry) return;
+	entry.volume = volume;
+	entry.loop = !!loop;
+	entry.gain.gain.value = volume;
+	if(entry.source) entry.source.loop = entry.loop;
+});
+
+// 0 while decoding, 1 decoded, 2 failed, 3 playing
+EM_JS(int, gipwebgl_sound_state, (int id), {
+	var entry = Module.gipwebglSounds && Module.gipwebglSounds.entries[id];
+	if(!entry || entry.failed) return 2;
+	if(!entry.buffer) return 0;
+	return entry.source ? 3 : 1;
+});
+
+EM_JS(float, gipwebgl_sound_duration, (int id), {
+	var entry = Module.gipwebglSounds && Module.gipwebglSounds.entries[id];
+	return entry && entry.buffer ? entry.buffer.duration : 0;
+});
+
+EM_JS(void, gipwebgl_sound_destroy, (int id), {
+	var entry = Module.gipwebglSounds && Module.gipwebglSounds.entries[id];
+	if(!entry) return;
+	if(entry.source) entry.source.stop();
+	entry.gain.disconnect();
+	delete Module.gipwebglSounds.entries[id];
+});
+
+gWebSound::gWebSound() : id(0), volume(1.0f), loop(false) {
+
+}
+
+gWebSound::~gWebSound() {
+	clear();
+}
+
+std::string gWebSound::getPreferredPath(const std::string& soundPath) {
+	if(fileExists(soundPath)) return soundPath;
+	for(const char* extension : TRANSCODED_EXTENSIONS) {
+		std::string candidate = soundPath + extension;
+		if(fileExists(candidate)) return candidate;
+	}
+	return soundPath;
+}
+
+bool gWebSound::load(const std::string& soundPath) {
+	clear();
+	std::ifstream file(soundPath, std::ios::binary);
+	if(!file) return false;
+	std::vector<unsigned char> data((std::istreambuf_iterator<char>(file)), std::istreambuf_iterator<char>());
+	id = gipwebgl_sound_create(data.data(), (int)data.size());
+	if(id == 0) return false;
+	gipwebgl_sound_configure(id, volume, loop);
+	return true;
+}
+
+void gWebSound::clear() {
+	if(id != 0) gipwebgl_sound_destroy(id);
+	id = 0;
+}
+
+bool gWebSound::isLoaded() const {
+	return id != 0;
+}
+
+bool gWebSound::isDecoded() const {
+	if(id == 0) return false;
+	int state = gipwebgl_sound_state(id);
+	return state == 1 || state == 3;
+}
+
+bool gWebSound::hasFailed() const {
+	return id != 0 && gipwebgl_sound_state(id) == 2;
+}
+
+float gWebSound::getDuration() const {
+	return id != 0 ? gipwebgl_sound_duration(id) : 0.0f;
+}
+
+void gWebSound::play() {
+	if(id != 0) gipwebgl_sound_play(id);
+}
+
+void gWebSound::stop() {
+	if(id != 0) gipwebgl_sound_stop(id);
+}
+
+bool gWebSound::isPlaying() const {
+	return id != 0 && gipwebgl_sound_state(id) == 3;
+}
+
+void gWebSound::setVolume(float volume) {
+	this->volume = volume;
+	if(id != 0) gipwebgl_sound_configure(id, volume, loop);
+}
+
+void gWebSound::setLoop(bool loop) {
+	this->loop = loop;
+	if(id != 0) gipwebgl_sound_configure(id, volume, loop);
+}
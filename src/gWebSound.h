@@ -0,0 +1,62 @@
+/*
+* gWebSound.h
+*
+* Plays sounds through the browser's Web Audio API. Files are decoded by
+* the browser's own decoder with decodeAudioData, so the compressed
+* formats project_builder.py transcodes audio to never decode in wasm.
+*/
+
+#ifndef GWEBSOUND_H
+#define GWEBSOUND_H
+
+#include <string>
+
+class gWebSound {
+public:
+   gWebSound();
+   ~gWebSound();
+   gWebSound(const gWebSound&) = delete;
+   gWebSound& operator=(const gWebSound&) = delete;
+
+   /**
+	* Returns the staged path of a sound the audio rules of gipwebgl.json
+	* transcoded, e.g. "assets/music/theme.wav" becomes
+	* "assets/music/theme.wav.mp3", or soundPath itself.
+	*/
+   static std::string getPreferredPath(const std::string& soundPath);
+
+   /**
+	* Reads a sound file and starts decoding it in the browser. Decoding
+	* finishes asynchronously, play() before that starts the sound once it
+	* is decoded. Returns false if the file cannot be read.
+	*/
+   bool load(const std::string& soundPath);
+   void clear();
+
+   bool isLoaded() const;
+   /**
+	* Returns true once the browser has decoded the sound.
+	*/
+   bool isDecoded() const;
+   /**
+	* Returns true if the browser could not decode the sound.
+	*/
+   bool hasFailed() const;
+   /**
+	* Duration in seconds, 0 until the sound is decoded.
+	*/
+   float getDuration() const;
+
+   void play();
+   void stop();
+   bool isPlaying() const;
+   void setVolume(float volume);
+   void setLoop(bool loop);
+
+private:
+   int id;
+   float volume;
+   bool loop;
+};
+
+#endif //GWEBSOUND_H
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# project_builder.py is a script in the repository root, not an installed package
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
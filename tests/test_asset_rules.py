@@ -0,0 +1,120 @@
+import pytest
+
+import project_builder
+
+
+def test_rules_match_globs_and_directory_prefixes():
+    rules = [{"path": "*.png", "optimize": False}, {"path": "ui/", "max_size": 512}]
+    assert project_builder.match_asset_rules("ui/button.png", rules) == {"optimize": False, "max_size": 512}
+    assert project_builder.match_asset_rules("ui/font.ttf", rules) == {"max_size": 512}
+    assert project_builder.match_asset_rules("uix/button.jpg", rules) is None
+
+
+def test_later_rules_override_earlier_ones():
+    rules = [{"path": "*", "max_size": 1024}, {"path": "ui/*", "max_size": 256}]
+    assert project_builder.match_asset_rules("ui/a.png", rules) == {"max_size": 256}
+
+
+def test_unmatched_texture_is_staged_as_is():
+    assert project_builder.get_texture_settings("a.png", [{"path": "ui/"}]) == {}
+
+
+def test_matched_texture_without_keys_is_optimized():
+    assert project_builder.get_texture_settings("ui/a.png", [{"path": "ui/"}]) == {"optimize": True}
+
+
+def test_texture_rule_can_turn_everything_off():
+    assert project_builder.get_texture_settings("a.png", [{"optimize": False}]) == {}
+    assert project_builder.get_texture_settings("a.png", [{"optimize": False, "ktx2": True}]) == {
+        "optimize": False, "ktx2": True}
+
+
+def test_texture_rules_only_apply_to_images():
+    assert project_builder.get_texture_settings("ui/a.wav", [{"path": "ui/"}]) == {}
+
+
+def test_optimize_png_keeps_invalid_data():
+    assert project_builder.optimize_png(b"not a png") == b"not a png"
+
+
+def test_webp_target_needs_pillow(monkeypatch):
+    monkeypatch.setattr(project_builder, "is_pillow_available", lambda: True)
+    assert project_builder.get_texture_target("ui/a.png", {"webp": True}) == "ui/a.webp"
+    monkeypatch.setattr(project_builder, "is_pillow_available", lambda: False)
+    assert project_builder.get_texture_target("ui/a.png", {"webp": True}) == "ui/a.png"
+
+
+@pytest.mark.parametrize("relative", ["a.PNG", "b.jpeg"])
+def test_texture_extensions_ignore_case(relative):
+    assert project_builder.get_texture_settings(relative, [{}]) == {"optimize": True}
+
+
+def make_png(pixels, width, height):
+    """Encode 8-bit RGB rows as a PNG with a text chunk and poorly compressed data."""
+    import struct
+    import zlib
+    raw = b"".join(b"\x00" + pixels[row * width * 3:(row + 1) * width * 3] for row in range(height))
+    chunk = project_builder.write_png_chunk
+    return (project_builder.PNG_SIGNATURE
+            + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+            + chunk(b"tEXt", b"Comment\x00made by a test")
+            + chunk(b"IDAT", zlib.compress(raw, 0))
+            + chunk(b"IEND", b""))
+
+
+def test_optimize_png_is_lossless_and_strips_metadata():
+    import zlib
+    data = make_png(bytes(range(48)) * 16, 16, 16)
+    optimized = project_builder.optimize_png(data)
+    assert len(optimized) < len(data)
+    chunks = dict(project_builder.iter_png_chunks(optimized))
+    assert b"tEXt" not in chunks
+    assert zlib.decompress(chunks[b"IDAT"]) == zlib.decompress(dict(project_builder.iter_png_chunks(data))[b"IDAT"])
+
+
+def test_unmatched_audio_is_staged_as_is():
+    assert project_builder.get_audio_settings("sfx/hit.wav", [{"path": "music/"}]) == {}
+
+
+def test_matched_audio_defaults_to_mp3():
+    settings = project_builder.get_audio_settings("music/theme.wav", [{"path": "music/"}])
+    assert settings == {"format": "mp3", "bitrate": "128k", "channels": None, "sample_rate": None,
+                        "pcm_under": None}
+
+
+def test_audio_rule_settings_are_merged():
+    rules = [{"path": "*", "format": "ogg"}, {"path": "sfx/", "bitrate": "64k", "channels": 1, "pcm_under": 0.5}]
+    settings = project_builder.get_audio_settings("sfx/hit.flac", rules)
+    assert settings["format"] == "ogg"
+    assert settings["bitrate"] == "64k"
+    assert settings["channels"] == 1
+    assert settings["pcm_under"] == 0.5
+
+
+def test_pcm_audio_is_staged_as_is():
+    assert project_builder.get_audio_settings("sfx/hit.wav", [{"format": "pcm"}]) == {}
+
+
+def test_compressed_audio_is_never_transcoded():
+    assert project_builder.get_audio_settings("music/theme.mp3", [{}]) == {}
+
+
+def test_wav_duration(tmp_path):
+    import wave
+    path = tmp_path / "hit.wav"
+    with wave.open(str(path), "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(8000)
+        f.writeframes(b"\x00\x00" * 4000)
+    assert project_builder.get_audio_duration(path) == 0.5
+    assert project_builder.get_audio_duration(tmp_path / "hit.flac") is None
+
+
+def test_ffmpeg_encoders_are_parsed(monkeypatch):
+    import subprocess
+    output = (" A..... = Audio\n ------\n V....D a64multi             Multicolor charset\n"
+              " A....D aac                  AAC (Advanced Audio Coding)\n")
+    monkeypatch.setattr(project_builder, "probe_tool",
+                        lambda *args, **kwargs: subprocess.CompletedProcess([], 0, output, ""))
+    assert project_builder.find_ffmpeg_encoders("ffmpeg") == {"a64multi", "aac"}
@@ -0,0 +1,70 @@
+import os
+
+import project_builder
+
+
+def write_log(path, lines, mode="w"):
+    with open(path, mode) as f:
+        for line in lines:
+            f.write(line + "\n")
+
+
+def test_missing_log_has_no_steps(tmp_path):
+    assert project_builder.read_build_steps(tmp_path / ".ninja_log") == []
+
+
+def test_whole_log_without_position(tmp_path):
+    log = tmp_path / ".ninja_log"
+    write_log(log, ["# ninja log v5", "0\t100\t0\ta.o\th1", "100\t250\t0\tapp.wasm\th2"])
+    assert project_builder.read_build_steps(log) == [(0, 100, ["a.o"]), (100, 250, ["app.wasm"])]
+
+
+def test_multi_output_edge_is_one_step(tmp_path):
+    log = tmp_path / ".ninja_log"
+    write_log(log, ["0\t100\t0\tapp.js\th1", "0\t100\t0\tapp.wasm\th1"])
+    assert project_builder.read_build_steps(log) == [(0, 100, ["app.js", "app.wasm"])]
+
+
+def test_edges_sharing_times_stay_apart(tmp_path):
+    log = tmp_path / ".ninja_log"
+    write_log(log, ["0\t100\t0\ta.o\th1", "0\t100\t0\tb.o\th2"])
+    assert project_builder.read_build_steps(log) == [(0, 100, ["a.o"]), (0, 100, ["b.o"])]
+
+
+def test_only_appended_steps_are_read(tmp_path):
+    log = tmp_path / ".ninja_log"
+    write_log(log, ["# ninja log v5", "0\t900\t0\told.o\th1"])
+    position = project_builder.get_log_position(log)
+    # Times restart with every ninja run, earlier than the previous build's
+    write_log(log, ["0\t50\t0\tnew.o\th2"], mode="a")
+    assert project_builder.read_build_steps(log, position) == [(0, 50, ["new.o"])]
+
+
+def test_no_op_build_has_no_steps(tmp_path):
+    log = tmp_path / ".ninja_log"
+    write_log(log, ["0\t100\t0\ta.o\th1"])
+    position = project_builder.get_log_position(log)
+    assert project_builder.read_build_steps(log, position) == []
+
+
+def test_recompacted_log_has_no_steps(tmp_path):
+    log = tmp_path / ".ninja_log"
+    write_log(log, ["0\t100\t0\ta.o\th1"])
+    position = project_builder.get_log_position(log)
+    # Ninja writes the recompacted log to a new file and renames it
+    recompacted = tmp_path / ".ninja_log.recompact"
+    write_log(recompacted, ["0\t100\t0\ta.o\th1", "0\t40\t0\tb.o\th2"])
+    os.replace(recompacted, log)
+    assert project_builder.read_build_steps(log, position) == []
+
+
+def test_launcher_log_without_hashes(tmp_path):
+    log = tmp_path / project_builder.TIMING_LOG_NAME
+    write_log(log, ["1000\t1200\t0\tmain.o", "1200\t1900\t0\tapp.html"])
+    assert project_builder.read_build_steps(log) == [(1000, 1200, ["main.o"]), (1200, 1900, ["app.html"])]
+
+
+def test_classify_build_step():
+    assert project_builder.classify_build_step("deps/sqlite3/sqlite3.c.o") == ("sqlite3", "compile")
+    assert project_builder.classify_build_step("src/main.cpp.o") == ("app", "compile")
+    assert project_builder.classify_build_step("app.html") == ("app", "link")
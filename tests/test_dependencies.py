@@ -0,0 +1,80 @@
+import pytest
+
+import project_builder
+
+
+@pytest.fixture
+def project(tmp_path):
+    project_path = tmp_path / "project"
+    (project_path / "src").mkdir(parents=True)
+    (project_path / "assets").mkdir()
+    build_dir = tmp_path / "build"
+    build_dir.mkdir()
+    return project_path, build_dir
+
+
+def dropped(project, config=None, cmake_version=(3, 28)):
+    project_path, build_dir = project
+    return project_builder.get_dropped_dependencies(project_path, config or {}, build_dir, cmake_version)
+
+
+def test_unreferenced_dependencies_are_dropped(project):
+    (project[0] / "src" / "main.cpp").write_text('#include "gApp.h"\n')
+    assert dropped(project) == ["assimp", "freetype", "sqlite3"]
+
+
+def test_engine_and_own_headers_keep_dependencies(project):
+    (project[0] / "src" / "main.cpp").write_text('#include "gFont.h"\n#include <assimp/scene.h>\n')
+    assert dropped(project) == ["sqlite3"]
+
+
+def test_cmake_files_keep_dependencies(project):
+    (project[0] / "CMakeLists.txt").write_text("target_link_libraries(app sqlite3)\n")
+    assert "sqlite3" not in dropped(project)
+
+
+def test_assets_are_not_scanned(project):
+    (project[0] / "assets" / "notes.h").write_text('#include "gDatabase.h"\n')
+    assert "sqlite3" in dropped(project)
+
+
+def test_keep_setting_links_dependency(project):
+    assert dropped(project, {"dependencies": {"keep": ["assimp"]}}) == ["freetype", "sqlite3"]
+
+
+def test_old_cmake_links_everything(project):
+    assert dropped(project, cmake_version=(3, 20)) == []
+    assert dropped(project, cmake_version=()) == []
+
+
+def test_required_dependencies_hold_for_the_same_scan(project):
+    project_path, build_dir = project
+    (project_path / "src" / "main.cpp").write_text('#include "gFont.h"\n')
+    usage = project_builder.scan_dependency_usage(project_path)
+    project_builder.write_required_dependencies(build_dir, {"sqlite3"}, usage)
+    assert dropped(project) == ["assimp"]
+
+    # The includes changed, what the old link needed is proven again
+    (project_path / "src" / "main.cpp").write_text('#include "gFont.h"\n#include "gModel.h"\n')
+    assert dropped(project) == ["sqlite3"]
+
+
+def test_dependency_link_args():
+    assert project_builder.get_dependency_link_args(["freetype"]) == [
+        "-DGIPWEBGL_WITH_ASSIMP=ON", "-DGIPWEBGL_WITH_FREETYPE=OFF", "-DGIPWEBGL_WITH_SQLITE3=ON"]
+
+
+def test_undefined_symbols_map_to_dropped_dependencies(tmp_path):
+    log = tmp_path / project_builder.UNDEFINED_LOG_NAME
+    log.write_text("FT_Init_FreeType\nsqlite3_open\nAssimp::Importer::Importer()\n")
+    assert project_builder.find_dependencies_for_symbols(log, ["freetype", "assimp"]) == {"freetype", "assimp"}
+
+
+def test_needs_fresh_configure():
+    inputs = {"toolchain_file": "t.cmake", "generator": "Ninja", "emsdk_version": "3.1.0",
+              "cmake_args": ["cmake", "-DGIPWEBGL_WITH_SQLITE3=OFF", "-DCMAKE_BUILD_TYPE:STRING=Release"]}
+    flipped = dict(inputs, cmake_args=["cmake", "-DGIPWEBGL_WITH_SQLITE3=ON", "-DCMAKE_BUILD_TYPE=Release"])
+    assert not project_builder.needs_fresh_configure(inputs, flipped)
+    assert project_builder.needs_fresh_configure(None, inputs)
+    assert project_builder.needs_fresh_configure(inputs, dict(inputs, generator="Unix Makefiles"))
+    assert project_builder.needs_fresh_configure(inputs, dict(inputs, cmake_args=["cmake"]))
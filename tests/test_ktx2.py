@@ -0,0 +1,67 @@
+import struct
+
+import pytest
+
+import project_builder
+
+
+def read_ktx2(path):
+    data = path.read_bytes()
+    header = struct.unpack_from("<9I", data, 12)
+    index = struct.unpack_from("<4I2Q", data, 48)
+    return data, header, index
+
+
+@pytest.mark.parametrize("variant", sorted(project_builder.KTX2_VARIANTS))
+def test_header_and_level_index(tmp_path, variant):
+    vk_format, block_bytes, _, _ = project_builder.KTX2_VARIANTS[variant]
+    # 8x8, 4x4, 2x2 and 1x1 levels, each one block per 4x4 texels
+    levels = [bytes([1]) * block_bytes * 4, bytes([2]) * block_bytes,
+              bytes([3]) * block_bytes, bytes([4]) * block_bytes]
+    path = tmp_path / f"image.png.{variant}.ktx2"
+    project_builder.write_ktx2(path, variant, 8, 8, levels)
+    data, header, index = read_ktx2(path)
+
+    assert data[:12] == project_builder.KTX2_IDENTIFIER
+    # vkFormat, typeSize, width, height, depth, layers, faces, levels, supercompression
+    assert header == (vk_format, 1, 8, 8, 0, 0, 1, len(levels), 0)
+    dfd_offset, dfd_length, kvd_offset, kvd_length, sgd_offset, sgd_length = index
+    assert dfd_offset == 80 + 24 * len(levels)
+    assert (kvd_offset, kvd_length, sgd_offset, sgd_length) == (0, 0, 0, 0)
+
+    previous_offset = len(data)
+    for level, expected in enumerate(levels):
+        offset, length, uncompressed = struct.unpack_from("<3Q", data, 80 + 24 * level)
+        assert (length, uncompressed) == (len(expected), len(expected))
+        assert data[offset:offset + length] == expected
+        assert offset % block_bytes == 0
+        assert offset >= dfd_offset + dfd_length
+        # Smaller levels come first in the file
+        assert offset < previous_offset
+        previous_offset = offset
+
+
+@pytest.mark.parametrize("variant", sorted(project_builder.KTX2_VARIANTS))
+def test_data_format_descriptor(tmp_path, variant):
+    _, block_bytes, color_model, samples = project_builder.KTX2_VARIANTS[variant]
+    path = tmp_path / "image.ktx2"
+    project_builder.write_ktx2(path, variant, 4, 4, [bytes(block_bytes)])
+    data, _, index = read_ktx2(path)
+    dfd_offset, dfd_length = index[:2]
+    words = struct.unpack_from(f"<{dfd_length // 4}I", data, dfd_offset)
+
+    block_size = 24 + 16 * len(samples)
+    assert dfd_length == 4 + block_size
+    assert words[0] == dfd_length
+    # Khronos basic descriptor block, version 2
+    assert words[1] == 0
+    assert words[2] == 2 | block_size << 16
+    # Color model, BT.709 primaries, linear transfer
+    assert words[3] == color_model | 1 << 8 | 1 << 16
+    # 4x4 texel blocks, stored minus one
+    assert words[4] == 3 | 3 << 8
+    assert (words[5], words[6]) == (block_bytes, 0)
+    for sample, (bit_offset, channel) in enumerate(samples):
+        first = 7 + 4 * sample
+        assert words[first] == bit_offset | 63 << 16 | channel << 24
+        assert words[first + 1:first + 4] == (0, 0, 0xFFFFFFFF)
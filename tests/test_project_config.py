@@ -0,0 +1,80 @@
+import json
+
+import pytest
+
+import project_builder
+
+
+def write_config(project_path, config):
+    (project_path / project_builder.PROJECT_CONFIG_NAME).write_text(json.dumps(config))
+
+
+def test_missing_config_is_empty(tmp_path):
+    assert project_builder.load_project_config(tmp_path) == {}
+
+
+def test_valid_config_is_returned(tmp_path):
+    config = {
+        "assimp": {"importers": ["OBJ"], "exporters": "all"},
+        "freetype": {"modules": ["gzip"]},
+        "sqlite": {"definitions": ["SQLITE_OMIT_WAL"]},
+        "dependencies": {"keep": ["assimp"]},
+        "audio": {"rules": [{"path": "music/", "format": "ogg"}]},
+    }
+    write_config(tmp_path, config)
+    assert project_builder.load_project_config(tmp_path) == config
+
+
+@pytest.mark.parametrize("text", ["{", "[]", "1"])
+def test_unreadable_or_non_object_config_is_rejected(tmp_path, text, capsys):
+    (tmp_path / project_builder.PROJECT_CONFIG_NAME).write_text(text)
+    assert project_builder.load_project_config(tmp_path) is None
+    assert "ERROR" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("config", [
+    {"assimp": {"importers": "all"}},
+    {"assimp": {"exporters": "all"}},
+    {"assimp": {"importers": ["OBJ", "FBX"]}},
+    {"sqlite": {"definitions": []}},
+])
+def test_valid_name_lists(config):
+    assert project_builder.validate_project_config(config) is None
+
+
+@pytest.mark.parametrize("section, key", [
+    ("assimp", "importers"),
+    ("assimp", "exporters"),
+    ("sqlite", "definitions"),
+    ("freetype", "modules"),
+    ("dependencies", "keep"),
+])
+def test_lone_name_is_rejected(section, key):
+    # A string would otherwise be iterated letter by letter
+    error = project_builder.validate_project_config({section: {key: "gzip"}})
+    assert error.startswith(f'"{section}" "{key}" must be a list of')
+
+
+def test_all_is_only_accepted_where_documented():
+    assert project_builder.validate_project_config({"sqlite": {"definitions": "all"}}) is not None
+
+
+def test_non_string_names_are_rejected():
+    assert project_builder.validate_project_config({"freetype": {"modules": ["gzip", 1]}}) is not None
+
+
+@pytest.mark.parametrize("section", project_builder.PROJECT_CONFIG_SECTIONS)
+def test_section_must_be_an_object(section):
+    assert project_builder.validate_project_config({section: []}) == f'"{section}" must be an object'
+
+
+@pytest.mark.parametrize("rules", [{}, "music/", [{"path": "a"}, "b"]])
+def test_rules_must_be_a_list_of_objects(rules):
+    error = project_builder.validate_project_config({"audio": {"rules": rules}})
+    assert error == '"audio" "rules" must be a list of objects'
+
+
+def test_invalid_config_file_is_rejected(tmp_path, capsys):
+    write_config(tmp_path, {"sqlite": {"definitions": "SQLITE_OMIT_WAL"}})
+    assert project_builder.load_project_config(tmp_path) is None
+    assert '"sqlite" "definitions"' in capsys.readouterr().out
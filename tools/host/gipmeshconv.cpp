@@ -0,0 +1,251 @@
+/*
+* gipmeshconv.cpp
+*
+* Converts a model assimp can import into a .gmesh file (see
+* src/gWebMeshFormat.h). Meshes are triangulated, flattened into world
+* space, deduplicated and reordered for the post-transform vertex cache, so
+* the web runtime uploads them without any parsing.
+*
+* Usage: gipmeshconv [--no-quantize] <input> <output>
+*/
+
+#include "gWebMeshFormat.h"
+
+#include <assimp/Importer.hpp>
+#include <assimp/postprocess.h>
+#include <assimp/scene.h>
+#include <algorithm>
+#include <cmath>
+#include <cstdio>
+#include <cstring>
+#include <fstream>
+#include <string>
+#include <unordered_map>
+#include <vector>
+
+using namespace gWebMeshFormat;
+
+namespace {
+
+// Largest part that still fits 16-bit indices, which WebGL 1 always supports
+const unsigned int MAX_PART_VERTICES = 65535;
+
+const unsigned int IMPORT_FLAGS = aiProcess_Triangulate
+		| aiProcess_SortByPType
+		| aiProcess_PreTransformVertices
+		| aiProcess_GenSmoothNormals
+		| aiProcess_FindDegenerates
+		| aiProcess_FindInvalidData
+		| aiProcess_JoinIdenticalVertices
+		| aiProcess_RemoveRedundantMaterials
+		| aiProcess_OptimizeMeshes
+		| aiProcess_SplitLargeMeshes
+		| aiProcess_ImproveCacheLocality
+		| aiProcess_ValidateDataStructure;
+
+struct Part {
+	PartHeader header;
+	std::vector<unsigned char> vertices;
+	std::vector<unsigned char> indices;
+};
+
+uint16_t quantizeUnorm16(float value, float offset, float scale) {
+	if(scale <= 0.0f) return 0;
+	float normalized = std::min(std::max((value - offset) / scale, 0.0f), 1.0f);
+	return (uint16_t)std::lround(normalized * 65535.0f);
+}
+
+int8_t quantizeSnorm8(float value) {
+	return (int8_t)std::lround(std::min(std::max(value, -1.0f), 1.0f) * 127.0f);
+}
+
+uint8_t quantizeUnorm8(float value) {
+	return (uint8_t)std::lround(std::min(std::max(value, 0.0f), 1.0f) * 255.0f);
+}
+
+template<typename T>
+void append(std::vector<unsigned char>& data, const T* values, size_t count) {
+	const unsigned char* bytes = reinterpret_cast<const unsigned char*>(values);
+	data.insert(data.end(), bytes, bytes + sizeof(T) * count);
+}
+
+void computeBounds(const aiVector3D* values, unsigned int count, int components, float* offset, float* scale) {
+	for(int c = 0; c < components; c++) {
+		float low = values[0][c];
+		float high = values[0][c];
+		for(unsigned int i = 1; i < count; i++) {
+			low = std::min(low, values[i][c]);
+			high = std::max(high, values[i][c]);
+		}
+		offset[c] = low;
+		scale[c] = high - low;
+	}
+}
+
+Part convertMesh(const aiMesh* mesh, bool quantized) {
+	Part part{};
+	PartHeader& header = part.header;
+	header.attributes = ATTRIBUTE_POSITION;
+	if(mesh->HasNormals()) header.attributes |= ATTRIBUTE_NORMAL;
+	if(mesh->HasTextureCoords(0)) header.attributes |= ATTRIBUTE_TEXCOORD;
+	if(mesh->HasVertexColors(0)) header.attributes |= ATTRIBUTE_COLOR;
+	header.vertexStride = getVertexStride(header.attributes, quantized);
+	header.materialIndex = mesh->mMaterialIndex;
+
+	std::fill(header.positionScale, header.positionScale + 3, 1.0f);
+	std::fill(header.texCoordScale, header.texCoordScale + 2, 1.0f);
+	if(quantized) {
+		computeBounds(mesh->mVertices, mesh->mNumVertices, 3, header.positionOffset, header.positionScale);
+		if(mesh->HasTextureCoords(0)) {
+			computeBounds(mesh->mTextureCoords[0], mesh->mNumVertices, 2, header.texCoordOffset, header.texCoordScale);
+		}
+	}
+
+	// Encode every vertex, then merge the ones quantization made identical.
+	// First occurrences keep their order, which preserves the cache-friendly
+	// order of assimp's ImproveCacheLocality.
+	std::unordered_map<std::string, uint32_t> uniqueVertices;
+	std::vector<uint32_t> remap(mesh->mNumVertices);
+	std::vector<unsigned char> vertex;
+	for(unsigned int i = 0; i < mesh->mNumVertices; i++) {
+		vertex.clear();
+		const aiVector3D& position = mesh->mVertices[i];
+		if(quantized) {
+			uint16_t values[4] = {
+					quantizeUnorm16(position.x, header.positionOffset[0], header.positionScale[0]),
+					quantizeUnorm16(position.y, header.positionOffset[1], header.positionScale[1]),
+					quantizeUnorm16(position.z, header.positionOffset[2], header.positionScale[2]),
+					0
+			};
+			append(vertex, values, 4);
+		} else {
+			float values[3] = {position.x, position.y, position.z};
+			append(vertex, values, 3);
+		}
+		if(header.attributes & ATTRIBUTE_NORMAL) {
+			aiVector3D normal = mesh->mNormals[i];
+			if(normal.SquareLength() > 0.0f) normal.Normalize();
+			if(quantized) {
+				int8_t values[4] = {quantizeSnorm8(normal.x), quantizeSnorm8(normal.y), quantizeSnorm8(normal.z), 0};
+				append(vertex, values, 4);
+			} else {
+				float values[3] = {normal.x, normal.y, normal.z};
+				append(vertex, values, 3);
+			}
+		}
+		if(header.attributes & ATTRIBUTE_TEXCOORD) {
+			const aiVector3D& texCoord = mesh->mTextureCoords[0][i];
+			if(quantized) {
+				uint16_t values[2] = {
+						quantizeUnorm16(texCoord.x, header.texCoordOffset[0], header.texCoordScale[0]),
+						quantizeUnorm16(texCoord.y, header.texCoordOffset[1], header.texCoordScale[1])
+				};
+				append(vertex, values, 2);
+			} else {
+				float values[2] = {texCoord.x, texCoord.y};
+				append(vertex, values, 2);
+			}
+		}
+		if(header.attributes & ATTRIBUTE_COLOR) {
+			const aiColor4D& color = mesh->mColors[0][i];
+			uint8_t values[4] = {quantizeUnorm8(color.r), quantizeUnorm8(color.g), quantizeUnorm8(color.b), quantizeUnorm8(color.a)};
+			append(vertex, values, 4);
+		}
+
+		std::string key(vertex.begin(), vertex.end());
+		auto inserted = uniqueVertices.emplace(key, (uint32_t)uniqueVertices.size());
+		if(inserted.second) part.vertices.insert(part.vertices.end(), vertex.begin(), vertex.end());
+		remap[i] = inserted.first->second;
+	}
+	header.vertexCount = (uint32_t)uniqueVertices.size();
+	header.indexType = header.vertexCount <= MAX_PART_VERTICES + 1 ? INDEX_UNSIGNED_SHORT : INDEX_UNSIGNED_INT;
+
+	for(unsigned int f = 0; f < mesh->mNumFaces; f++) {
+		const aiFace& face = mesh->mFaces[f];
+		if(face.mNumIndices != 3) continue;
+		for(unsigned int j = 0; j < 3; j++) {
+			uint32_t index = remap[face.mIndices[j]];
+			if(header.indexType == INDEX_UNSIGNED_SHORT) {
+				uint16_t shortIndex = (uint16_t)index;
+				append(part.indices, &shortIndex, 1);
+			} else {
+				append(part.indices, &index, 1);
+			}
+		}
+		header.indexCount += 3;
+	}
+	return part;
+}
+
+void padTo4(std::vector<unsigned char>& data) {
+	data.resize((data.size() + 3) & ~(size_t)3, 0);
+}
+
+}
+
+int main(int argc, char** argv) {
+	bool quantized = true;
+	std::vector<std::string> paths;
+	for(int i = 1; i < argc; i++) {
+		std::string arg = argv[i];
+		if(arg == "--no-quantize") quantized = false;
+		else paths.push_back(arg);
+	}
+	if(paths.size() != 2) {
+		std::fprintf(stderr, "Usage: gipmeshconv [--no-quantize] <input> <output>\n");
+		return 2;
+	}
+
+	Assimp::Importer importer;
+	importer.SetPropertyInteger(AI_CONFIG_PP_SBP_REMOVE, aiPrimitiveType_POINT | aiPrimitiveType_LINE);
+	importer.SetPropertyBool(AI_CONFIG_PP_FD_REMOVE, true);
+	importer.SetPropertyInteger(AI_CONFIG_PP_SLM_VERTEX_LIMIT, MAX_PART_VERTICES);
+	const aiScene* scene = importer.ReadFile(paths[0], IMPORT_FLAGS);
+	if(!scene || (scene->mFlags & AI_SCENE_FLAGS_INCOMPLETE) || !scene->mRootNode) {
+		std::fprintf(stderr, "%s: %s\n", paths[0].c_str(), importer.GetErrorString());
+		return 1;
+	}
+
+	std::vector<Part> parts;
+	for(unsigned int m = 0; m < scene->mNumMeshes; m++) {
+		const aiMesh* mesh = scene->mMeshes[m];
+		if(mesh->mNumVertices == 0 || !(mesh->mPrimitiveTypes & aiPrimitiveType_TRIANGLE)) continue;
+		Part part = convertMesh(mesh, quantized);
+		if(part.header.indexCount > 0) parts.push_back(std::move(part));
+	}
+	if(parts.empty()) {
+		std::fprintf(stderr, "%s: no triangle meshes\n", paths[0].c_str());
+		return 1;
+	}
+
+	FileHeader fileHeader{};
+	std::memcpy(fileHeader.magic, MAGIC, sizeof(MAGIC));
+	fileHeader.version = VERSION;
+	fileHeader.flags = quantized ? FLAG_QUANTIZED : 0;
+	fileHeader.partCount = (uint32_t)parts.size();
+
+	std::vector<unsigned char> body;
+	size_t dataStart = sizeof(FileHeader) + sizeof(PartHeader) * parts.size();
+	for(Part& part : parts) {
+		part.header.vertexDataOffset = (uint32_t)(dataStart + body.size());
+		part.header.vertexDataSize = (uint32_t)part.vertices.size();
+		body.insert(body.end(), part.vertices.begin(), part.vertices.end());
+		padTo4(body);
+		part.header.indexDataOffset = (uint32_t)(dataStart + body.size());
+		part.header.indexDataSize = (uint32_t)part.indices.size();
+		body.insert(body.end(), part.indices.begin(), part.indices.end());
+		padTo4(body);
+	}
+
+	std::ofstream output(paths[1], std::ios::binary);
+	output.write(reinterpret_cast<const char*>(&fileHeader), sizeof(fileHeader));
+	for(const Part& part : parts) {
+		output.write(reinterpret_cast<const char*>(&part.header), sizeof(part.header));
+	}
+	output.write(reinterpret_cast<const char*>(body.data()), body.size());
+	if(!output) {
+		std::fprintf(stderr, "%s: could not write the output\n", paths[1].c_str());
+		return 1;
+	}
+	return 0;
+}
@@ -0,0 +1,204 @@
+/*
+* gipsdfgen.cpp
+*
+* Renders the glyphs of a font into a signed distance field atlas with
+* FreeType's sdf renderer and writes it as a .gsdf file (see
+* src/gWebSdfFontFormat.h), so the web runtime draws text at any scale
+* without rasterizing glyphs.
+*
+* Usage: gipsdfgen --size <pixels> --spread <pixels> --codepoints <file> <font> <output>
+*
+* The codepoints file lists one decimal codepoint per line.
+*/
+
+#include "gWebSdfFontFormat.h"
+
+#include <ft2build.h>
+#include FT_FREETYPE_H
+#include FT_MODULE_H
+#include <algorithm>
+#include <cmath>
+#include <cstdio>
+#include <cstdlib>
+#include <cstring>
+#include <fstream>
+#include <string>
+#include <vector>
+
+using namespace gWebSdfFontFormat;
+
+namespace {
+
+// Empty texels between glyphs, so linear filtering never samples a neighbour
+const int GLYPH_PADDING = 1;
+const uint32_t MAX_ATLAS_WIDTH = 4096;
+
+struct RenderedGlyph {
+	Glyph glyph;
+	std::vector<unsigned char> pixels;
+};
+
+bool readCodepoints(const std::string& path, std::vector<uint32_t>& codepoints) {
+	std::ifstream file(path);
+	if(!file) return false;
+	unsigned long codepoint;
+	while(file >> codepoint) codepoints.push_back((uint32_t)codepoint);
+	std::sort(codepoints.begin(), codepoints.end());
+	codepoints.erase(std::unique(codepoints.begin(), codepoints.end()), codepoints.end());
+	return true;
+}
+
+uint32_t nextPowerOfTwo(uint32_t value) {
+	uint32_t result = 1;
+	while(result < value) result <<= 1;
+	return result;
+}
+
+/*
+* Places glyphs on shelves, tallest first, in an atlas of the given width.
+* Returns the atlas height.
+*/
+uint32_t packGlyphs(std::vector<RenderedGlyph*>& glyphs, uint32_t atlasWidth) {
+	std::sort(glyphs.begin(), glyphs.end(), [](const RenderedGlyph* a, const RenderedGlyph* b) {
+		return a->glyph.height != b->glyph.height ? a->glyph.height > b->glyph.height
+				: a->glyph.codepoint < b->glyph.codepoint;
+	});
+	uint32_t x = 0;
+	uint32_t y = 0;
+	uint32_t shelfHeight = 0;
+	for(RenderedGlyph* rendered : glyphs) {
+		Glyph& glyph = rendered->glyph;
+		if(glyph.width == 0 || glyph.height == 0) continue;
+		if(x + glyph.width + GLYPH_PADDING > atlasWidth) {
+			x = 0;
+			y += shelfHeight + GLYPH_PADDING;
+			shelfHeight = 0;
+		}
+		glyph.x = (uint16_t)x;
+		glyph.y = (uint16_t)y;
+		x += glyph.width + GLYPH_PADDING;
+		shelfHeight = std::max<uint32_t>(shelfHeight, glyph.height);
+	}
+	return y + shelfHeight;
+}
+
+}
+
+int main(int argc, char** argv) {
+	int size = 0;
+	int spread = 0;
+	std::string codepointsPath;
+	std::vector<std::string> paths;
+	for(int i = 1; i < argc; i++) {
+		std::string arg = argv[i];
+		if(arg == "--size" && i + 1 < argc) size = std::atoi(argv[++i]);
+		else if(arg == "--spread" && i + 1 < argc) spread = std::atoi(argv[++i]);
+		else if(arg == "--codepoints" && i + 1 < argc) codepointsPath = argv[++i];
+		else paths.push_back(arg);
+	}
+	std::vector<uint32_t> codepoints;
+	if(paths.size() != 2 || size <= 0 || spread <= 0 || !readCodepoints(codepointsPath, codepoints)) {
+		std::fprintf(stderr, "Usage: gipsdfgen --size <pixels> --spread <pixels> --codepoints <file> <font> <output>\n");
+		return 2;
+	}
+
+	FT_Library library;
+	FT_Face face;
+	if(FT_Init_FreeType(&library) != 0) {
+		std::fprintf(stderr, "Could not initialize FreeType\n");
+		return 1;
+	}
+	// FreeType only accepts spreads of 2 to 32 pixels
+	if(FT_Property_Set(library, "sdf", "spread", &spread) != 0
+			|| FT_Property_Set(library, "bsdf", "spread", &spread) != 0) {
+		std::fprintf(stderr, "FreeType rejected the spread of %d pixels, use 2 to 32\n", spread);
+		return 1;
+	}
+	if(FT_New_Face(library, paths[0].c_str(), 0, &face) != 0 || FT_Set_Pixel_Sizes(face, 0, size) != 0) {
+		std::fprintf(stderr, "%s: could not load the font at %d pixels\n", paths[0].c_str(), size);
+		return 1;
+	}
+
+	std::vector<RenderedGlyph> rendered;
+	rendered.reserve(codepoints.size());
+	for(uint32_t codepoint : codepoints) {
+		FT_UInt glyphIndex = FT_Get_Char_Index(face, codepoint);
+		if(glyphIndex == 0 || FT_Load_Glyph(face, glyphIndex, FT_LOAD_DEFAULT) != 0) continue;
+		FT_GlyphSlot slot = face->glyph;
+		RenderedGlyph glyph{};
+		glyph.glyph.codepoint = codepoint;
+		glyph.glyph.advance = slot->advance.x / 64.0f;
+		// Outlines without contours, e.g. spaces, only advance the pen
+		bool hasOutline = slot->format != FT_GLYPH_FORMAT_OUTLINE || slot->outline.n_contours > 0;
+		if(hasOutline && FT_Render_Glyph(slot, FT_RENDER_MODE_SDF) == 0) {
+			const FT_Bitmap& bitmap = slot->bitmap;
+			glyph.glyph.width = (uint16_t)bitmap.width;
+			glyph.glyph.height = (uint16_t)bitmap.rows;
+			glyph.glyph.bearingX = (float)slot->bitmap_left;
+			glyph.glyph.bearingY = (float)slot->bitmap_top;
+			glyph.pixels.resize((size_t)bitmap.width * bitmap.rows);
+			for(unsigned int row = 0; row < bitmap.rows; row++) {
+				const unsigned char* source = bitmap.buffer + (bitmap.pitch >= 0 ? row : bitmap.rows - 1 - row) * std::abs(bitmap.pitch);
+				std::memcpy(glyph.pixels.data() + (size_t)row * bitmap.width, source, bitmap.width);
+			}
+		}
+		rendered.push_back(std::move(glyph));
+	}
+	if(rendered.empty()) {
+		std::fprintf(stderr, "%s: none of the characters are in the font\n", paths[0].c_str());
+		return 1;
+	}
+
+	// Start from a square of the total glyph area and widen until the atlas is not too tall
+	uint64_t area = 0;
+	for(const RenderedGlyph& glyph : rendered) {
+		area += (uint64_t)(glyph.glyph.width + GLYPH_PADDING) * (glyph.glyph.height + GLYPH_PADDING);
+	}
+	std::vector<RenderedGlyph*> order;
+	for(RenderedGlyph& glyph : rendered) order.push_back(&glyph);
+	uint32_t atlasWidth = std::min<uint32_t>(nextPowerOfTwo((uint32_t)std::ceil(std::sqrt((double)area))), MAX_ATLAS_WIDTH);
+	uint32_t atlasHeight = packGlyphs(order, atlasWidth);
+	while(atlasHeight > atlasWidth && atlasWidth < MAX_ATLAS_WIDTH) {
+		atlasWidth *= 2;
+		atlasHeight = packGlyphs(order, atlasWidth);
+	}
+	atlasHeight = std::max<uint32_t>(atlasHeight, 1);
+	if(atlasHeight > 65535) {
+		std::fprintf(stderr, "%s: %zu glyphs do not fit an atlas at %d pixels\n", paths[0].c_str(), rendered.size(), size);
+		return 1;
+	}
+
+	std::vector<unsigned char> atlas((size_t)atlasWidth * atlasHeight, 0);
+	for(const RenderedGlyph& glyph : rendered) {
+		for(uint32_t row = 0; row < glyph.glyph.height; row++) {
+			std::memcpy(atlas.data() + (size_t)(glyph.glyph.y + row) * atlasWidth + glyph.glyph.x,
+					glyph.pixels.data() + (size_t)row * glyph.glyph.width, glyph.glyph.width);
+		}
+	}
+
+	FileHeader header{};
+	std::memcpy(header.magic, MAGIC, sizeof(MAGIC));
+	header.version = VERSION;
+	header.glyphCount = (uint32_t)rendered.size();
+	header.atlasWidth = atlasWidth;
+	header.atlasHeight = atlasHeight;
+	header.pixelSize = (float)size;
+	header.spread = (float)spread;
+	header.ascender = face->size->metrics.ascender / 64.0f;
+	header.descender = face->size->metrics.descender / 64.0f;
+	header.lineHeight = face->size->metrics.height / 64.0f;
+
+	std::ofstream output(paths[1], std::ios::binary);
+	output.write(reinterpret_cast<const char*>(&header), sizeof(header));
+	for(const RenderedGlyph& glyph : rendered) {
+		output.write(reinterpret_cast<const char*>(&glyph.glyph), sizeof(glyph.glyph));
+	}
+	output.write(reinterpret_cast<const char*>(atlas.data()), atlas.size());
+	FT_Done_Face(face);
+	FT_Done_FreeType(library);
+	if(!output) {
+		std::fprintf(stderr, "%s: could not write the output\n", paths[1].c_str());
+		return 1;
+	}
+	return 0;
+}